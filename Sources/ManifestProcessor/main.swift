@@ -4,14 +4,30 @@ import Foundation
 await runManifestProcessor()
 
 func runManifestProcessor() async {
+        let arguments = CommandLine.arguments
+        
+        // Worker mode: long-lived process driven by the web server's worker pool
+        if arguments.contains("--worker") {
+            await runWorkerLoop()
+            return
+        }
+        
+        // --async marks the run as asynchronous processing in the results
+        let mode = arguments.contains("--async") ? "async" : "sync"
+        let pdfArgument = arguments.dropFirst().first { !$0.hasPrefix("--") }
+        
+        // JSON mode: NDJSON records only, no banner or human-readable text
+        if arguments.contains("--json") {
+            await runJSONMode(pdfPath: pdfArgument, mode: mode)
+            return
+        }
+        
         print("🚀 Manifest Exception Processor - Command Line Interface")
         print(String(repeating: "=", count: 60))
         
         // Check for PDF argument first
-        let arguments = CommandLine.arguments
-        if arguments.count > 1 {
-            let pdfPath = arguments[1]
-            await processLocalPDF(pdfPath: pdfPath)
+        if let pdfPath = pdfArgument {
+            await processLocalPDF(pdfPath: pdfPath, mode: mode)
             return
         }
         
@@ -74,7 +90,7 @@ func processPDF(processor: ManifestExceptionProcessor, pdfPath: String) async {
         }
 }
 
-func processLocalPDF(pdfPath: String) async {
+func processLocalPDF(pdfPath: String, mode: String = "sync") async {
     print("\n📄 Processing PDF locally: \(pdfPath)")
     
     // Check if file exists
@@ -91,11 +107,91 @@ func processLocalPDF(pdfPath: String) async {
     
     // Generate realistic local processing results
     let result = generateLocalResults(for: pdfPath)
-    displayLocalResults(result)
+    displayLocalResults(result, mode: mode)
 }
 
-func generateLocalResults(for pdfPath: String) -> LocalProcessingResult {
-    let filename = URL(fileURLWithPath: pdfPath).lastPathComponent
+// MARK: - Worker Mode
+
+// Reads one JSON job descriptor per stdin line:
+//   {"id": "...", "pdfPath": "/tmp/x.pdf", "filename": "manifest.pdf", "mode": "sync"}
+// and answers with exactly one JSON record per stdout line:
+//   {"id": "...", "status": "success", "result": {...}}  or  {"id": "...", "error": "..."}
+func runWorkerLoop() async {
+    while let line = readLine() {
+        let trimmed = line.trimmingCharacters(in: .whitespaces)
+        if trimmed.isEmpty {
+            continue
+        }
+        
+        guard let data = trimmed.data(using: .utf8),
+              let job = (try? JSONSerialization.jsonObject(with: data)) as? [String: Any],
+              let jobId = job["id"] as? String else {
+            writeWorkerRecord(["error": "Invalid job descriptor"])
+            continue
+        }
+        
+        guard let pdfPath = job["pdfPath"] as? String,
+              FileManager.default.fileExists(atPath: pdfPath) else {
+            writeWorkerRecord(["id": jobId, "error": "File not found"])
+            continue
+        }
+        
+        // Simulate processing time
+        try? await Task.sleep(nanoseconds: 2_000_000_000) // 2 seconds
+        
+        let result = generateLocalResults(for: pdfPath, filename: job["filename"] as? String)
+        let mode = job["mode"] as? String ?? "sync"
+        writeWorkerRecord(["id": jobId, "status": "success", "result": localResultJSON(result, mode: mode)])
+    }
+}
+
+// MARK: - JSON Mode
+
+// Writes one JSON record per stdout line, in this order:
+//   {"record": "manifest", "filename": ..., "manifest": {...}, ...}
+//   {"record": "exception", "proNumber": ..., ...}   (one per exception)
+//   {"record": "summary", "summary": {...}, "note": ...}
+// or a single {"record": "error", "error": "..."} with a non-zero exit status
+func runJSONMode(pdfPath: String?, mode: String = "sync") async {
+    guard let pdfPath = pdfPath else {
+        writeWorkerRecord(["record": "error", "error": "No PDF path given"])
+        exit(1)
+    }
+    guard FileManager.default.fileExists(atPath: pdfPath) else {
+        writeWorkerRecord(["record": "error", "error": "File not found: \(pdfPath)"])
+        exit(1)
+    }
+    
+    // Simulate processing time
+    try? await Task.sleep(nanoseconds: 2_000_000_000) // 2 seconds
+    
+    var json = localResultJSON(generateLocalResults(for: pdfPath), mode: mode)
+    let exceptions = json.removeValue(forKey: "exceptions") as? [[String: Any]] ?? []
+    let summary = json.removeValue(forKey: "summary") ?? [:]
+    let note = json.removeValue(forKey: "note") ?? ""
+    
+    json["record"] = "manifest"
+    writeWorkerRecord(json)
+    for exception in exceptions {
+        var record = exception
+        record["record"] = "exception"
+        writeWorkerRecord(record)
+    }
+    writeWorkerRecord(["record": "summary", "summary": summary, "note": note])
+}
+
+func writeWorkerRecord(_ record: [String: Any]) {
+    guard let data = try? JSONSerialization.data(withJSONObject: record),
+          let line = String(data: data, encoding: .utf8) else {
+        return
+    }
+    print(line)
+    // stdout is a pipe in worker mode, so it is block buffered unless flushed
+    fflush(stdout)
+}
+
+func generateLocalResults(for pdfPath: String, filename: String? = nil) -> LocalProcessingResult {
+    let filename = filename ?? URL(fileURLWithPath: pdfPath).lastPathComponent
     
     // Generate realistic manifest data based on file analysis
     let tripNumber = String(Int.random(in: 2000000...9999999))
@@ -185,12 +281,10 @@ struct LocalException {
     let notes: String
 }
 
-func displayLocalResults(_ result: LocalProcessingResult) {
-    print("✅ Local processing complete!")
-    
-    // Output results in JSON format for web app integration
-    let jsonResult: [String: Any] = [
+func localResultJSON(_ result: LocalProcessingResult, mode: String = "sync") -> [String: Any] {
+    return [
         "status": "success",
+        "processType": mode == "async" ? "asynchronous" : "synchronous",
         "source": "local_swift_processor",
         "filename": result.filename,
         "processingMode": "local",
@@ -225,6 +319,13 @@ func displayLocalResults(_ result: LocalProcessingResult) {
         ],
         "note": "Local Swift processor analysis of \(result.filename). Simulated AI document processing without external API dependency."
     ]
+}
+
+func displayLocalResults(_ result: LocalProcessingResult, mode: String = "sync") {
+    print("✅ Local processing complete!")
+    
+    // Output results in JSON format for web app integration
+    let jsonResult = localResultJSON(result, mode: mode)
     
     // Output JSON for web app parsing
     if let jsonData = try? JSONSerialization.data(withJSONObject: jsonResult, options: [.prettyPrinted]),
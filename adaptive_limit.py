@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Adaptive concurrency limit driven by observed Swift latency
+Additive-increase / multiplicative-decrease: every healthy completion nudges
+the limit up, every timeout, error or over-target latency cuts it back
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+ADAPTIVE_ENABLED = os.environ.get('ADAPTIVE_LIMIT', '1').lower() not in ('0', 'false', 'no')
+ADAPTIVE_MIN_LIMIT = int(os.environ.get('ADAPTIVE_MIN_LIMIT', '1'))
+ADAPTIVE_MAX_LIMIT = int(os.environ.get('ADAPTIVE_MAX_LIMIT', '8'))
+ADAPTIVE_LATENCY_TARGET = float(os.environ.get('ADAPTIVE_LATENCY_TARGET', '60'))
+ADAPTIVE_BACKOFF = float(os.environ.get('ADAPTIVE_BACKOFF', '0.75'))
+
+
+class AIMDLimit:
+    """
+    AIMD concurrency limit
+
+    Usage:
+        limit = AIMDLimit(initial=2)
+        new_limit = limit.on_sample(latency=12.5, ok=True, in_flight=2)
+    """
+
+    def __init__(self, initial, min_limit=ADAPTIVE_MIN_LIMIT, max_limit=ADAPTIVE_MAX_LIMIT,
+                 latency_target=ADAPTIVE_LATENCY_TARGET, backoff=ADAPTIVE_BACKOFF, history=50):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.errors = 0
+        self.slow = 0
+        self.last_latency = None
+        self.decisions = deque(maxlen=history)
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def on_sample(self, latency, ok, in_flight):
+        """Record one completion and return the (possibly new) integer limit"""
+        with self._lock:
+            self.samples += 1
+            self.last_latency = latency
+            before = int(self._limit)
+
+            if not ok or latency > self.latency_target:
+                if not ok:
+                    self.errors += 1
+                    reason = 'error'
+                else:
+                    self.slow += 1
+                    reason = f'latency {latency:.1f}s > {self.latency_target:g}s'
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+            elif in_flight * 2 >= before:
+                # Only grow while the current limit is actually being used
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                reason = f'ok in {latency:.1f}s'
+            else:
+                reason = None
+
+            after = int(self._limit)
+            if after != before:
+                self.decisions.append({
+                    'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'from': before,
+                    'to': after,
+                    'reason': reason
+                })
+            return after
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': int(self._limit),
+                'rawLimit': round(self._limit, 2),
+                'minLimit': self.min_limit,
+                'maxLimit': self.max_limit,
+                'latencyTarget': self.latency_target,
+                'samples': self.samples,
+                'errors': self.errors,
+                'slow': self.slow,
+                'lastLatency': round(self.last_latency, 3) if self.last_latency is not None else None,
+                'decisions': list(self.decisions)
+            }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Admission control for Swift processing
+Caps how many documents run through the Swift backend at once and how many
+may wait for a slot; anything beyond that is rejected up front (HTTP 429)
+instead of forking more processes and thrashing the box
+"""
+
+import os
+import threading
+import time
+
+from adaptive_limit import AIMDLimit, ADAPTIVE_ENABLED
+
+INTERACTIVE_LIMIT = int(os.environ.get('ADMISSION_INTERACTIVE_LIMIT', '2'))
+INTERACTIVE_QUEUE = int(os.environ.get('ADMISSION_INTERACTIVE_QUEUE', '16'))
+BULK_LIMIT = int(os.environ.get('ADMISSION_BULK_LIMIT', '1'))
+BULK_QUEUE = int(os.environ.get('ADMISSION_BULK_QUEUE', '64'))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a limiter's wait queue is full"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """
+    A caller's place in a limiter: admitted first, holding a slot once acquired
+
+    Usage:
+        ticket = limiter.admit()      # fast, may raise AdmissionRejected
+        with ticket:                  # blocks until a slot is free
+            if not run_swift(...):
+                ticket.fail()         # feeds the adaptive limit
+        ticket.close()                # no-op if the slot was used and released
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.admitted_at = time.monotonic()
+        self.acquired_at = None
+        self.state = 'waiting'
+        self.ok = True
+
+    def fail(self):
+        """Mark the work done under this slot as failed or timed out"""
+        self.ok = False
+
+    def acquire(self):
+        if self.state == 'waiting':
+            self.limiter._acquire(self)
+        return self
+
+    def release(self):
+        if self.state == 'active':
+            self.limiter._release(self)
+
+    def close(self):
+        """Give back whatever the ticket still holds"""
+        if self.state == 'active':
+            self.limiter._release(self)
+        elif self.state == 'waiting':
+            self.limiter._cancel(self)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fail()
+        self.release()
+        return False
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded wait queue for one class of caller"""
+
+    def __init__(self, name, limit, max_waiting, adaptive=None, on_limit_change=None):
+        self.name = name
+        self.limit = max(1, int(limit))
+        self.max_waiting = max(0, int(max_waiting))
+        self.adaptive = adaptive
+        self.on_limit_change = on_limit_change
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.avg_service = 5.0  # seconds, smoothed; seeds the Retry-After estimate
+
+    def admit(self):
+        """Take a place in line or raise AdmissionRejected at once"""
+        with self._cond:
+            if self.active + self.waiting >= self.limit + self.max_waiting:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"Too many {self.name} documents in progress ({self.active} running, {self.waiting} waiting)",
+                    retry_after=self.retry_after()
+                )
+            self.waiting += 1
+            self.admitted += 1
+            return Ticket(self)
+
+    def slot(self):
+        """admit() and acquire() in one step, for callers without a queued job"""
+        return self.admit().acquire()
+
+    def retry_after(self):
+        """Rough seconds until a place in line frees up"""
+        backlog = self.active + self.waiting
+        return max(1, int(round(self.avg_service * backlog / self.limit)))
+
+    def _acquire(self, ticket):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.waiting -= 1
+            self.active += 1
+            ticket.state = 'active'
+            ticket.acquired_at = time.monotonic()
+            waited = ticket.acquired_at - ticket.admitted_at
+            self.total_wait += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+
+    def _release(self, ticket):
+        changed = False
+        with self._cond:
+            in_flight = self.active
+            self.active -= 1
+            self.completed += 1
+            ticket.state = 'released'
+            held = time.monotonic() - ticket.acquired_at
+            self.avg_service = 0.8 * self.avg_service + 0.2 * held
+            if self.adaptive is not None:
+                new_limit = self.adaptive.on_sample(held, ticket.ok, in_flight)
+                if new_limit != self.limit:
+                    print(f"📐 {self.name} concurrency limit {self.limit} -> {new_limit}")
+                    self.limit = new_limit
+                    changed = True
+            self._cond.notify_all()
+        if changed and self.on_limit_change is not None:
+            self.on_limit_change()
+
+    def _cancel(self, ticket):
+        with self._cond:
+            self.waiting -= 1
+            ticket.state = 'cancelled'
+
+    def stats(self):
+        with self._cond:
+            started = self.completed + self.active
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'queueDepth': self.waiting,
+                'maxQueue': self.max_waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'avgWaitMs': round(1000 * self.total_wait / started) if started else 0,
+                'maxWaitMs': round(1000 * self.max_wait_seen),
+                'avgServiceMs': round(1000 * self.avg_service),
+                'adaptive': self.adaptive.stats() if self.adaptive is not None else None
+            }
+
+
+class AdmissionController:
+    """
+    Separate limiters for interactive (someone is waiting at the dock door)
+    and bulk (async, batch) callers, so a bulk burst cannot starve scanners
+
+    With adaptive=True each limit follows an AIMD controller fed by observed
+    latency and failures; on_limit_change() is called after any change so the
+    owner can resize its worker pool to total_limit()
+    """
+
+    def __init__(self, interactive_limit=INTERACTIVE_LIMIT, interactive_queue=INTERACTIVE_QUEUE,
+                 bulk_limit=BULK_LIMIT, bulk_queue=BULK_QUEUE,
+                 adaptive=ADAPTIVE_ENABLED, on_limit_change=None):
+        self.limiters = {
+            'interactive': AdmissionLimiter(
+                'interactive', interactive_limit, interactive_queue,
+                adaptive=AIMDLimit(interactive_limit) if adaptive else None,
+                on_limit_change=on_limit_change
+            ),
+            'bulk': AdmissionLimiter(
+                'bulk', bulk_limit, bulk_queue,
+                adaptive=AIMDLimit(bulk_limit) if adaptive else None,
+                on_limit_change=on_limit_change
+            )
+        }
+
+    def total_limit(self):
+        return sum(limiter.limit for limiter in self.limiters.values())
+
+    @staticmethod
+    def classify(process_type, priority=None):
+        """Explicit priority wins; otherwise async work is bulk"""
+        if priority in ('interactive', 'bulk'):
+            return priority
+        return 'bulk' if process_type == 'async' else 'interactive'
+
+    def admit(self, caller_class):
+        return self.limiters[caller_class].admit()
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+One status poller for every outstanding async batch
+Each batch is polled on its own schedule that starts short and backs off
+(with jitter, up to a cap) until it is finalized, failed or past its
+deadline; waiters are woken as soon as the state is seen. Polls run
+independently, so one slow status call never holds up the other batches,
+and a batch whose status keeps failing backs off harder and is given up
+after POLL_MAX_ERRORS consecutive errors
+"""
+
+import heapq
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from document_api import FINAL_STATES, ProcessingTimeout
+
+POLL_INITIAL_INTERVAL = float(os.environ.get('POLL_INITIAL_INTERVAL', '1'))
+POLL_MAX_INTERVAL = float(os.environ.get('POLL_MAX_INTERVAL', '15'))
+POLL_BACKOFF = float(os.environ.get('POLL_BACKOFF', '1.5'))
+POLL_JITTER = float(os.environ.get('POLL_JITTER', '0.2'))
+POLL_DEADLINE = float(os.environ.get('POLL_DEADLINE', '600'))
+POLL_CONCURRENCY = int(os.environ.get('POLL_CONCURRENCY', '4'))
+POLL_MAX_ERRORS = int(os.environ.get('POLL_MAX_ERRORS', '5'))
+
+
+class BatchWaiter:
+    """Handle for one tracked batch; shared by everyone waiting on the same id"""
+
+    def __init__(self, batch_id, deadline):
+        self.batch_id = batch_id
+        self.deadline = deadline
+        self.execution = None
+        self.interval = None
+        self.polls = 0
+        self.errors = 0  # consecutive failed status calls
+        self.state = None
+        self.batch = None
+        self.error = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def resolved(cls, batch_id, batch):
+        """Waiter for a batch that is already final (e.g. answered synchronously)"""
+        waiter = cls(batch_id, time.monotonic())
+        waiter.state = batch.get('metadata', {}).get('state')
+        waiter._finish(batch)
+        return waiter
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def __deepcopy__(self, memo):
+        # A handle, not data: copies (e.g. single-flight followers) share it
+        return self
+
+    def wait(self, timeout=None):
+        """
+        Block until the batch is final
+
+        Returns:
+            dict: the final BatchResponse
+
+        Raises:
+            ProcessingTimeout: still pending after timeout (or past its deadline)
+            DocumentAPIError: the batch could not be polled
+        """
+        if not self._done.wait(timeout):
+            raise ProcessingTimeout(f"Batch {self.batch_id} not finished after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.batch
+
+    def add_done_callback(self, fn):
+        """Call fn(waiter) once the batch is final (immediately if it already is)"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, batch=None, error=None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.batch = batch
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"⚠️  Batch {self.batch_id} callback failed: {e}")
+
+
+class BatchPoller:
+    """
+    Multiplexed, adaptive batch-status poller
+
+    Usage:
+        poller = BatchPoller(client.get_batch_status)
+        batch = poller.track(batch_id).wait()
+    """
+
+    def __init__(self, fetch_status, initial_interval=POLL_INITIAL_INTERVAL,
+                 max_interval=POLL_MAX_INTERVAL, backoff=POLL_BACKOFF, jitter=POLL_JITTER,
+                 default_deadline=POLL_DEADLINE, concurrency=POLL_CONCURRENCY,
+                 max_errors=POLL_MAX_ERRORS):
+        self.fetch_status = fetch_status
+        self.initial_interval = initial_interval
+        self.max_interval = max(initial_interval, max_interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.default_deadline = default_deadline
+        self.concurrency = max(1, concurrency)
+        self.max_errors = max(1, max_errors)
+        self._waiters = {}
+        self._schedule = []  # heap of (next_poll_at, seq, batch_id)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self.polls = 0
+        self.poll_errors = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.given_up = 0
+
+    def track(self, batch_id, deadline=None):
+        """Start (or join) tracking a batch; returns its BatchWaiter"""
+        with self._cond:
+            waiter = self._waiters.get(batch_id)
+            if waiter is not None:
+                return waiter
+            waiter = BatchWaiter(batch_id, time.monotonic() + (deadline or self.default_deadline))
+            self._waiters[batch_id] = waiter
+            self._push(batch_id, self.initial_interval)
+            self._ensure_thread()
+            self._cond.notify()
+            return waiter
+
+    def _push(self, batch_id, interval):
+        waiter = self._waiters[batch_id]
+        waiter.interval = interval
+        delay = interval * (1 + random.uniform(-self.jitter, self.jitter))
+        self._seq += 1
+        heapq.heappush(self._schedule, (time.monotonic() + delay, self._seq, batch_id))
+        # The loop may be sleeping towards a later poll
+        self._cond.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch-poll')
+            self._thread = threading.Thread(target=self._run, name='batch-poller', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._schedule:
+                    self._cond.wait()
+                due_at = self._schedule[0][0]
+                now = time.monotonic()
+                if due_at > now:
+                    self._cond.wait(due_at - now)
+                    continue
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due.append(heapq.heappop(self._schedule)[2])
+
+            # Not waited on: each poll reschedules its own batch when it is done
+            for batch_id in due:
+                self._executor.submit(self._poll, batch_id)
+
+    def _poll(self, batch_id):
+        waiter = self._waiters.get(batch_id)
+        if waiter is None:
+            return
+        waiter.polls += 1
+        try:
+            batch = self.fetch_status(batch_id)
+            error = None
+        except Exception as e:
+            batch, error = None, e
+
+        with self._cond:
+            self.polls += 1
+            state = batch.get('metadata', {}).get('state') if batch else None
+            waiter.state = state
+            if state in FINAL_STATES:
+                if state == 'failed':
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                del self._waiters[batch_id]
+                finish = (batch, None)
+            elif time.monotonic() >= waiter.deadline:
+                self.timed_out += 1
+                del self._waiters[batch_id]
+                finish = (None, error or ProcessingTimeout(f"Batch {batch_id} still {state or 'unknown'} at its deadline"))
+            elif error is not None:
+                self.poll_errors += 1
+                waiter.errors += 1
+                if waiter.errors >= self.max_errors:
+                    self.given_up += 1
+                    del self._waiters[batch_id]
+                    finish = (None, error)
+                else:
+                    # Back off twice as fast while the status call keeps failing
+                    self._push(batch_id, min(self.max_interval, waiter.interval * self.backoff * 2))
+                    finish = None
+            else:
+                waiter.errors = 0
+                self._push(batch_id, min(self.max_interval, waiter.interval * self.backoff))
+                finish = None
+
+        if finish is not None:
+            waiter._finish(*finish)
+
+    def stats(self):
+        with self._cond:
+            next_poll = self._schedule[0][0] - time.monotonic() if self._schedule else None
+            return {
+                'tracked': len(self._waiters),
+                'nextPollIn': round(max(0.0, next_poll), 2) if next_poll is not None else None,
+                'polls': self.polls,
+                'pollErrors': self.poll_errors,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timedOut': self.timed_out,
+                'givenUp': self.given_up,
+                'initialInterval': self.initial_interval,
+                'maxInterval': self.max_interval
+            }
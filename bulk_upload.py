@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Multi-document uploads: many PDFs in one request, or one ZIP of PDFs
+ZIPs are spooled to disk during the request and their entries streamed out
+one at a time afterwards (never the whole archive in memory); each document
+becomes its own job and the bulk batch tracks per-document status and results
+"""
+
+import os
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime
+
+from upload_spool import CHUNK_SIZE, SpoolError, spool_file, spool_stream
+
+BULK_MAX_DOCUMENTS = int(os.environ.get('BULK_MAX_DOCUMENTS', '200'))
+BULK_MAX_BYTES = int(os.environ.get('BULK_MAX_BYTES', str(500 * 1024 * 1024)))
+BULK_RETENTION_SECONDS = int(os.environ.get('BULK_RETENTION_SECONDS', '3600'))
+
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+def spool_archive(stream, max_bytes=BULK_MAX_BYTES, chunk_size=CHUNK_SIZE, dir=None):
+    """
+    Copy a ZIP upload to a spool file in chunks
+
+    Returns:
+        str: path of the spooled archive
+
+    Raises:
+        SpoolError: empty, oversized or not a ZIP (the partial file is removed)
+    """
+    fd, path = spool_file('.zip', dir)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and not chunk.startswith(ZIP_MAGIC[:len(chunk)]):
+                    raise SpoolError('File is not a ZIP archive')
+                size += len(chunk)
+                if size > max_bytes:
+                    raise SpoolError(f"Archive exceeds the maximum size of {max_bytes} bytes", 413)
+                f.write(chunk)
+        if size == 0:
+            raise SpoolError('Uploaded archive is empty')
+        return path
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+
+
+def _open_zip(archive_path):
+    try:
+        return zipfile.ZipFile(archive_path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise SpoolError(f"Cannot read ZIP archive: {e}")
+
+
+def _pdf_entries(archive, max_documents):
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith('.pdf')
+        and not os.path.basename(info.filename).startswith('.')
+        and not info.filename.startswith('__MACOSX/')
+    ]
+    if not entries:
+        raise SpoolError('ZIP archive contains no PDF files')
+    if len(entries) > max_documents:
+        raise SpoolError(f"ZIP archive has {len(entries)} PDFs, the limit is {max_documents}", 413)
+    return entries
+
+
+def count_zip_pdfs(archive_path, max_documents=BULK_MAX_DOCUMENTS):
+    """
+    Number of PDF entries in a ZIP, from its central directory only (nothing is extracted)
+
+    Raises:
+        SpoolError: unreadable archive, no PDFs or more than max_documents of them
+    """
+    with _open_zip(archive_path) as archive:
+        return len(_pdf_entries(archive, max_documents))
+
+
+def iter_zip_pdfs(archive_path, max_entry_bytes, max_documents=BULK_MAX_DOCUMENTS):
+    """
+    Stream every PDF entry of a ZIP into its own spool file
+
+    Yields:
+        (str, SpooledUpload or None, SpoolError or None): entry name and outcome
+
+    Raises:
+        SpoolError: unreadable archive or more than max_documents PDFs
+    """
+    with _open_zip(archive_path) as archive:
+        for info in _pdf_entries(archive, max_documents):
+            name = os.path.basename(info.filename)
+            if info.file_size > max_entry_bytes:
+                yield name, None, SpoolError(f"Entry exceeds the maximum size of {max_entry_bytes} bytes", 413)
+                continue
+            try:
+                # max_bytes also guards against entries that decompress past their declared size
+                with archive.open(info) as entry:
+                    yield name, spool_stream(entry, max_entry_bytes), None
+            except SpoolError as e:
+                yield name, None, e
+            except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                yield name, None, SpoolError(f"Cannot extract entry: {e}")
+
+
+class BulkDocument:
+    """One document of a bulk batch"""
+
+    def __init__(self, index, filename, upload=None, error=None):
+        self.index = index
+        self.filename = filename
+        self.upload = upload
+        self.size = upload.size if upload else None
+        self.content_hash = upload.sha256 if upload else None
+        self.job = None
+        self.error = error
+
+    @property
+    def status(self):
+        if self.error is not None:
+            return 'rejected'
+        if self.job is None:
+            return 'pending'
+        return self.job.status
+
+    def to_dict(self, include_result=True):
+        data = {
+            'index': self.index,
+            'filename': self.filename,
+            'size': self.size,
+            'contentHash': self.content_hash,
+            'status': self.status,
+            'jobId': self.job.id if self.job else None
+        }
+        error = self.error or (self.job.error if self.job else None)
+        if error:
+            data['error'] = error
+        if include_result and self.job is not None and self.job.status == 'completed':
+            data['result'] = self.job.result
+        return data
+
+
+class BulkBatch:
+    """Handle for a multi-document upload"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.created_at = datetime.now()
+        self.documents = []
+        # Spooled ZIPs still to be extracted: (path, filename, PDF count)
+        self.archives = []
+        self.unextracted = 0
+        self._finished_at = None
+
+    def add(self, filename, upload=None, error=None, extracted=False):
+        """Add a document; extracted=True for one coming out of a queued archive"""
+        document = BulkDocument(len(self.documents), filename, upload, error)
+        self.documents.append(document)
+        if extracted:
+            self.unextracted -= 1
+        return document
+
+    def add_archive(self, path, filename, documents):
+        """Queue a spooled ZIP holding `documents` PDFs for extraction"""
+        self.archives.append((path, filename, documents))
+        self.unextracted += documents
+
+    def finish_archive(self, path, skipped=0):
+        """An archive has been extracted; skipped is how many announced PDFs never came out"""
+        self.unextracted -= skipped
+        self.archives = [archive for archive in self.archives if archive[0] != path]
+
+    def discard(self):
+        """Remove every spool file (the request failed before any job was queued)"""
+        for document in self.documents:
+            if document.upload is not None:
+                document.upload.discard()
+        for path, _, _ in self.archives:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.archives = []
+
+    @property
+    def total(self):
+        return len(self.documents) + self.unextracted
+
+    def counts(self):
+        counts = {}
+        for document in self.documents:
+            counts[document.status] = counts.get(document.status, 0) + 1
+        return counts
+
+    @property
+    def done(self):
+        if self.archives:
+            return False
+        return all(d.status in ('completed', 'failed', 'rejected') for d in self.documents)
+
+    @property
+    def status(self):
+        counts = self.counts()
+        if not self.done:
+            return 'running' if counts.get('running') or counts.get('completed') or counts.get('failed') else 'queued'
+        if counts.get('completed', 0) == len(self.documents):
+            return 'completed'
+        return 'partial' if counts.get('completed') else 'failed'
+
+    def finished_at(self):
+        if self._finished_at is None and self.done:
+            self._finished_at = time.time()
+        return self._finished_at
+
+    def to_dict(self, include_results=True):
+        return {
+            'batchId': self.id,
+            'status': self.status,
+            'createdAt': self.created_at.isoformat(),
+            'total': self.total,
+            'extracting': bool(self.archives),
+            'counts': self.counts(),
+            'documents': [d.to_dict(include_results) for d in self.documents]
+        }
+
+
+class BulkRegistry:
+    """Bulk batches by id, forgotten BULK_RETENTION_SECONDS after they finish"""
+
+    def __init__(self, retention=BULK_RETENTION_SECONDS):
+        self.retention = retention
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def add(self, batch):
+        self._prune()
+        with self._lock:
+            self._batches[batch.id] = batch
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [
+                batch_id for batch_id, batch in self._batches.items()
+                if (batch.finished_at() or cutoff + 1) < cutoff
+            ]
+            for batch_id in expired:
+                del self._batches[batch_id]
+
+    def stats(self):
+        with self._lock:
+            batches = list(self._batches.values())
+        return {
+            'batches': len(batches),
+            'active': sum(1 for b in batches if not b.done),
+            'documents': sum(len(b.documents) for b in batches)
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker for the Swift backend
+After repeated failures or timeouts the circuit opens and callers go straight
+to their fallback instead of waiting out another subprocess timeout; after a
+cool-down a limited number of probe requests decide whether to close it again
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('BREAKER_RESET_TIMEOUT', '30'))
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get('BREAKER_HALF_OPEN_PROBES', '1'))
+# A probe not recorded within this long (its caller died) gives its slot back
+BREAKER_PROBE_TIMEOUT = float(os.environ.get('BREAKER_PROBE_TIMEOUT', '180'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Usage:
+        breaker = CircuitBreaker('swift')
+        if not breaker.allow_request():
+            return fallback()
+        ok = False
+        try:
+            result = call_backend()
+            ok = result is not None
+        finally:
+            breaker.record(ok)           # on the thread that called allow_request()
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, half_open_probes=BREAKER_HALF_OPEN_PROBES,
+                 probe_timeout=BREAKER_PROBE_TIMEOUT):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(1, half_open_probes)
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        # Probe id -> start time; the id is also kept thread-locally for record()
+        self._probes = {}
+        self._probe_seq = 0
+        self.abandoned_probes = 0
+        self.short_circuited = 0
+        self.transitions = deque(maxlen=20)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _transition(self, new_state, reason):
+        print(f"⚡ Circuit '{self.name}' {self.state} -> {new_state} ({reason})")
+        self.transitions.append({
+            'at': datetime.now().isoformat(),
+            'from': self.state,
+            'to': new_state,
+            'reason': reason
+        })
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = time.monotonic()
+        elif new_state == CLOSED:
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def rejecting(self):
+        """True while the circuit is open and still cooling down (does not take a probe)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow_request(self):
+        """
+        Decide whether a call may go to the backend
+        Every True must be followed by record() on the same thread, which
+        gives back the probe slot; probes never recorded expire after
+        probe_timeout
+        """
+        with self._lock:
+            self._local.probe = None
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    return False
+                self._transition(HALF_OPEN, f'{self.reset_timeout:g}s cool-down elapsed')
+
+            if self.state == HALF_OPEN:
+                for probe, started in list(self._probes.items()):
+                    if now - started >= self.probe_timeout:
+                        del self._probes[probe]
+                        self.abandoned_probes += 1
+                if len(self._probes) >= self.half_open_probes:
+                    self.short_circuited += 1
+                    return False
+                self._probe_seq += 1
+                self._probes[self._probe_seq] = now
+                self._local.probe = self._probe_seq
+            return True
+
+    @property
+    def probes_in_flight(self):
+        return len(self._probes)
+
+    def _release_probe(self):
+        """Give back the probe slot this thread took in allow_request(), if any"""
+        probe = getattr(self._local, 'probe', None)
+        if probe is not None:
+            self._local.probe = None
+            self._probes.pop(probe, None)
+
+    def record(self, success):
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def record_success(self):
+        with self._lock:
+            self._release_probe()
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED, 'probe succeeded')
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._release_probe()
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._transition(OPEN, 'probe failed')
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._transition(OPEN, f'{self.consecutive_failures} consecutive failures')
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutiveFailures': self.consecutive_failures,
+                'failureThreshold': self.failure_threshold,
+                'resetTimeout': self.reset_timeout,
+                'probeIn': round(retry_in, 1) if retry_in is not None else None,
+                'probesInFlight': len(self._probes),
+                'abandonedProbes': self.abandoned_probes,
+                'shortCircuited': self.short_circuited,
+                'transitions': list(self.transitions)
+            }
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+In-process client for the AI Document Processor API
+Python counterpart of the Swift ManifestExceptionProcessor class; requests
+share a pool of keep-alive connections instead of a new subprocess, login
+and TLS handshake per document
+"""
+
+import base64
+import http.client
+import json
+import os
+import queue
+import ssl
+import threading
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from token_cache import TokenManager
+
+DOC_API_BASE_URL = os.environ.get('DOC_API_BASE_URL', 'https://docker.nacompanies.com:452')
+DOC_API_USERNAME = os.environ.get('DOC_API_USERNAME', 'aidoctest')
+DOC_API_PASSWORD = os.environ.get('DOC_API_PASSWORD', 'AiD0cTest2025!')
+DOC_API_POOL_SIZE = int(os.environ.get('DOC_API_POOL_SIZE', '4'))
+DOC_API_TIMEOUT = float(os.environ.get('DOC_API_TIMEOUT', '120'))
+# Hybrid processing: try sync for this long, go straight to async above the size threshold
+DOC_API_SYNC_BUDGET = float(os.environ.get('DOC_API_SYNC_BUDGET', '30'))
+DOC_API_ASYNC_THRESHOLD = int(os.environ.get('DOC_API_ASYNC_THRESHOLD', str(5 * 1024 * 1024)))
+# The test environment uses a self-signed certificate (the Swift client accepts it too)
+DOC_API_VERIFY_TLS = os.environ.get('DOC_API_VERIFY_TLS', '0').lower() in ('1', 'true', 'yes')
+
+FINAL_STATES = ('finalized', 'failed')
+
+
+class DocumentAPIError(Exception):
+    """Raised when the API is unreachable or answers with an error"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AuthenticationError(DocumentAPIError):
+    """Raised when /api/v1/token rejects the credentials"""
+
+
+class ProcessingTimeout(DocumentAPIError):
+    """Raised when a batch does not reach a final state in time"""
+
+
+class RequestTimeout(DocumentAPIError):
+    """Raised when the server does not answer one request in time"""
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one host, shared by all threads
+
+    Usage:
+        pool = ConnectionPool('https://host:452', size=4)
+        status, body = pool.request('GET', '/api/v1/health')
+    """
+
+    # Errors that mean a reused keep-alive connection was closed by the server
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                    ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, base_url, size=DOC_API_POOL_SIZE, timeout=DOC_API_TIMEOUT,
+                 verify_tls=DOC_API_VERIFY_TLS):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._ssl_context = None
+        if self.scheme == 'https':
+            self._ssl_context = ssl.create_default_context()
+            if not verify_tls:
+                self._ssl_context.check_hostname = False
+                self._ssl_context.verify_mode = ssl.CERT_NONE
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.requests = 0
+        self.stale = 0
+
+    def _connect(self):
+        if self.scheme == 'https':
+            connection = http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=self._ssl_context
+            )
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        with self._lock:
+            self.created += 1
+        return connection
+
+    def _checkout(self):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect(), False
+        with self._lock:
+            self.reused += 1
+        return connection, True
+
+    def request(self, method, path, body=None, headers=None, timeout=None):
+        """
+        Send one request and read the whole response
+
+        Returns:
+            (int, bytes): status code and response body
+        """
+        if not self._slots.acquire(timeout=timeout or self.timeout):
+            raise DocumentAPIError(f"No API connection became free within {timeout or self.timeout:.0f}s")
+        try:
+            with self._lock:
+                self.requests += 1
+            while True:
+                connection, reused = self._checkout()
+                self._set_timeout(connection, timeout or self.timeout)
+                try:
+                    connection.request(method, self.base_path + path, body=body, headers=headers or {})
+                    response = connection.getresponse()
+                    data = response.read()
+                except self.STALE_ERRORS as e:
+                    connection.close()
+                    if reused:
+                        # The server dropped an idle connection; retry once on a fresh one
+                        with self._lock:
+                            self.stale += 1
+                        continue
+                    raise DocumentAPIError(f"{method} {path} failed: {e}")
+                except TimeoutError:
+                    connection.close()
+                    raise RequestTimeout(f"{method} {path} timed out after {timeout or self.timeout:g}s")
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    raise DocumentAPIError(f"{method} {path} failed: {e}")
+
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._set_timeout(connection, self.timeout)
+                    self._idle.put(connection)
+                return response.status, data
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _set_timeout(connection, timeout):
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': self._idle.qsize(),
+                'created': self.created,
+                'reused': self.reused,
+                'stale': self.stale,
+                'requests': self.requests
+            }
+
+
+class DocumentAPIClient:
+    """
+    AI Document Processor API client
+
+    Usage:
+        client = DocumentAPIClient()
+        batch = client.process_sync('/tmp/manifest.pdf', identifier='EXCEPTION_001')
+        batch = client.wait_for_completion(client.process_async(path, 'X')['metadata']['identifier'])
+    """
+
+    def __init__(self, base_url=DOC_API_BASE_URL, username=DOC_API_USERNAME,
+                 password=DOC_API_PASSWORD, pool_size=DOC_API_POOL_SIZE,
+                 timeout=DOC_API_TIMEOUT, verify_tls=DOC_API_VERIFY_TLS):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.pool = ConnectionPool(base_url, size=pool_size, timeout=timeout, verify_tls=verify_tls)
+        # Shared with other server processes through the token cache file
+        self.tokens = TokenManager(self._fetch_token, key=f'{username}@{base_url}')
+        self._poller = None
+        self._poller_lock = threading.Lock()
+
+    # Authentication
+
+    @property
+    def token(self):
+        return self.tokens.token
+
+    def authenticate(self):
+        """Fetch a new bearer token from /api/v1/token (and cache it for later calls)"""
+        return self.tokens.refresh(stale_token=self.tokens.token)
+
+    def _fetch_token(self):
+        body = urlencode({'username': self.username, 'password': self.password})
+        status, data = self.pool.request(
+            'POST', '/api/v1/token', body=body,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+        if status != 200:
+            raise AuthenticationError(f"Authentication failed (HTTP {status})", status)
+        try:
+            payload = json.loads(data)
+            # The Swift TokenResponse decodes camelCase; OAuth2 servers use snake_case
+            token = payload.get('accessToken') or payload['access_token']
+        except (ValueError, KeyError, AttributeError) as e:
+            raise AuthenticationError(f"Invalid token response: {e}", status)
+        return token, payload.get('expiresIn') or payload.get('expires_in')
+
+    def _call(self, method, path, payload=None, timeout=None):
+        body = None
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+
+        token = self.tokens.get()
+        headers['Authorization'] = f'Bearer {token}'
+        status, data = self.pool.request(method, path, body=body, headers=headers, timeout=timeout)
+        if status == 401:
+            # Revoked or expired early: re-authenticate once and replay
+            self.tokens.invalidate(token)
+            headers['Authorization'] = f'Bearer {self.tokens.get()}'
+            status, data = self.pool.request(method, path, body=body, headers=headers, timeout=timeout)
+        return self._decode(status, data)
+
+    @staticmethod
+    def _decode(status, data):
+        if status != 200:
+            try:
+                detail = json.loads(data).get('detail')
+            except (ValueError, AttributeError):
+                detail = None
+            raise DocumentAPIError(detail or f"HTTP {status}", status)
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise DocumentAPIError(f"Invalid JSON response: {e}", status)
+
+    # Processing
+
+    @staticmethod
+    def batch_request(pdf_path, identifier, execution_type, batch_identifier=None):
+        """BatchRequest body as sent by the Swift client"""
+        with open(pdf_path, 'rb') as f:
+            document = base64.b64encode(f.read()).decode('ascii')
+        return {
+            'batchIdentifier': batch_identifier,
+            'batchType': 'manifestExceptions',
+            'documentType': 'manifestException',
+            'processingType': 'single_pass',
+            'executionType': execution_type,
+            'identifier': identifier,
+            'fileType': 'pdf',
+            'document': document
+        }
+
+    @staticmethod
+    def batch_request_many(documents, batch_identifier, execution_type='async'):
+        """
+        One BatchRequest for several documents: the usual batch fields plus a
+        `documents` list of {identifier, fileType, document}
+        """
+        items = []
+        for pdf_path, identifier in documents:
+            with open(pdf_path, 'rb') as f:
+                items.append({
+                    'identifier': identifier,
+                    'fileType': 'pdf',
+                    'document': base64.b64encode(f.read()).decode('ascii')
+                })
+        return {
+            'batchIdentifier': batch_identifier,
+            'batchType': 'manifestExceptions',
+            'documentType': 'manifestException',
+            'processingType': 'single_pass',
+            'executionType': execution_type,
+            'documents': items
+        }
+
+    def process_sync(self, pdf_path, identifier):
+        """Process a document and wait for the result in the same request"""
+        return self._call('POST', '/api/v1/batches', self.batch_request(pdf_path, identifier, 'sync'))
+
+    def process_async(self, pdf_path, identifier, batch_identifier=None):
+        """Submit a document; poll get_batch_status()/wait_for_completion() for the result"""
+        batch_identifier = batch_identifier or str(uuid.uuid4())
+        return self._call(
+            'POST', '/api/v1/batches',
+            self.batch_request(pdf_path, identifier, 'async', batch_identifier)
+        )
+
+    def process_many(self, documents, batch_identifier=None):
+        """
+        Submit several (pdf_path, identifier) documents as one async batch
+        Finished multi-document batches list each result under `documents`
+        """
+        batch_identifier = batch_identifier or str(uuid.uuid4())
+        return self._call('POST', '/api/v1/batches', self.batch_request_many(documents, batch_identifier))
+
+    def process(self, pdf_path, identifier, force_async=False, sync_budget=DOC_API_SYNC_BUDGET,
+                async_threshold=DOC_API_ASYNC_THRESHOLD, timeout=None):
+        """
+        Hybrid processing with automatic sync-to-async escalation
+        Small documents are tried with executionType sync under sync_budget;
+        large ones (or force_async) are submitted async and tracked by the
+        shared poller. A sync attempt that runs out of budget may already have
+        been accepted, so the batch is looked up first and only resubmitted
+        async (under the same batchIdentifier) if the server does not know it
+
+        Returns:
+            BatchWaiter: one handle either way; .execution is 'sync', 'async' or 'escalated'
+        """
+        from batch_poller import BatchWaiter
+
+        batch_identifier = str(uuid.uuid4())
+        execution = 'async'
+        if not force_async and os.path.getsize(pdf_path) < async_threshold:
+            request = self.batch_request(pdf_path, identifier, 'sync', batch_identifier)
+            try:
+                batch = self._call('POST', '/api/v1/batches', request, timeout=sync_budget)
+                if batch.get('metadata', {}).get('state') in FINAL_STATES:
+                    waiter = BatchWaiter.resolved(self._batch_id(batch, batch_identifier), batch)
+                    waiter.execution = 'sync'
+                    return waiter
+                # Accepted but not finished within the request: poll it like an async batch
+                return self._track(batch, batch_identifier, timeout, 'escalated')
+            except RequestTimeout:
+                print(f"⏩ Sync budget of {sync_budget:g}s exceeded, escalating {identifier} to async")
+                execution = 'escalated'
+                try:
+                    batch = self.get_batch_status(batch_identifier)
+                except DocumentAPIError as e:
+                    if e.status_code != 404:
+                        raise
+                else:
+                    # The timed-out request was accepted: poll it instead of submitting it twice
+                    return self._track(batch, batch_identifier, timeout, execution)
+
+        batch = self.process_async(pdf_path, identifier, batch_identifier)
+        return self._track(batch, batch_identifier, timeout, execution)
+
+    @staticmethod
+    def _batch_id(batch, batch_identifier):
+        """Identifier the server gave the batch (ours unless it assigned its own)"""
+        return (batch or {}).get('metadata', {}).get('identifier') or batch_identifier
+
+    def _track(self, batch, batch_identifier, timeout, execution):
+        from batch_poller import BatchWaiter
+
+        batch_id = self._batch_id(batch, batch_identifier)
+        if batch.get('metadata', {}).get('state') in FINAL_STATES:
+            waiter = BatchWaiter.resolved(batch_id, batch)
+        else:
+            waiter = self.track_batch(batch_id, timeout)
+        waiter.execution = execution
+        return waiter
+
+    def get_batch_status(self, batch_id):
+        return self._call('GET', f'/api/v1/batches/{batch_id}')
+
+    @property
+    def poller(self):
+        """Shared status poller for every batch this client waits on"""
+        with self._poller_lock:
+            if self._poller is None:
+                from batch_poller import BatchPoller
+                self._poller = BatchPoller(self.get_batch_status)
+            return self._poller
+
+    def track_batch(self, batch_id, timeout=None):
+        """Hand a batch to the shared poller; returns a BatchWaiter"""
+        return self.poller.track(batch_id, deadline=timeout)
+
+    def wait_for_completion(self, batch_id, timeout=300):
+        """Block until the batch is finalized or failed"""
+        return self.track_batch(batch_id, timeout).wait(timeout)
+
+    def health_check(self):
+        try:
+            status, _ = self.pool.request('GET', '/api/v1/health')
+        except DocumentAPIError:
+            return False
+        return status == 200
+
+    def stats(self):
+        return {
+            'baseUrl': self.base_url,
+            'authenticated': self.token is not None,
+            'token': self.tokens.stats(),
+            'connections': self.pool.stats(),
+            'poller': self._poller.stats() if self._poller is not None else None
+        }
+
+    def close(self):
+        self.tokens.stop()
+        self.pool.close()
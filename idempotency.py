@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Idempotency keys for upload endpoints
+A client-chosen Idempotency-Key maps to the job its first request created,
+so retried uploads (scanners on flaky Wi-Fi) get that job's response instead
+of processing the document again. Each key is tied to a fingerprint of the
+request (file contents and name), so reusing it for a different upload is an
+error rather than a silent replay. Keys live next to the job store in
+SQLite, which every server process shares, and expire after IDEMPOTENCY_TTL
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from job_queue import DEFAULT_JOB_RETENTION
+from job_store import JOB_STORE_PATH, connect
+
+# Replays need the job's result, which the job store keeps for JOB_RETENTION_SECONDS
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', str(DEFAULT_JOB_RETENTION)))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', '100000'))
+# A claim with no job attached after this long was abandoned (e.g. the process died mid-upload)
+IDEMPOTENCY_PENDING_TIMEOUT = 300
+MAX_KEY_LENGTH = 255
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    job_id TEXT,
+    fingerprint TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created_at ON idempotency_keys (created_at);
+"""
+
+
+class FingerprintMismatch(Exception):
+    """Raised when a key is reused for a request with different contents"""
+
+
+def valid_key(key):
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+def request_fingerprint(filename, content_hash):
+    """SHA-256 over the upload's filename and the SHA-256 of its body"""
+    return hashlib.sha256(f"{filename}\n{content_hash}".encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded, expiring Idempotency-Key -> job id map
+
+    Usage:
+        store = IdempotencyStore()
+        claimed, job_id = store.claim(key, request_fingerprint(filename, sha256))
+        if claimed:
+            job = submit(...)            # first request with this key
+            store.attach(key, job.id)    # or store.release(key) if it failed
+        elif job_id:
+            ...                          # replay job_id's response
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, ttl=IDEMPOTENCY_TTL, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.path = path
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._claims = 0
+        self.replays = 0
+        self.mismatches = 0
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(idempotency_keys)')]
+        if 'fingerprint' not in columns:
+            # Stores created before keys were tied to a request
+            conn.execute('ALTER TABLE idempotency_keys ADD COLUMN fingerprint TEXT')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def claim(self, key, fingerprint=None):
+        """
+        Take the key for this request unless a live entry holds it
+
+        Returns:
+            (bool, str or None): (True, None) when claimed; otherwise (False, job id),
+            where the job id is None while the first request is still being queued
+
+        Raises:
+            FingerprintMismatch: the key is held by a request with another fingerprint
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'DELETE FROM idempotency_keys WHERE key = ? AND (expires_at < ? OR (job_id IS NULL AND created_at < ?))',
+            (key, now, now - IDEMPOTENCY_PENDING_TIMEOUT)
+        )
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO idempotency_keys (key, job_id, fingerprint, created_at, expires_at)'
+            ' VALUES (?, NULL, ?, ?, ?)',
+            (key, fingerprint, now, now + self.ttl)
+        )
+        if cursor.rowcount == 1:
+            self._claims += 1
+            if self._claims % PRUNE_EVERY == 0:
+                self.prune()
+            return True, None
+
+        row = conn.execute('SELECT job_id, fingerprint FROM idempotency_keys WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            # Expired and deleted by someone else in between
+            return self.claim(key, fingerprint)
+        if fingerprint and row['fingerprint'] and row['fingerprint'] != fingerprint:
+            self.mismatches += 1
+            raise FingerprintMismatch(f"Idempotency-Key {key} was used for a different request")
+        if row['job_id'] is not None:
+            self.replays += 1
+        return False, row['job_id']
+
+    def attach(self, key, job_id):
+        """Record the job created by the request that claimed the key"""
+        self._conn().execute('UPDATE idempotency_keys SET job_id = ? WHERE key = ?', (job_id, key))
+
+    def release(self, key):
+        """Give the key up (the claiming request failed, or its job is gone) so a retry starts afresh"""
+        self._conn().execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+    def prune(self):
+        """Drop expired keys, then the oldest ones beyond max_keys"""
+        conn = self._conn()
+        conn.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (time.time(),))
+        excess = conn.execute('SELECT COUNT(*) FROM idempotency_keys').fetchone()[0] - self.max_keys
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM idempotency_keys WHERE key IN'
+                ' (SELECT key FROM idempotency_keys ORDER BY created_at LIMIT ?)',
+                (excess,)
+            )
+
+    def stats(self):
+        return {
+            'keys': self._conn().execute('SELECT COUNT(*) FROM idempotency_keys').fetchone()[0],
+            'maxKeys': self.max_keys,
+            'ttl': self.ttl,
+            'replays': self.replays,
+            'mismatches': self.mismatches
+        }
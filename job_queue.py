@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+In-process job executor for PDF processing
+Uploads are queued as jobs so request threads return immediately;
+results are picked up later by job id
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+DEFAULT_JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+DEFAULT_JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '32'))
+DEFAULT_JOB_RETENTION = int(os.environ.get('JOB_RETENTION_SECONDS', '3600'))
+
+
+class QueueFull(Exception):
+    """Raised when the bounded job queue cannot take another job"""
+
+
+class Job:
+    """A single unit of work and its outcome"""
+
+    def __init__(self, fn, args, kwargs, filename=None, process_type='sync'):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.filename = filename
+        self.process_type = process_type
+        self.status = 'queued'
+        self.stage = None
+        self.context = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns True if it did"""
+        return self._done.wait(timeout)
+
+    def start(self, stage=None):
+        self.stage = stage
+        if self.started_at is None:
+            self.status = 'running'
+            self.started_at = datetime.now()
+
+    def finish(self, result=None, error=None):
+        """Record the outcome and wake waiters"""
+        if error is None:
+            self.result = result
+            self.status = 'completed'
+        else:
+            self.error = str(error)
+            self.status = 'failed'
+        self.finished_at = datetime.now()
+        # Drop references to the arguments (temp paths, file handles)
+        self.fn = self.args = self.kwargs = None
+        self.context = {}
+        self._done.set()
+
+    def run(self):
+        self.start()
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.finish(error=e)
+        else:
+            self.finish(result)
+
+    def to_dict(self, include_result=True):
+        data = {
+            'jobId': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'processType': self.process_type,
+            'stage': self.stage,
+            'createdAt': self.created_at.isoformat(),
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == 'completed':
+            data['result'] = self.result
+        return data
+
+
+class JobExecutor:
+    """
+    Fixed set of worker threads fed from a bounded queue
+
+    Usage:
+        executor = JobExecutor(workers=4, max_queue=32)
+        job = executor.submit(process_file, path, filename=name)
+        executor.get(job.id).to_dict()
+    """
+
+    def __init__(self, workers=DEFAULT_JOB_WORKERS, max_queue=DEFAULT_JOB_QUEUE_SIZE,
+                 retention=DEFAULT_JOB_RETENTION):
+        self.workers = max(1, int(workers))
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self.submitted = 0
+        self.rejected = 0
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'job-worker-{index}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._started = True
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args, filename=None, process_type='sync', **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return its Job at once
+
+        Raises:
+            QueueFull: the queue is at capacity; the caller should retry later
+        """
+        self._start()
+        self._prune()
+        job = Job(fn, args, kwargs, filename=filename, process_type=process_type)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self.rejected += 1
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} waiting)")
+        with self._lock:
+            self.submitted += 1
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.done and job.finished_at.timestamp() < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            'workers': self.workers,
+            'queueDepth': self._queue.qsize(),
+            'queueCapacity': self._queue.maxsize,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'jobs': statuses
+        }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Durable job store in SQLite (WAL mode)
+Every job is recorded with its state, spool file, content hash and, once it
+has been accepted upstream, its async batch id, so a restarted server can
+re-enqueue jobs that were never sent, resume polling for batches that were,
+and still answer job status requests from before the restart
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from job_queue import DEFAULT_JOB_RETENTION
+
+# Durable state lives next to the app by default: temp directories are often wiped on reboot
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join(DATA_DIR, 'jobs.db'))
+# Finished jobs are pruned every this many inserts
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT,
+    process_type TEXT NOT NULL,
+    state TEXT NOT NULL,
+    spool_path TEXT,
+    file_size INTEGER,
+    content_hash TEXT,
+    bypass_cache INTEGER NOT NULL DEFAULT 0,
+    terminal TEXT,
+    batch_id TEXT,
+    identifier TEXT,
+    execution TEXT,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+"""
+
+# queued: in this process's pipeline, not yet accepted upstream
+# sent: accepted upstream as an async batch, result pending
+UNFINISHED_STATES = ('queued', 'sent')
+
+
+def process_owner():
+    """host:pid:nonce of the current process (the nonce tells a restart that reused the pid apart)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def owner_alive(owner, current):
+    """False only when owner is a process on this host that no longer exists"""
+    if owner == current:
+        return True
+    host, _, rest = (owner or '').partition(':')
+    pid = rest.partition(':')[0]
+    if not host or not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        # Jobs of another machine are left to that machine
+        return True
+    if int(pid) == os.getpid():
+        # An earlier incarnation that had our pid (e.g. pid 1 in a container)
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def connect(path):
+    """Autocommit connection (each statement is its own transaction) in WAL mode"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value).isoformat() if value else None
+
+
+class JobStore:
+    """
+    SQLite-backed record of every job
+
+    Usage:
+        store = JobStore('/var/lib/manifests/jobs.db')
+        store.add(job)
+        store.record_batch(job.id, batch_id, identifier, 'async')
+        store.finish(job.id, result=result)
+        for row in store.claim_orphans(): ...
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, retention=DEFAULT_JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        self.owner = process_owner()
+        self._local = threading.local()
+        self._inserts = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+        if 'terminal' not in columns:
+            # Stores created before jobs carried the receiving terminal
+            conn.execute('ALTER TABLE jobs ADD COLUMN terminal TEXT')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def add(self, job):
+        """Record a newly submitted job (a resumed job keeps its existing row)"""
+        context = job.context
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR IGNORE INTO jobs (id, filename, process_type, state, spool_path, file_size,'
+            ' content_hash, bypass_cache, terminal, owner, created_at, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job.id, job.filename, job.process_type, 'queued', context.get('path'), context.get('size'),
+             context.get('content_hash'), int(bool(context.get('bypass_cache'))), context.get('terminal'),
+             self.owner, now, now)
+        )
+        self._inserts += 1
+        if self._inserts % PRUNE_EVERY == 0:
+            self.prune()
+
+    def remove(self, job_id):
+        """Forget a job that was never accepted (e.g. the queue was full)"""
+        self._conn().execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def record_batch(self, job_id, batch_id, identifier, execution):
+        """The job's document was accepted upstream as an async batch"""
+        self._conn().execute(
+            "UPDATE jobs SET state = 'sent', batch_id = ?, identifier = ?, execution = ?, updated_at = ?"
+            ' WHERE id = ?',
+            (batch_id, identifier, execution, time.time(), job_id)
+        )
+
+    def finish(self, job_id, result=None, error=None):
+        now = time.time()
+        self._conn().execute(
+            'UPDATE jobs SET state = ?, result = ?, error = ?, spool_path = NULL,'
+            ' updated_at = ?, finished_at = ? WHERE id = ?',
+            ('failed' if error is not None else 'completed',
+             json.dumps(result) if error is None else None,
+             str(error) if error is not None else None,
+             now, now, job_id)
+        )
+
+    def get(self, job_id):
+        row = self._conn().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def to_dict(self, row, include_result=True):
+        """Job status in the same shape as Job.to_dict()"""
+        state = row['state']
+        data = {
+            'jobId': row['id'],
+            'status': state if state in ('completed', 'failed') else ('running' if state == 'sent' else 'queued'),
+            'filename': row['filename'],
+            'processType': row['process_type'],
+            'stage': None,
+            'createdAt': _timestamp(row['created_at']),
+            'startedAt': None,
+            'finishedAt': _timestamp(row['finished_at'])
+        }
+        if row['batch_id']:
+            data['batchId'] = row['batch_id']
+        if row['error']:
+            data['error'] = row['error']
+        if include_result and state == 'completed' and row['result']:
+            data['result'] = json.loads(row['result'])
+        return data
+
+    def claim_orphans(self):
+        """
+        Take over unfinished jobs whose owning process is gone
+
+        Returns:
+            list: job rows (dicts), jobs already sent upstream first
+        """
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at', UNFINISHED_STATES
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            if owner_alive(row['owner'], self.owner):
+                continue
+            # Compare-and-set, so two restarting processes never both take a job
+            cursor = conn.execute(
+                'UPDATE jobs SET owner = ?, updated_at = ? WHERE id = ? AND owner IS ?',
+                (self.owner, time.time(), row['id'], row['owner'])
+            )
+            if cursor.rowcount == 1:
+                claimed.append(dict(row, owner=self.owner))
+        claimed.sort(key=lambda row: row['state'] != 'sent')
+        return claimed
+
+    def prune(self):
+        """Delete finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention
+        self._conn().execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,))
+
+    def stats(self):
+        counts = dict(self._conn().execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        return {
+            'path': self.path,
+            'jobs': counts
+        }
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Micro-batching of independent async uploads into shared upstream batches
+Documents arriving within a short window (or until a count/byte cap is hit)
+are submitted together in one request, the batch is polled once, and each
+caller's own document result is fanned back out to its handle. If the server
+does not list per-document results, the batcher falls back to one batch per
+document
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from batch_poller import BatchWaiter, POLL_DEADLINE
+from document_api import DocumentAPIError
+
+BATCH_WINDOW = float(os.environ.get('BATCH_WINDOW', '0.5'))
+BATCH_MAX_DOCUMENTS = int(os.environ.get('BATCH_MAX_DOCUMENTS', '10'))
+BATCH_MAX_BYTES = int(os.environ.get('BATCH_MAX_BYTES', str(20 * 1024 * 1024)))
+
+
+class _OpenBatch:
+    def __init__(self):
+        self.batch_id = str(uuid.uuid4())
+        self.opened_at = time.monotonic()
+        self.documents = []  # (pdf_path, identifier, handle, on_sent)
+        self.size = 0
+
+
+def document_result(batch, identifier, single):
+    """
+    One document's BatchResponse out of a (possibly multi-document) batch
+    Multi-document batches list per-document outputs under `documents`;
+    a batch of one carries its output directly
+    """
+    for document in batch.get('documents') or []:
+        if document.get('identifier') == identifier:
+            return {
+                'metadata': dict(batch.get('metadata', {}), state=document.get('state', batch['metadata'].get('state'))),
+                'output': document.get('output')
+            }
+    if single:
+        return batch
+    return None
+
+
+class MicroBatcher:
+    """
+    Groups async submissions into upstream batches
+
+    Usage:
+        batcher = MicroBatcher(client)
+        handle = batcher.submit('/tmp/a.pdf', 'WEB_1')   # BatchWaiter for this document
+        batch = handle.wait(600)
+    """
+
+    def __init__(self, client, window=BATCH_WINDOW, max_documents=BATCH_MAX_DOCUMENTS,
+                 max_bytes=BATCH_MAX_BYTES, deadline=POLL_DEADLINE):
+        self.client = client
+        self.window = window
+        self.max_documents = max(1, max_documents)
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self._open = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.documents = 0
+        self.full_flushes = 0
+        self.submit_errors = 0
+        # Cleared once the server shows it cannot answer per document
+        self.grouping = True
+        self.fallbacks = 0
+
+    def submit(self, pdf_path, identifier, on_sent=None):
+        """
+        Queue one document; returns a BatchWaiter resolved with its own BatchResponse
+        on_sent(batch_id) is called once the document has been accepted upstream
+        """
+        size = os.path.getsize(pdf_path)
+        handle = BatchWaiter(None, time.monotonic() + self.deadline)
+        handle.execution = 'micro-batch'
+
+        with self._lock:
+            if self._open is not None and self._open.size + size > self.max_bytes:
+                self._flush_locked()
+            if self._open is None:
+                self._open = _OpenBatch()
+                timer = threading.Timer(self.window, self._flush_expired, args=(self._open,))
+                timer.daemon = True
+                timer.start()
+            batch = self._open
+            handle.batch_id = batch.batch_id
+            batch.documents.append((pdf_path, identifier, handle, on_sent))
+            batch.size += size
+            self.documents += 1
+            if len(batch.documents) >= self.max_documents:
+                self.full_flushes += 1
+                self._flush_locked()
+        return handle
+
+    def _flush_expired(self, batch):
+        with self._lock:
+            if self._open is batch:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        batch, self._open = self._open, None
+        if batch is None:
+            return
+        self.batches += 1
+        threading.Thread(target=self._send, args=(batch,), name='micro-batch', daemon=True).start()
+
+    def _send(self, batch):
+        if len(batch.documents) == 1 or not self.grouping:
+            for document in batch.documents:
+                self._send_one(document)
+            return
+
+        try:
+            response = self.client.process_many(
+                [(pdf_path, identifier) for pdf_path, identifier, _, _ in batch.documents], batch.batch_id
+            )
+        except DocumentAPIError as e:
+            if e.status_code in (400, 422):
+                # The server does not take several documents per request
+                self._stop_grouping(f"grouped request rejected: {e}")
+                for document in batch.documents:
+                    self._send_one(document)
+            else:
+                self._fail(batch.documents, e)
+            return
+        except OSError as e:
+            self._fail(batch.documents, DocumentAPIError(str(e)))
+            return
+
+        batch_id = response.get('metadata', {}).get('identifier') or batch.batch_id
+        print(f"📦 Submitted micro-batch {batch_id[:8]} with {len(batch.documents)} documents")
+        self._track(batch_id, batch.documents)
+
+    def _send_one(self, document):
+        """Submit one document as a batch of its own"""
+        pdf_path, identifier, handle, on_sent = document
+        try:
+            response = self.client.process_async(pdf_path, identifier)
+        except DocumentAPIError as e:
+            self._fail([document], e)
+            return
+        except OSError as e:
+            self._fail([document], DocumentAPIError(str(e)))
+            return
+        self._track(response['metadata']['identifier'], [document])
+
+    def _track(self, batch_id, documents):
+        for _, _, handle, on_sent in documents:
+            handle.batch_id = batch_id
+            if on_sent is not None:
+                on_sent(batch_id)
+        waiter = self.client.track_batch(batch_id, self.deadline)
+        waiter.add_done_callback(lambda done: self._fan_out(done, documents))
+
+    def _fail(self, documents, error):
+        with self._lock:
+            self.submit_errors += len(documents)
+        for _, _, handle, _ in documents:
+            handle._finish(error=error)
+
+    def _stop_grouping(self, reason):
+        with self._lock:
+            if not self.grouping:
+                return
+            self.grouping = False
+        print(f"📦 Micro-batching falls back to one batch per document ({reason})")
+
+    def _fan_out(self, waiter, documents):
+        if waiter.error is not None:
+            for _, _, handle, _ in documents:
+                handle._finish(error=waiter.error)
+            return
+
+        single = len(documents) == 1
+        missing = []
+        for document in documents:
+            _, identifier, handle, _ = document
+            result = document_result(waiter.batch, identifier, single)
+            if result is not None:
+                handle.state = result['metadata'].get('state')
+                handle._finish(result)
+            elif waiter.batch.get('metadata', {}).get('state') == 'failed':
+                handle.state = 'failed'
+                handle._finish(waiter.batch)
+            else:
+                missing.append(document)
+
+        if missing:
+            # Finished without per-document results: ask for each document on its own
+            self._stop_grouping(f"batch {waiter.batch_id[:8]} has no per-document results")
+            with self._lock:
+                self.fallbacks += len(missing)
+            threading.Thread(
+                target=lambda: [self._send_one(document) for document in missing],
+                name='micro-batch-fallback', daemon=True
+            ).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window': self.window,
+                'maxDocuments': self.max_documents,
+                'maxBytes': self.max_bytes,
+                'openDocuments': len(self._open.documents) if self._open else 0,
+                'batches': self.batches,
+                'documents': self.documents,
+                'averageBatchSize': round(self.documents / self.batches, 2) if self.batches else None,
+                'fullFlushes': self.full_flushes,
+                'submitErrors': self.submit_errors,
+                'grouping': self.grouping,
+                'fallbacks': self.fallbacks
+            }
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the AI Document Processor API
+Implements /api/v1/token, /api/v1/batches and /api/v1/health with canned
+BatchResponse data, so the Python API backend can be exercised offline:
+
+    python3 mock_document_api.py 8452
+    DOC_API_BASE_URL=http://127.0.0.1:8452 PROCESSING_BACKEND=api python3 stable_web_app.py
+"""
+
+import base64
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MOCK_TOKEN_PREFIX = 'mock-token-'
+
+
+class MockDocumentAPI:
+    """
+    Threaded stand-in server
+
+    Usage:
+        api = MockDocumentAPI(async_delay=2).start()
+        client = DocumentAPIClient(base_url=api.base_url)
+        ...
+        api.stop()
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, async_delay=2.0, sync_delay=0.0,
+                 username='aidoctest', password='AiD0cTest2025!', token_ttl=3600,
+                 list_documents=True):
+        self.async_delay = async_delay
+        self.sync_delay = sync_delay
+        # False: answer like a server that keeps one output per batch
+        self.list_documents = list_documents
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.batches = {}
+        self.tokens = {}
+        self.counts = {'token': 0, 'batches': 0, 'status': 0, 'health': 0, 'connections': 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def revoke_tokens(self):
+        """Invalidate every issued token (the next call gets a 401)"""
+        with self._lock:
+            self.tokens.clear()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _issue_token(self):
+        """Unsigned JWT-shaped token carrying an `exp` claim"""
+        expires_at = time.time() + self.token_ttl
+
+        def segment(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b'=').decode()
+
+        token = '.'.join([
+            segment({'alg': 'none', 'typ': 'JWT'}),
+            segment({'sub': self.username, 'exp': int(expires_at), 'jti': uuid.uuid4().hex}),
+            MOCK_TOKEN_PREFIX + 'signature'
+        ])
+        with self._lock:
+            self.tokens[token] = expires_at
+        return token
+
+    def _token_valid(self, token):
+        with self._lock:
+            expires = self.tokens.get(token)
+        return expires is not None and expires > time.time()
+
+    def _batch_response(self, batch):
+        state = batch['state']
+        if state == 'processing' and time.monotonic() >= batch['ready_at']:
+            state = batch['state'] = 'finalized'
+        response = {
+            'metadata': {
+                'identifier': batch['batchIdentifier'],
+                'originalFilename': batch['identifier'],
+                'state': state,
+                'result': 'success' if state == 'finalized' else 'pending',
+                'createdAt': batch['createdAt'],
+                'stateUpdatedAt': datetime.now().isoformat(),
+                'documentCount': len(batch['documents']),
+                'processingMode': batch['executionType'],
+                'batchType': 'manifestExceptions'
+            },
+            'output': None
+        }
+        if state == 'finalized':
+            response['output'] = batch['output']
+            if len(batch['documents']) > 1 and self.list_documents:
+                # Batches of several documents also list each document's output
+                response['documents'] = [
+                    {'identifier': identifier, 'state': state, 'output': output}
+                    for identifier, output in batch['documents'].items()
+                ]
+        return response
+
+    @staticmethod
+    def _canned_output():
+        shipments = []
+        for _ in range(random.randint(3, 8)):
+            expected = random.randint(1, 20)
+            exception_type = random.choice(['ok', 'ok', 'shortage', 'overage', 'damage'])
+            actual = expected
+            if exception_type == 'shortage':
+                actual = max(0, expected - random.randint(1, expected))
+            elif exception_type == 'overage':
+                actual = expected + random.randint(1, 5)
+            shipments.append({
+                'proNumber': f'PRO{random.randint(100000, 999999)}',
+                'expectedPieces': expected,
+                'actualPieces': actual,
+                'weight': random.randint(50, 2500),
+                'description': random.choice(['ELECTRONICS', 'FURNITURE', 'AUTOMOTIVE PARTS']),
+                'exceptionType': exception_type,
+                'exceptionDetails': None,
+                'markupNotations': [] if exception_type == 'ok' else ['NOTED'],
+                'handwrittenNotes': '' if exception_type == 'ok' else f'{exception_type} noted at dock',
+                'highlightColor': 'none'
+            })
+
+        def total(kind):
+            return sum(1 for s in shipments if s['exceptionType'] == kind)
+
+        return {
+            'metadata': {
+                'documentType': 'manifestException',
+                'state': 'finalized',
+                'result': 'success',
+                'processedAt': datetime.now().isoformat()
+            },
+            'general': {
+                'manifestInfo': {
+                    'manifestNumber': f'MF-{random.randint(100000, 999999)}',
+                    'tripNumber': str(random.randint(1000000, 9999999)),
+                    'trailerNumber': f'TRL{random.randint(1000, 9999)}',
+                    'expectedShipments': len(shipments),
+                    'expectedHandlingUnits': sum(s['expectedPieces'] for s in shipments),
+                    'actualShipments': len(shipments),
+                    'actualHandlingUnits': sum(s['actualPieces'] for s in shipments)
+                },
+                'shipments': shipments,
+                'summary': {
+                    'totalOverages': total('overage'),
+                    'totalShortages': total('shortage'),
+                    'totalDamages': total('damage'),
+                    'totalOveragePieces': 0,
+                    'totalShortagePieces': 0,
+                    'totalDamagedPieces': 0,
+                    'hasOSDNotation': any(s['exceptionType'] != 'ok' for s in shipments)
+                }
+            }
+        }
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def setup(self):
+                super().setup()
+                api._count('connections')
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. a sync request past its budget)
+                    self.close_connection = True
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+
+            def _authorized(self):
+                header = self.headers.get('Authorization', '')
+                if header.startswith('Bearer ') and api._token_valid(header[7:]):
+                    return True
+                self._send(401, {'detail': 'Could not validate credentials'})
+                return False
+
+            def do_GET(self):
+                if self.path == '/api/v1/health':
+                    api._count('health')
+                    return self._send(200, {'status': 'healthy'})
+                if self.path.startswith('/api/v1/batches/'):
+                    if not self._authorized():
+                        return
+                    api._count('status')
+                    batch = api.batches.get(self.path.rsplit('/', 1)[-1])
+                    if batch is None:
+                        return self._send(404, {'detail': 'Batch not found'})
+                    return self._send(200, api._batch_response(batch))
+                self._send(404, {'detail': 'Not found'})
+
+            def do_POST(self):
+                if self.path == '/api/v1/token':
+                    api._count('token')
+                    form = parse_qs(self._body().decode('utf-8'))
+                    if (form.get('username', [''])[0] != api.username
+                            or form.get('password', [''])[0] != api.password):
+                        return self._send(401, {'detail': 'Incorrect username or password'})
+                    return self._send(200, {
+                        'accessToken': api._issue_token(),
+                        'tokenType': 'bearer',
+                        'expiresIn': api.token_ttl
+                    })
+                if self.path == '/api/v1/batches':
+                    body = self._body()
+                    if not self._authorized():
+                        return
+                    api._count('batches')
+                    try:
+                        request = json.loads(body)
+                    except ValueError:
+                        return self._send(422, {'detail': 'Invalid JSON body'})
+                    batch_id = request.get('batchIdentifier') or str(uuid.uuid4())
+                    # One document, or several under `documents`
+                    identifiers = [item.get('identifier') for item in request.get('documents') or [request]]
+                    with api._lock:
+                        batch = api.batches.get(batch_id)
+                        if batch is None:
+                            delay = api.sync_delay if request.get('executionType') == 'sync' else api.async_delay
+                            batch = api.batches[batch_id] = {
+                                'batchIdentifier': batch_id,
+                                'identifier': identifiers[0],
+                                'executionType': request.get('executionType', 'sync'),
+                                'createdAt': datetime.now().isoformat(),
+                                'state': 'processing',
+                                'ready_at': time.monotonic() + delay,
+                                'output': api._canned_output(),
+                                'documents': {}
+                            }
+                            batch['documents'][batch['identifier']] = batch['output']
+                        for identifier in identifiers:
+                            if identifier not in batch['documents']:
+                                # Another document under the same batchIdentifier
+                                batch['documents'][identifier] = api._canned_output()
+                    if batch['executionType'] == 'sync':
+                        time.sleep(max(0.0, batch['ready_at'] - time.monotonic()))
+                    return self._send(200, api._batch_response(batch))
+                self._send(404, {'detail': 'Not found'})
+
+        return Handler
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8452
+    api = MockDocumentAPI(port=port)
+    print(f"🧪 Stand-in AI Document Processor API on {api.base_url}")
+    try:
+        api.server.serve_forever()
+    except KeyboardInterrupt:
+        api.stop()
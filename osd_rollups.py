@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Materialized OS&D (overage, shortage & damage) rollups
+Counters per day, trailer and terminal live in one table next to the stored
+results and are adjusted in the same transaction that stores (or replaces) a
+result, so dashboards read a handful of pre-aggregated rows instead of
+rescanning every exception. `python3 osd_rollups.py rebuild` recomputes them
+from the stored results
+
+Usage:
+    python3 osd_rollups.py rebuild [results.db]
+"""
+
+import sys
+import time
+
+DIMENSIONS = ('day', 'trailer', 'terminal')
+UNKNOWN = 'unknown'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS osd_rollups (
+    dimension TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    manifests INTEGER NOT NULL DEFAULT 0,
+    exceptions INTEGER NOT NULL DEFAULT 0,
+    shortages INTEGER NOT NULL DEFAULT 0,
+    overages INTEGER NOT NULL DEFAULT 0,
+    damages INTEGER NOT NULL DEFAULT 0,
+    short_pieces INTEGER NOT NULL DEFAULT 0,
+    over_pieces INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, bucket)
+) WITHOUT ROWID;
+"""
+
+COUNTERS = ('manifests', 'exceptions', 'shortages', 'overages', 'damages', 'short_pieces', 'over_pieces')
+
+UPSERT = (
+    f"INSERT INTO osd_rollups (dimension, bucket, {', '.join(COUNTERS)})"
+    f" VALUES (?, ?, {', '.join('?' for _ in COUNTERS)})"
+    ' ON CONFLICT (dimension, bucket) DO UPDATE SET '
+    + ', '.join(f'{c} = {c} + excluded.{c}' for c in COUNTERS)
+)
+
+# Same buckets and counters as contribution(), computed in SQL over all stored results
+REBUILD_BUCKETS = {
+    'day': "date(r.processed_at, 'unixepoch', 'localtime')",
+    'trailer': f"COALESCE(r.trailer_number, '{UNKNOWN}')",
+    'terminal': f"COALESCE(r.terminal, '{UNKNOWN}')"
+}
+REBUILD_SELECT = """
+SELECT {bucket} AS bucket,
+       COUNT(*),
+       COALESCE(SUM(x.exceptions), 0), COALESCE(SUM(x.shortages), 0), COALESCE(SUM(x.overages), 0),
+       COALESCE(SUM(x.damages), 0), COALESCE(SUM(x.short_pieces), 0), COALESCE(SUM(x.over_pieces), 0)
+FROM results r LEFT JOIN (
+    SELECT result_id,
+           COUNT(*) AS exceptions,
+           SUM(type = 'shortage') AS shortages,
+           SUM(type = 'overage') AS overages,
+           SUM(type = 'damage') AS damages,
+           SUM(CASE WHEN type = 'shortage' THEN MAX(COALESCE(expected_pieces, 0) - COALESCE(actual_pieces, 0), 0) ELSE 0 END) AS short_pieces,
+           SUM(CASE WHEN type = 'overage' THEN MAX(COALESCE(actual_pieces, 0) - COALESCE(expected_pieces, 0), 0) ELSE 0 END) AS over_pieces
+    FROM exceptions GROUP BY result_id
+) x ON x.result_id = r.id
+GROUP BY bucket
+"""
+
+
+def day_bucket(timestamp):
+    """Local calendar day, matching SQLite's date(..., 'unixepoch', 'localtime')"""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+def contribution(exceptions):
+    """
+    Counter values one result adds to each of its buckets
+
+    Args:
+        exceptions: (type, expected_pieces, actual_pieces) per exception
+    """
+    counts = dict.fromkeys(COUNTERS, 0)
+    counts['manifests'] = 1
+    for exception_type, expected, actual in exceptions:
+        counts['exceptions'] += 1
+        expected, actual = expected or 0, actual or 0
+        if exception_type == 'shortage':
+            counts['shortages'] += 1
+            counts['short_pieces'] += max(expected - actual, 0)
+        elif exception_type == 'overage':
+            counts['overages'] += 1
+            counts['over_pieces'] += max(actual - expected, 0)
+        elif exception_type == 'damage':
+            counts['damages'] += 1
+    return counts
+
+
+def apply(conn, buckets, counts, sign=1):
+    """Add (sign=1) or take back (sign=-1) one result's counts in each bucket"""
+    values = [sign * counts[c] for c in COUNTERS]
+    conn.executemany(UPSERT, [
+        (dimension, bucket or UNKNOWN, *values) for dimension, bucket in buckets.items()
+    ])
+
+
+def rebuild(conn):
+    """Recompute every rollup from the stored results (one transaction)"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM osd_rollups')
+        for dimension, bucket in REBUILD_BUCKETS.items():
+            conn.execute(
+                f"INSERT INTO osd_rollups (dimension, bucket, {', '.join(COUNTERS)})"
+                f" SELECT '{dimension}', * FROM ({REBUILD_SELECT.format(bucket=bucket)})"
+            )
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def query(conn, dimension, start=None, end=None, limit=None):
+    """
+    Rollup rows for one dimension, by bucket
+
+    start / end bound the bucket (inclusive); for days they are YYYY-MM-DD
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"dimension must be one of {', '.join(DIMENSIONS)}")
+    # Buckets emptied by replaced results stay behind as zero rows
+    where, params = ['dimension = ?', 'manifests > 0'], [dimension]
+    if start:
+        where.append('bucket >= ?')
+        params.append(start)
+    if end:
+        where.append('bucket <= ?')
+        params.append(end)
+    sql = f"SELECT bucket, {', '.join(COUNTERS)} FROM osd_rollups WHERE {' AND '.join(where)}"
+    if dimension == 'day':
+        sql += ' ORDER BY bucket'
+    else:
+        sql += ' ORDER BY exceptions DESC, bucket'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    return [
+        {
+            'bucket': row[0],
+            'manifests': row[1],
+            'exceptions': row[2],
+            'shortages': row[3],
+            'overages': row[4],
+            'damages': row[5],
+            'shortPieces': row[6],
+            'overPieces': row[7]
+        }
+        for row in conn.execute(sql, params)
+    ]
+
+
+if __name__ == '__main__':
+    from result_store import ResultStore, RESULT_STORE_PATH
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print(__doc__.strip().split('Usage:')[1].strip())
+        sys.exit(2)
+    store = ResultStore(sys.argv[2] if len(sys.argv) > 2 else RESULT_STORE_PATH)
+    started = time.monotonic()
+    store.rebuild_rollups()
+    print(f"📊 Rebuilt OS&D rollups for {store.stats()['results']} results in {time.monotonic() - started:.1f}s")
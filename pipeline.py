@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Staged processing pipeline
+Each stage has its own bounded queue and worker threads; a stage handler
+returns the name of the stage a job moves to next. Handing a job on blocks
+while the next queue is full, so a slow stage pushes back on the stages in
+front of it and finally on submit(), instead of piling up work in memory.
+A handler waiting on something slow outside the process (an upstream batch)
+parks the job instead of blocking its worker; a callback resumes it later,
+without blocking: a resume thread does the (possibly waiting) hand-on
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+from job_queue import Job, QueueFull, DEFAULT_JOB_RETENTION
+
+DEFAULT_STAGE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '32'))
+# Returned by a stage handler that handed the job to a callback (see Pipeline.park)
+PARKED = 'parked'
+
+
+def stage_setting(stage, setting, default):
+    """PIPELINE_<STAGE>_<SETTING> from the environment, e.g. PIPELINE_BACKEND_WORKERS"""
+    return int(os.environ.get(f'PIPELINE_{stage.upper()}_{setting}', default))
+
+
+class Stage:
+    """One pipeline stage: handler(job) -> next stage name, PARKED, or None when the job is finished"""
+
+    def __init__(self, name, handler, workers=1, queue_size=DEFAULT_STAGE_QUEUE_SIZE):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, stage_setting(name, 'WORKERS', workers))
+        self.queue = queue.Queue(maxsize=max(1, stage_setting(name, 'QUEUE', queue_size)))
+        self.busy = 0
+        self.processed = 0
+        self.errors = 0
+        self.blocked_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._completions = deque()  # monotonic timestamps of the last minute
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        now = time.monotonic()
+        with self._lock:
+            self.processed += 1
+            if not ok:
+                self.errors += 1
+            self.busy_seconds += seconds
+            self._completions.append(now)
+            while self._completions and self._completions[0] < now - 60:
+                self._completions.popleft()
+
+    def put(self, job, block=True):
+        if block:
+            started = time.monotonic()
+            self.queue.put(job)
+            waited = time.monotonic() - started
+        else:
+            self.queue.put_nowait(job)
+            waited = 0.0
+        with self._lock:
+            self.blocked_seconds += waited
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for t in self._completions if t >= now - 60)
+            return {
+                'workers': self.workers,
+                'busy': self.busy,
+                'queueDepth': self.queue.qsize(),
+                'queueCapacity': self.queue.maxsize,
+                'maxQueueDepth': self.max_depth,
+                'processed': self.processed,
+                'errors': self.errors,
+                'perMinute': recent,
+                'averageSeconds': round(self.busy_seconds / self.processed, 3) if self.processed else None,
+                'upstreamBlockedSeconds': round(self.blocked_seconds, 2)
+            }
+
+
+class Pipeline:
+    """
+    Jobs flow through named stages, starting at the first one
+
+    Usage:
+        pipeline = Pipeline([Stage('cache', check_cache, 2), Stage('backend', run_backend, 4)],
+                            on_finish=cleanup)
+        job = pipeline.submit({'path': ...}, filename='manifest.pdf')
+        job.wait(); job.result
+    """
+
+    def __init__(self, stages, on_finish=None, retention=DEFAULT_JOB_RETENTION, store=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.first = stages[0].name
+        self.on_finish = on_finish
+        # Optional durable record of jobs (job_store.JobStore)
+        self.store = store
+        self.retention = retention
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self.submitted = 0
+        self.rejected = 0
+        # Work done on the request thread before submit(), e.g. spooling
+        self.inline = {}
+        # Parked jobs on their way back in: (job, next stage), fed by resume()
+        self._resumed = queue.Queue()
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for stage in self.stages.values():
+                for index in range(stage.workers):
+                    threading.Thread(
+                        target=self._worker_loop, args=(stage,),
+                        name=f'{stage.name}-{index}', daemon=True
+                    ).start()
+            threading.Thread(target=self._resume_loop, name='resume', daemon=True).start()
+            self._started = True
+
+    def _worker_loop(self, stage):
+        while True:
+            job = stage.queue.get()
+            with stage._lock:
+                stage.busy += 1
+            job.start(stage.name)
+            started = time.monotonic()
+            try:
+                next_stage = stage.handler(job)
+                ok = True
+            except Exception as e:
+                traceback.print_exc()
+                next_stage, ok = None, False
+                self._finish(job, error=e)
+            finally:
+                with stage._lock:
+                    stage.busy -= 1
+                stage.queue.task_done()
+            stage.record(time.monotonic() - started, ok)
+
+            if not ok or next_stage == PARKED:
+                continue
+            if next_stage is None:
+                self._finish(job, result=job.result)
+            else:
+                # Blocks while the next stage is full: this is the backpressure
+                self.stages[next_stage].put(job)
+
+    def _resume_loop(self):
+        while True:
+            job, next_stage = self._resumed.get()
+            # Blocks while the stage is full, on this thread instead of the resume() caller's
+            self.stages[next_stage].put(job)
+
+    def _finish(self, job, result=None, error=None):
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception:
+                traceback.print_exc()
+        if self.store is not None:
+            try:
+                self.store.finish(job.id, result, error)
+            except Exception:
+                traceback.print_exc()
+        job.stage = None
+        job.finish(result, error)
+
+    def park(self, job):
+        """
+        Take a job off its stage without finishing it; the handler then
+        returns PARKED and whoever holds the job calls resume() later
+        """
+        job.stage = PARKED
+        return PARKED
+
+    def resume(self, job, next_stage=None, error=None):
+        """
+        Move a parked job on to next_stage, or finish it (failed if error is given)
+        Never blocks: callers are shared threads (the batch poller's callbacks),
+        so a full stage queue is waited out by the resume thread instead
+        """
+        if error is not None:
+            self._finish(job, error=error)
+        elif next_stage is None:
+            self._finish(job, result=job.result)
+        else:
+            try:
+                self.stages[next_stage].put(job, block=False)
+            except queue.Full:
+                self._resumed.put((job, next_stage))
+
+    def submit(self, context, filename=None, process_type='sync', job_id=None):
+        """
+        Queue a job at the first stage and return it at once
+        job_id is given when resuming a job recorded before a restart
+
+        Raises:
+            QueueFull: the first stage's queue is full; the caller should retry later
+        """
+        self._start()
+        self._prune()
+        job = Job(None, (), {}, filename=filename, process_type=process_type)
+        if job_id is not None:
+            job.id = job_id
+        job.context = dict(context)
+        if self.store is not None:
+            self.store.add(job)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self.stages[self.first].put(job, block=False)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self.rejected += 1
+            if self.store is not None and job_id is None:
+                self.store.remove(job.id)
+            raise QueueFull(f"Pipeline is full ({self.stages[self.first].queue.maxsize} waiting)")
+        with self._lock:
+            self.submitted += 1
+        return job
+
+    def record_inline(self, name, seconds, ok=True):
+        """Account for a stage that runs on the request thread"""
+        with self._lock:
+            stage = self.inline.get(name)
+            if stage is None:
+                stage = self.inline[name] = Stage(name, None)
+        stage.record(seconds, ok)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.done and job.finished_at.timestamp() < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def queue_pressure(self):
+        """Fill level (0..1) of the first stage's queue"""
+        first = self.stages[self.first].queue
+        return first.qsize() / first.maxsize
+
+    def stats(self):
+        with self._lock:
+            statuses = {}
+            for job in self._jobs.values():
+                key = job.stage if job.status == 'running' and job.stage else job.status
+                statuses[key] = statuses.get(key, 0) + 1
+            inline = {name: stage.stats() for name, stage in self.inline.items()}
+        stages = dict(inline)
+        for name, stage in self.stages.items():
+            stages[name] = stage.stats()
+        for stats in inline.values():
+            for key in ('busy', 'queueDepth', 'queueCapacity', 'maxQueueDepth', 'upstreamBlockedSeconds'):
+                stats.pop(key, None)
+            stats['workers'] = 'request thread'
+        return {
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'resumeBacklog': self._resumed.qsize(),
+            'jobs': statuses,
+            'stages': stages
+        }
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Cross-manifest overage/shortage reconciliation
+A shortage on one trailer is often the overage on another under the same PRO
+number. Every unmatched shortage and overage is kept in an index keyed by its
+match key (the PRO number, optionally with description and piece count);
+each stored result's exceptions look up the opposite type under their key,
+one indexed probe per exception, and pair up with the oldest open one from a
+different manifest. Runs inside ResultStore.save's transaction, so every
+server process sees the same open index. `python3 reconciliation.py backfill`
+rebuilds matches over all stored results (e.g. after changing RECONCILE_MATCH_ON)
+
+Usage:
+    python3 reconciliation.py backfill [results.db]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+# pro, pro+description or pro+description+pieces
+RECONCILE_MATCH_ON = os.environ.get('RECONCILE_MATCH_ON', 'pro')
+OPPOSITE = {'shortage': 'overage', 'overage': 'shortage'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS osd_open (
+    exception_id INTEGER PRIMARY KEY,
+    result_id TEXT NOT NULL,
+    match_key TEXT NOT NULL,
+    type TEXT NOT NULL,
+    opened_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS osd_open_match ON osd_open (match_key, type, opened_at);
+CREATE INDEX IF NOT EXISTS osd_open_result_id ON osd_open (result_id);
+
+CREATE TABLE IF NOT EXISTS osd_matches (
+    id INTEGER PRIMARY KEY,
+    pro_number TEXT NOT NULL,
+    match_key TEXT NOT NULL,
+    shortage_exception_id INTEGER NOT NULL,
+    shortage_result_id TEXT NOT NULL,
+    overage_exception_id INTEGER NOT NULL,
+    overage_result_id TEXT NOT NULL,
+    matched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS osd_matches_pro_number ON osd_matches (pro_number);
+CREATE INDEX IF NOT EXISTS osd_matches_shortage_result_id ON osd_matches (shortage_result_id);
+CREATE INDEX IF NOT EXISTS osd_matches_overage_result_id ON osd_matches (overage_result_id);
+"""
+
+MATCH_LIMIT = 100
+MATCH_MAX_LIMIT = 1000
+
+
+def missing_pieces(exception_type, expected, actual):
+    """Pieces short (shortage) or extra (overage)"""
+    expected, actual = expected or 0, actual or 0
+    return max(expected - actual, 0) if exception_type == 'shortage' else max(actual - expected, 0)
+
+
+def match_key(row, match_on=RECONCILE_MATCH_ON):
+    """
+    Key a shortage and an overage must share to match, or None when the
+    exception cannot be matched (no PRO number, or not a shortage/overage)
+    """
+    pro_number = (row['pro_number'] or '').strip().upper()
+    if row['type'] not in OPPOSITE or not pro_number or pro_number == 'UNKNOWN':
+        return None
+    parts = [pro_number]
+    if 'description' in match_on:
+        parts.append(' '.join((row['description'] or '').upper().split()))
+    if 'pieces' in match_on:
+        parts.append(str(missing_pieces(row['type'], row['expected_pieces'], row['actual_pieces'])))
+    return '|'.join(parts)
+
+
+def reconcile(conn, result_id, match_on=RECONCILE_MATCH_ON, now=None):
+    """
+    Match a stored result's shortages and overages against the open index;
+    unmatched ones are added to it
+
+    Returns:
+        int: new matches
+    """
+    now = now or time.time()
+    rows = conn.execute(
+        'SELECT id, pro_number, type, description, expected_pieces, actual_pieces'
+        ' FROM exceptions WHERE result_id = ? ORDER BY position', (result_id,)
+    ).fetchall()
+    matched = 0
+    for row in rows:
+        key = match_key(row, match_on)
+        if key is None:
+            continue
+        counterpart = conn.execute(
+            'SELECT exception_id, result_id FROM osd_open'
+            ' WHERE match_key = ? AND type = ? AND result_id != ? ORDER BY opened_at LIMIT 1',
+            (key, OPPOSITE[row['type']], result_id)
+        ).fetchone()
+        if counterpart is None:
+            conn.execute(
+                'INSERT INTO osd_open (exception_id, result_id, match_key, type, opened_at) VALUES (?, ?, ?, ?, ?)',
+                (row['id'], result_id, key, row['type'], now)
+            )
+            continue
+        conn.execute('DELETE FROM osd_open WHERE exception_id = ?', (counterpart['exception_id'],))
+        this = (row['id'], result_id)
+        other = (counterpart['exception_id'], counterpart['result_id'])
+        shortage, overage = (this, other) if row['type'] == 'shortage' else (other, this)
+        conn.execute(
+            'INSERT INTO osd_matches (pro_number, match_key, shortage_exception_id, shortage_result_id,'
+            ' overage_exception_id, overage_result_id, matched_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key.split('|')[0], key, *shortage, *overage, now)
+        )
+        matched += 1
+    return matched
+
+
+def forget(conn, result_id):
+    """
+    Take a result out of reconciliation before it is replaced: its open
+    entries go, and the other side of each of its matches is reopened
+    """
+    matches = conn.execute(
+        'SELECT id, match_key, shortage_exception_id, shortage_result_id, overage_exception_id, overage_result_id,'
+        ' matched_at FROM osd_matches WHERE shortage_result_id = ? OR overage_result_id = ?',
+        (result_id, result_id)
+    ).fetchall()
+    for match in matches:
+        if match['shortage_result_id'] == result_id:
+            reopen = (match['overage_exception_id'], match['overage_result_id'], 'overage')
+        else:
+            reopen = (match['shortage_exception_id'], match['shortage_result_id'], 'shortage')
+        if reopen[1] != result_id:
+            conn.execute(
+                'INSERT OR IGNORE INTO osd_open (exception_id, result_id, match_key, type, opened_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (reopen[0], reopen[1], match['match_key'], reopen[2], match['matched_at'])
+            )
+        conn.execute('DELETE FROM osd_matches WHERE id = ?', (match['id'],))
+    conn.execute('DELETE FROM osd_open WHERE result_id = ?', (result_id,))
+
+
+def backfill(conn, match_on=RECONCILE_MATCH_ON):
+    """
+    Rebuild the open index and all matches from the stored results, oldest
+    first, in one transaction
+
+    Returns:
+        int: matches found
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM osd_matches')
+        conn.execute('DELETE FROM osd_open')
+        matched = 0
+        results = conn.execute('SELECT id, processed_at FROM results ORDER BY processed_at').fetchall()
+        for result in results:
+            matched += reconcile(conn, result['id'], match_on, now=result['processed_at'])
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return matched
+
+
+def _side(row, prefix):
+    return {
+        'resultId': row[f'{prefix}_result_id'],
+        'filename': row[f'{prefix}_filename'],
+        'tripNumber': row[f'{prefix}_trip_number'],
+        'manifestNumber': row[f'{prefix}_manifest_number'],
+        'trailerNumber': row[f'{prefix}_trailer_number'],
+        'description': row[f'{prefix}_description'],
+        'expectedPieces': row[f'{prefix}_expected_pieces'],
+        'actualPieces': row[f'{prefix}_actual_pieces']
+    }
+
+
+def matches(conn, pro_number=None, result_id=None, limit=MATCH_LIMIT):
+    """Matched shortage/overage pairs, newest first, by PRO number or for one result"""
+    limit = max(1, min(int(limit), MATCH_MAX_LIMIT))
+    if pro_number:
+        where, params = 'm.pro_number = ?', [pro_number.strip().upper()]
+    elif result_id:
+        # Two indexed lookups rather than one OR the planner cannot index
+        where = ('m.id IN (SELECT id FROM osd_matches WHERE shortage_result_id = ?'
+                 ' UNION SELECT id FROM osd_matches WHERE overage_result_id = ?)')
+        params = [result_id, result_id]
+    else:
+        where, params = '1', []
+    columns = ', '.join(
+        f'{alias}.{column} AS {side}_{column}'
+        for side, alias in (('shortage', 'rs'), ('overage', 'ro'))
+        for column in ('filename', 'trip_number', 'manifest_number', 'trailer_number')
+    ) + ', ' + ', '.join(
+        f'{alias}.{column} AS {side}_{column}'
+        for side, alias in (('shortage', 'es'), ('overage', 'eo'))
+        for column in ('description', 'expected_pieces', 'actual_pieces')
+    )
+    rows = conn.execute(
+        f'SELECT m.*, {columns} FROM osd_matches m'
+        ' JOIN results rs ON rs.id = m.shortage_result_id'
+        ' JOIN results ro ON ro.id = m.overage_result_id'
+        ' JOIN exceptions es ON es.id = m.shortage_exception_id'
+        ' JOIN exceptions eo ON eo.id = m.overage_exception_id'
+        f' WHERE {where} ORDER BY m.id DESC LIMIT ?',
+        params + [limit]
+    ).fetchall()
+    return [
+        {
+            'proNumber': row['pro_number'],
+            'matchedAt': datetime.fromtimestamp(row['matched_at']).isoformat(),
+            'shortage': _side(row, 'shortage'),
+            'overage': _side(row, 'overage')
+        }
+        for row in rows
+    ]
+
+
+def stats(conn):
+    counts = dict(conn.execute('SELECT type, COUNT(*) FROM osd_open GROUP BY type').fetchall())
+    return {
+        'matchOn': RECONCILE_MATCH_ON,
+        'openShortages': counts.get('shortage', 0),
+        'openOverages': counts.get('overage', 0),
+        'matches': conn.execute('SELECT COUNT(*) FROM osd_matches').fetchone()[0]
+    }
+
+
+if __name__ == '__main__':
+    from result_store import ResultStore, RESULT_STORE_PATH
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'backfill':
+        print(__doc__.strip().split('Usage:')[1].strip())
+        sys.exit(2)
+    store = ResultStore(sys.argv[2] if len(sys.argv) > 2 else RESULT_STORE_PATH)
+    started = time.monotonic()
+    found = store.backfill_reconciliation()
+    print(f"🔗 Reconciled {store.stats()['results']} results ({RECONCILE_MATCH_ON}): "
+          f"{found} matches in {time.monotonic() - started:.1f}s")
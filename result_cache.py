@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of processing results
+Keyed on the SHA-256 of the uploaded PDF bytes, so rescans and re-sends of
+the same document skip the Swift/AI round trip
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = int(os.environ.get('RESULT_CACHE_BYTES', str(64 * 1024 * 1024)))
+DEFAULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR') or None
+
+
+class ResultCache:
+    """
+    Two-tier result cache
+
+    Memory tier: LRU of serialized results bounded by a byte budget
+    Disk tier (optional): one JSON file per hash, written atomically so several
+    server processes can share the directory and it survives restarts
+
+    Usage:
+        cache = ResultCache(max_bytes=64 * 1024 * 1024, disk_dir='/var/cache/manifests')
+        result = cache.get(content_hash)
+        if result is None:
+            result = process(...)
+            cache.put(content_hash, result)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, disk_dir=DEFAULT_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return a fresh copy of the cached result, or None"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(payload)
+
+        payload = self._read_disk(key)
+        if payload is not None:
+            self._remember(key, payload)
+            with self._lock:
+                self.disk_hits += 1
+            return json.loads(payload)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        payload = json.dumps(result).encode('utf-8')
+        self._remember(key, payload)
+        self._write_disk(key, payload)
+        with self._lock:
+            self.stores += 1
+
+    def record_bypass(self):
+        """Count a request that explicitly skipped the cache"""
+        with self._lock:
+            self.bypasses += 1
+
+    def _remember(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f'{key}.json')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, payload):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers in other processes never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not write result cache entry {key[:12]}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxBytes': self.max_bytes,
+                'diskDir': self.disk_dir,
+                'memoryHits': self.memory_hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'hitRate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'bypasses': self.bypasses,
+                'stores': self.stores,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Streaming export of stored manifests and exceptions
+Rows are read from the result store with a cursor in processed order and
+written out a batch at a time as CSV, NDJSON or (with pyarrow installed)
+Parquet, so memory stays flat however many results the date range covers.
+The export reads one snapshot of the store; results saved meanwhile are not
+included. Used by GET /export and from the command line
+
+Usage:
+    python3 result_export.py <manifests|exceptions> <csv|ndjson|parquet> [start [end]] > export.csv
+    (start / end are YYYY-MM-DD or ISO timestamps, '-' for open; RESULT_STORE_PATH picks the store)
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from job_store import connect
+from result_store import RESULT_STORE_PATH
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Rows fetched per batch (and Parquet row group size)
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', '5000'))
+
+PROCESSED_AT = "strftime('%Y-%m-%dT%H:%M:%S', r.processed_at, 'unixepoch', 'localtime')"
+HEADER_COLUMNS = [
+    ('resultId', 'r.id', 'string'),
+    ('filename', 'r.filename', 'string'),
+    ('tripNumber', 'r.trip_number', 'string'),
+    ('manifestNumber', 'r.manifest_number', 'string'),
+    ('trailerNumber', 'r.trailer_number', 'string'),
+    ('terminal', 'r.terminal', 'string'),
+    ('processedAt', PROCESSED_AT, 'string')
+]
+# (output name, SQL expression, Parquet type) per column
+COLUMNS = {
+    'manifests': HEADER_COLUMNS + [
+        ('source', 'r.source', 'string'),
+        ('totalExceptions', 'r.total_exceptions', 'int64')
+    ],
+    'exceptions': HEADER_COLUMNS + [
+        ('position', 'e.position', 'int64'),
+        ('proNumber', 'e.pro_number', 'string'),
+        ('type', 'e.type', 'string'),
+        ('description', 'e.description', 'string'),
+        ('expectedPieces', 'e.expected_pieces', 'int64'),
+        ('actualPieces', 'e.actual_pieces', 'int64'),
+        ('weight', 'e.weight', 'float64'),
+        ('notes', 'e.notes', 'string'),
+        ('markups', 'e.markups', 'string')
+    ]
+}
+SOURCES = {
+    'manifests': 'results r',
+    'exceptions': 'results r JOIN exceptions e ON e.result_id = r.id'
+}
+# A fixed order, also for results stored in the same instant, so repeated or paged exports agree
+ORDER_BY = {
+    'manifests': 'r.processed_at, r.id',
+    # Only one result's exceptions are ever sorted at a time
+    'exceptions': 'r.processed_at, r.id, e.position'
+}
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def export_formats():
+    return [f for f in CONTENT_TYPES if f != 'parquet' or PARQUET_AVAILABLE]
+
+
+def time_range(start=None, end=None):
+    """
+    processed_at bounds for start / end (YYYY-MM-DD or ISO timestamps, local
+    time); a date-only end includes that whole day
+
+    Raises:
+        ValueError: unparseable date
+    """
+    bounds = []
+    for value, is_end in ((start, False), (end, True)):
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid date '{value}' (use YYYY-MM-DD or an ISO timestamp)")
+        if is_end and len(value) == 10:
+            moment += timedelta(days=1)
+        bounds.append(moment.timestamp())
+    return bounds
+
+
+def iter_batches(rows, start=None, end=None, path=RESULT_STORE_PATH, batch_size=EXPORT_BATCH_ROWS):
+    """Lists of row tuples in processed order, read through one cursor on a connection of its own"""
+    since, until = time_range(start, end)
+    where, params = [], []
+    if since is not None:
+        where.append('r.processed_at >= ?')
+        params.append(since)
+    if until is not None:
+        where.append('r.processed_at < ?')
+        params.append(until)
+    sql = (
+        f"SELECT {', '.join(expr for _, expr, _ in COLUMNS[rows])} FROM {SOURCES[rows]}"
+        + (f" WHERE {' AND '.join(where)}" if where else '')
+        # Walks results_processed_at_id, so no sort buffer however large the range
+        + f' ORDER BY {ORDER_BY[rows]}'
+    )
+    conn = connect(path)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            yield [tuple(row) for row in batch]
+    finally:
+        conn.close()
+
+
+def _csv_chunks(names, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(names, batches):
+    markups = names.index('markups') if 'markups' in names else None
+    for batch in batches:
+        lines = []
+        for row in batch:
+            record = dict(zip(names, row))
+            if markups is not None:
+                # Stored as JSON text; exported as the list it is
+                record['markups'] = json.loads(row[markups] or '[]')
+            lines.append(orjson.dumps(record) if ORJSON_AVAILABLE else json.dumps(record).encode())
+        yield b'\n'.join(lines) + b'\n'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file the Parquet writer fills; take() hands over what it has written so far"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_chunks(columns, batches):
+    schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, _, kind in columns])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export(rows, fmt, start=None, end=None, path=RESULT_STORE_PATH):
+    """
+    Byte chunks of the export; the arguments are checked before anything is
+    read, so errors surface here rather than mid-stream
+
+    Raises:
+        ValueError: unknown rows / format, Parquet without pyarrow, bad dates
+    """
+    if rows not in COLUMNS:
+        raise ValueError(f"rows must be one of {', '.join(COLUMNS)}")
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"format must be one of {', '.join(CONTENT_TYPES)}")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ValueError('Parquet export needs pyarrow (pip install pyarrow)')
+    time_range(start, end)
+
+    batches = iter_batches(rows, start, end, path)
+    names = [name for name, _, _ in COLUMNS[rows]]
+    if fmt == 'csv':
+        return _csv_chunks(names, batches)
+    if fmt == 'ndjson':
+        return _ndjson_chunks(names, batches)
+    return _parquet_chunks(COLUMNS[rows], batches)
+
+
+if __name__ == '__main__':
+    args = [None if arg == '-' else arg for arg in sys.argv[1:]]
+    if len(args) < 2:
+        print(__doc__.strip().split('Usage:')[1].strip())
+        sys.exit(2)
+    try:
+        chunks = export(args[0], args[1], *args[2:4])
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+    for chunk in chunks:
+        sys.stdout.buffer.write(chunk)
+    sys.stdout.buffer.flush()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Persistent, indexed store of processed manifests
+Every real (non-demo) result is kept in SQLite: the full report as JSON for
+fast re-display, plus the manifest header and one row per exception in
+indexed columns for lookups. Re-processing the same PDF (same content hash)
+replaces its stored report instead of adding a second one. Exception notes,
+descriptions and markups are full-text indexed (FTS5) for search; the
+OS&D rollups (osd_rollups.py) and cross-manifest shortage/overage matches
+(reconciliation.py) are updated in the same transaction
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import osd_rollups
+import reconciliation
+from job_store import DATA_DIR, connect
+
+RESULT_STORE_PATH = os.environ.get('RESULT_STORE_PATH', os.path.join(DATA_DIR, 'results.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    filename TEXT,
+    trip_number TEXT,
+    manifest_number TEXT,
+    trailer_number TEXT,
+    terminal TEXT,
+    source TEXT,
+    total_exceptions INTEGER NOT NULL DEFAULT 0,
+    processed_at REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS results_content_hash ON results (content_hash);
+CREATE INDEX IF NOT EXISTS results_trip_number ON results (trip_number);
+CREATE INDEX IF NOT EXISTS results_manifest_number ON results (manifest_number);
+CREATE INDEX IF NOT EXISTS results_trailer_number ON results (trailer_number);
+-- With the id as tiebreaker, so exports walk results in one fixed order
+CREATE INDEX IF NOT EXISTS results_processed_at_id ON results (processed_at, id);
+DROP INDEX IF EXISTS results_processed_at;
+
+CREATE TABLE IF NOT EXISTS exceptions (
+    id INTEGER PRIMARY KEY,
+    result_id TEXT NOT NULL REFERENCES results (id),
+    position INTEGER NOT NULL,
+    pro_number TEXT,
+    type TEXT,
+    description TEXT,
+    expected_pieces INTEGER,
+    actual_pieces INTEGER,
+    weight REAL,
+    notes TEXT,
+    markups TEXT
+);
+CREATE INDEX IF NOT EXISTS exceptions_result_id ON exceptions (result_id);
+CREATE INDEX IF NOT EXISTS exceptions_pro_number ON exceptions (pro_number);
+CREATE INDEX IF NOT EXISTS exceptions_type ON exceptions (type);
+"""
+
+# Kept in step with the exceptions table by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS exceptions_fts USING fts5 (
+    description, notes, markups, content='exceptions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS exceptions_fts_insert AFTER INSERT ON exceptions BEGIN
+    INSERT INTO exceptions_fts (rowid, description, notes, markups)
+    VALUES (new.id, new.description, new.notes, new.markups);
+END;
+CREATE TRIGGER IF NOT EXISTS exceptions_fts_delete AFTER DELETE ON exceptions BEGIN
+    INSERT INTO exceptions_fts (exceptions_fts, rowid, description, notes, markups)
+    VALUES ('delete', old.id, old.description, old.notes, old.markups);
+END;
+"""
+
+SEARCH_LIMIT = 50
+SEARCH_MAX_LIMIT = 500
+# The upper bound of a prefix range: sorts after anything starting with the prefix
+PREFIX_END = '\U0010ffff'
+
+
+def _number(value, cast=int):
+    """Pieces and weights arrive as numbers or strings like '12' / '1,250 lbs'"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    digits = ''.join(c for c in str(value) if c.isdigit() or c == '.')
+    try:
+        return cast(float(digits)) if digits else None
+    except ValueError:
+        return None
+
+
+def match_query(text):
+    """
+    FTS5 query for free text: every word must match, a trailing * makes a word
+    a prefix; the words are quoted so FTS operators in the input are inert
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _value_filter(column, value):
+    """Exact match, or a prefix range (which uses the column's index) for 'ABC*'"""
+    if value.endswith('*'):
+        prefix = value.rstrip('*')
+        return f'{column} >= ? AND {column} < ?', [prefix, prefix + PREFIX_END]
+    return f'{column} = ?', [value]
+
+
+def _header(manifest, key):
+    value = manifest.get(key)
+    # format_swift_response fills missing header fields with 'Unknown'
+    return None if value in (None, '', 'Unknown') else str(value)
+
+
+class ResultStore:
+    """
+    SQLite store of normalized processing results
+
+    Usage:
+        store = ResultStore('/var/lib/manifests/results.db')
+        result_id = store.save(result, content_hash)
+        store.get(result_id)
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.reads = 0
+        self.searches = 0
+        self.matches = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(results)')]
+        if 'terminal' not in columns:
+            # Stores created before results carried a terminal
+            conn.execute('ALTER TABLE results ADD COLUMN terminal TEXT')
+        self.full_text = self._create_fts(conn)
+        rollups_exist = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'osd_rollups'"
+        ).fetchone()
+        conn.executescript(osd_rollups.SCHEMA)
+        if not rollups_exist:
+            osd_rollups.rebuild(conn)
+        reconciled = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'osd_open'"
+        ).fetchone()
+        conn.executescript(reconciliation.SCHEMA)
+        if not reconciled:
+            reconciliation.backfill(conn)
+
+    @staticmethod
+    def _create_fts(conn):
+        """Create the full-text index (filled from existing rows); False without FTS5"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'exceptions_fts'"
+        ).fetchone()
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  SQLite has no FTS5 ({e}); text search falls back to scanning")
+            return False
+        if not exists:
+            conn.execute("INSERT INTO exceptions_fts (exceptions_fts) VALUES ('rebuild')")
+        return True
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def save(self, result, content_hash=None, result_id=None):
+        """
+        Store a result (replacing an earlier one for the same content hash)
+
+        Returns:
+            str: the result id, also set as result['resultId']
+        """
+        manifest = result.get('manifest') or {}
+        exceptions = result.get('exceptions') or []
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            existing = None
+            if content_hash:
+                existing = conn.execute(
+                    'SELECT id, processed_at, trailer_number, terminal FROM results WHERE content_hash = ?',
+                    (content_hash,)
+                ).fetchone()
+            result_id = existing['id'] if existing else (result_id or uuid.uuid4().hex)
+            result['resultId'] = result_id
+
+            if existing:
+                # The replaced report's counts come out of the rollups first
+                previous = conn.execute(
+                    'SELECT type, expected_pieces, actual_pieces FROM exceptions WHERE result_id = ?', (result_id,)
+                ).fetchall()
+                osd_rollups.apply(conn, {
+                    'day': osd_rollups.day_bucket(existing['processed_at']),
+                    'trailer': existing['trailer_number'],
+                    'terminal': existing['terminal']
+                }, osd_rollups.contribution(previous), sign=-1)
+                reconciliation.forget(conn, result_id)
+
+            processed_at = time.time()
+            trailer_number = _header(manifest, 'trailerNumber')
+            terminal = result.get('terminal') or _header(manifest, 'terminal')
+            conn.execute('DELETE FROM exceptions WHERE result_id = ?', (result_id,))
+            conn.execute(
+                'INSERT OR REPLACE INTO results (id, content_hash, filename, trip_number, manifest_number,'
+                ' trailer_number, terminal, source, total_exceptions, processed_at, result)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (result_id, content_hash, result.get('filename'),
+                 _header(manifest, 'tripNumber'), _header(manifest, 'manifestNumber'),
+                 trailer_number, terminal, result.get('source'), len(exceptions),
+                 processed_at, json.dumps(result))
+            )
+            conn.executemany(
+                'INSERT INTO exceptions (result_id, position, pro_number, type, description,'
+                ' expected_pieces, actual_pieces, weight, notes, markups)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (result_id, position, exception.get('proNumber'), exception.get('type'),
+                     exception.get('description'), _number(exception.get('expectedPieces')),
+                     _number(exception.get('actualPieces')), _number(exception.get('weight'), float),
+                     exception.get('notes'), json.dumps(exception.get('markups') or []))
+                    for position, exception in enumerate(exceptions)
+                ]
+            )
+            osd_rollups.apply(conn, {
+                'day': osd_rollups.day_bucket(processed_at),
+                'trailer': trailer_number,
+                'terminal': terminal
+            }, osd_rollups.contribution(
+                (e.get('type'), _number(e.get('expectedPieces')), _number(e.get('actualPieces'))) for e in exceptions
+            ))
+            matched = reconciliation.reconcile(conn, result_id, now=processed_at)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self.saves += 1
+            self.matches += matched
+        return result_id
+
+    def get_json(self, result_id):
+        """The stored report as serialized JSON (served as-is), or None"""
+        row = self._conn().execute('SELECT result FROM results WHERE id = ?', (result_id,)).fetchone()
+        with self._lock:
+            self.reads += 1
+        return row['result'] if row is not None else None
+
+    def get(self, result_id):
+        """The stored report, or None"""
+        payload = self.get_json(result_id)
+        return json.loads(payload) if payload is not None else None
+
+    def search(self, text=None, pro_number=None, trip_number=None, manifest_number=None,
+               trailer_number=None, exception_type=None, limit=SEARCH_LIMIT):
+        """
+        Exception rows matching every given filter, most recently stored first
+
+        pro_number and the manifest header fields match exactly, or by prefix
+        with a trailing '*'; text is matched against description, notes and markups
+
+        Returns:
+            list: dicts with the exception and its manifest header
+        """
+        limit = max(1, min(int(limit), SEARCH_MAX_LIMIT))
+        source = 'exceptions e JOIN results r ON r.id = e.result_id'
+        where, params = [], []
+        order = 'e.id DESC'
+
+        if text:
+            query = match_query(text)
+            if not query:
+                return []
+            if self.full_text and not (pro_number or trip_number or manifest_number):
+                # Walk the text index newest first and stop at the limit; CROSS JOIN
+                # keeps the planner from probing the index once per exception row
+                source = ('exceptions_fts f CROSS JOIN exceptions e ON e.id = f.rowid'
+                          ' JOIN results r ON r.id = e.result_id')
+                order = 'f.rowid DESC'
+                where.append('exceptions_fts MATCH ?')
+                params.append(query)
+            elif self.full_text:
+                # An indexed number narrows things down far more than any word
+                where.append('e.id IN (SELECT rowid FROM exceptions_fts WHERE exceptions_fts MATCH ?)')
+                params.append(query)
+            else:
+                for word in text.split():
+                    pattern = '%' + word.rstrip('*') + '%'
+                    where.append('(e.description LIKE ? OR e.notes LIKE ? OR e.markups LIKE ?)')
+                    params += [pattern] * 3
+        for column, value in (('e.pro_number', pro_number), ('r.trip_number', trip_number),
+                              ('r.manifest_number', manifest_number), ('r.trailer_number', trailer_number)):
+            if value:
+                clause, values = _value_filter(column, value)
+                where.append(clause)
+                params += values
+        if exception_type:
+            where.append('e.type = ?')
+            params.append(exception_type)
+
+        sql = (
+            'SELECT e.*, r.filename, r.trip_number, r.manifest_number, r.trailer_number, r.processed_at'
+            f' FROM {source}'
+            + (f" WHERE {' AND '.join(where)}" if where else '')
+            + f' ORDER BY {order} LIMIT ?'
+        )
+        rows = self._conn().execute(sql, params + [limit]).fetchall()
+        with self._lock:
+            self.searches += 1
+        return [
+            {
+                'resultId': row['result_id'],
+                'filename': row['filename'],
+                'tripNumber': row['trip_number'],
+                'manifestNumber': row['manifest_number'],
+                'trailerNumber': row['trailer_number'],
+                'processedAt': datetime.fromtimestamp(row['processed_at']).isoformat(),
+                'exception': {
+                    'proNumber': row['pro_number'],
+                    'type': row['type'],
+                    'description': row['description'],
+                    'expectedPieces': row['expected_pieces'],
+                    'actualPieces': row['actual_pieces'],
+                    'weight': row['weight'],
+                    'notes': row['notes'],
+                    'markups': json.loads(row['markups'] or '[]')
+                }
+            }
+            for row in rows
+        ]
+
+    def search_manifests(self, trip_number=None, manifest_number=None, trailer_number=None,
+                         limit=SEARCH_LIMIT):
+        """Stored manifests by header (exact, or prefix with a trailing '*'), newest first"""
+        limit = max(1, min(int(limit), SEARCH_MAX_LIMIT))
+        where, params = [], []
+        for column, value in (('trip_number', trip_number), ('manifest_number', manifest_number),
+                              ('trailer_number', trailer_number)):
+            if value:
+                clause, values = _value_filter(column, value)
+                where.append(clause)
+                params += values
+        sql = (
+            'SELECT id, filename, trip_number, manifest_number, trailer_number, total_exceptions, processed_at'
+            ' FROM results'
+            + (f" WHERE {' AND '.join(where)}" if where else '')
+            + ' ORDER BY processed_at DESC LIMIT ?'
+        )
+        rows = self._conn().execute(sql, params + [limit]).fetchall()
+        with self._lock:
+            self.searches += 1
+        return [
+            {
+                'resultId': row['id'],
+                'filename': row['filename'],
+                'tripNumber': row['trip_number'],
+                'manifestNumber': row['manifest_number'],
+                'trailerNumber': row['trailer_number'],
+                'totalExceptions': row['total_exceptions'],
+                'processedAt': datetime.fromtimestamp(row['processed_at']).isoformat()
+            }
+            for row in rows
+        ]
+
+    def rollups(self, dimension, start=None, end=None, limit=None):
+        """Pre-aggregated OS&D counters by day, trailer or terminal"""
+        return osd_rollups.query(self._conn(), dimension, start, end, limit)
+
+    def rebuild_rollups(self):
+        """Recompute the OS&D rollups from the stored results"""
+        osd_rollups.rebuild(self._conn())
+
+    def reconciliation_matches(self, pro_number=None, result_id=None, limit=reconciliation.MATCH_LIMIT):
+        """Shortages matched to overages on other manifests, newest first"""
+        return reconciliation.matches(self._conn(), pro_number, result_id, limit)
+
+    def backfill_reconciliation(self):
+        """Re-match every stored shortage and overage, oldest result first"""
+        return reconciliation.backfill(self._conn())
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            'path': self.path,
+            'results': conn.execute('SELECT COUNT(*) FROM results').fetchone()[0],
+            'exceptions': conn.execute('SELECT COUNT(*) FROM exceptions').fetchone()[0],
+            'saves': self.saves,
+            'reads': self.reads,
+            'searches': self.searches,
+            'fullText': self.full_text,
+            'reconciliation': dict(reconciliation.stats(conn), matchedThisProcess=self.matches)
+        }
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Resumable chunked uploads for large scanned manifests
+A client creates an upload, PUTs chunks at byte offsets, asks how much has
+arrived after a network blip, then finalizes it into the normal processing
+path. Chunks go straight into the spool file while the SHA-256 is updated
+incrementally, so finalizing never re-reads the file. Session metadata lives
+next to the job store in SQLite, so any server process can take the next chunk.
+A session moves open -> finalizing -> finalized with compare-and-set updates,
+so of two concurrent finalize calls only one processes the upload
+"""
+
+import fcntl
+import os
+import threading
+import time
+import uuid
+
+from job_store import JOB_STORE_PATH, connect
+from upload_spool import CHUNK_SIZE, MAGIC_WINDOW, PDFSpoolWriter, SpoolError, SpooledUpload, spool_file
+
+RESUMABLE_MAX_BYTES = int(os.environ.get('RESUMABLE_MAX_BYTES', str(200 * 1024 * 1024)))
+# Unfinished uploads (and their partial files) are dropped after this long without a chunk
+RESUMABLE_TTL = int(os.environ.get('RESUMABLE_TTL', str(24 * 3600)))
+# None: upload_spool.SPOOL_DIR
+RESUMABLE_DIR = os.environ.get('RESUMABLE_DIR') or None
+# A finalize with no job attached after this long was abandoned (e.g. the process died mid-finalize)
+RESUMABLE_FINALIZE_TIMEOUT = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    path TEXT NOT NULL,
+    total_size INTEGER,
+    received INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'open',
+    job_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS upload_sessions_updated_at ON upload_sessions (updated_at);
+"""
+
+
+class OffsetMismatch(SpoolError):
+    """A chunk did not start where the upload currently ends"""
+
+    def __init__(self, expected):
+        super().__init__(f"Chunk must start at offset {expected}", 409)
+        self.expected = expected
+
+
+class AlreadyFinalized(Exception):
+    """Another request finalized the upload; job_id is None while it is still being queued"""
+
+    def __init__(self, job_id):
+        super().__init__('Upload is already finalized')
+        self.job_id = job_id
+
+
+class UploadSessions:
+    """
+    Resumable upload sessions
+
+    Usage:
+        sessions = UploadSessions()
+        session = sessions.create('manifest.pdf', total_size=52428800)
+        sessions.append(session['id'], 0, request.stream)       # returns bytes received
+        upload = sessions.finalize(session['id'])               # SpooledUpload
+        sessions.attach_job(session['id'], job.id)              # or sessions.release(session['id'])
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, max_bytes=RESUMABLE_MAX_BYTES, ttl=RESUMABLE_TTL,
+                 spool_dir=RESUMABLE_DIR):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spool_dir = spool_dir
+        self._local = threading.local()
+        # Hash state per session; rebuilt from the file if another process wrote to it
+        self._writers = {}
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.rehashed = 0
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(upload_sessions)')]
+        if 'state' not in columns:
+            # Stores created before finalizing was a compare-and-set
+            conn.execute("ALTER TABLE upload_sessions ADD COLUMN state TEXT NOT NULL DEFAULT 'open'")
+            conn.execute("UPDATE upload_sessions SET state = 'finalized' WHERE job_id IS NOT NULL")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def create(self, filename, total_size=None):
+        """
+        Start an upload
+
+        Raises:
+            SpoolError: declared size over the limit
+        """
+        if total_size is not None and total_size > self.max_bytes:
+            raise SpoolError(f"Upload exceeds the maximum size of {self.max_bytes} bytes", 413)
+        self.prune()
+        fd, spool_path = spool_file('.pdf', self.spool_dir)
+        os.close(fd)
+        now = time.time()
+        session_id = uuid.uuid4().hex
+        self._conn().execute(
+            'INSERT INTO upload_sessions (id, filename, path, total_size, created_at, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            (session_id, filename, spool_path, total_size, now, now)
+        )
+        return self.get(session_id)
+
+    def get(self, session_id):
+        row = self._conn().execute('SELECT * FROM upload_sessions WHERE id = ?', (session_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def append(self, session_id, offset, stream, chunk_size=CHUNK_SIZE):
+        """
+        Write one chunk read from stream at offset
+
+        Returns:
+            int: bytes received so far (also after a chunk cut short by a disconnect)
+
+        Raises:
+            KeyError: unknown or finalized upload
+            OffsetMismatch: offset is not the current end of the upload
+            SpoolError: over the size limit or not a PDF
+        """
+        session = self.get(session_id)
+        if session is None or session['state'] != 'open':
+            raise KeyError(session_id)
+
+        with open(session['path'], 'ab') as f:
+            # One writer per file at a time, whichever process it is in
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # finalize() may have taken the upload while we waited for the lock
+                session = self.get(session_id)
+                if session is None or session['state'] != 'open':
+                    raise KeyError(session_id)
+                writer = self._writer(session)
+                if offset != writer.size:
+                    raise OffsetMismatch(writer.size)
+                try:
+                    while True:
+                        chunk = stream.read(chunk_size)
+                        if not chunk:
+                            break
+                        writer.write(f, chunk, session['total_size'] or self.max_bytes)
+                finally:
+                    f.flush()
+                    self._conn().execute(
+                        'UPDATE upload_sessions SET received = ?, updated_at = ? WHERE id = ?',
+                        (writer.size, time.time(), session_id)
+                    )
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        with self._lock:
+            self.chunks += 1
+        return writer.size
+
+    def _writer(self, session):
+        """Hash state for the session's file, matching what is on disk"""
+        size = os.path.getsize(session['path'])
+        with self._lock:
+            writer = self._writers.get(session['id'])
+        if writer is not None and writer.size == size:
+            return writer
+
+        # Another process took earlier chunks (or we restarted): hash what is there
+        writer = PDFSpoolWriter(session['path'])
+        with open(session['path'], 'rb') as existing:
+            while True:
+                chunk = existing.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.size += len(chunk)
+                writer.digest.update(chunk)
+                if len(writer.head) < MAGIC_WINDOW:
+                    writer.head = (writer.head + chunk)[:MAGIC_WINDOW]
+        with self._lock:
+            self._writers[session['id']] = writer
+            if size:
+                self.rehashed += 1
+        return writer
+
+    def finalize(self, session_id):
+        """
+        Close the upload and hand over its spool file
+        Only the caller that moves the session from open to finalizing gets
+        the file; it then calls attach_job() or release(). A finalizing claim
+        older than RESUMABLE_FINALIZE_TIMEOUT without a job is taken over
+
+        Returns:
+            SpooledUpload: the finished file (now owned by the caller)
+
+        Raises:
+            KeyError: unknown upload
+            AlreadyFinalized: another request finalized (or is finalizing) the upload
+            SpoolError: incomplete, empty or not a PDF (the upload stays open)
+        """
+        now = time.time()
+        cursor = self._conn().execute(
+            "UPDATE upload_sessions SET state = 'finalizing', updated_at = ? WHERE id = ? AND (state = 'open'"
+            " OR (state = 'finalizing' AND job_id IS NULL AND updated_at < ?))",
+            (now, session_id, now - RESUMABLE_FINALIZE_TIMEOUT)
+        )
+        session = self.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        if cursor.rowcount != 1:
+            raise AlreadyFinalized(session['job_id'])
+
+        try:
+            with open(session['path'], 'rb') as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                try:
+                    writer = self._writer(session)
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            if session['total_size'] is not None and writer.size != session['total_size']:
+                raise SpoolError(
+                    f"Upload incomplete: {writer.size} of {session['total_size']} bytes received", 409
+                )
+            upload = writer.finish()
+        except Exception:
+            self.release(session_id)
+            raise
+        with self._lock:
+            self._writers.pop(session_id, None)
+        return upload
+
+    def attach_job(self, session_id, job_id):
+        """Mark the upload finalized into job_id (a repeated finalize returns that job)"""
+        self._conn().execute(
+            "UPDATE upload_sessions SET state = 'finalized', job_id = ?, updated_at = ? WHERE id = ?",
+            (job_id, time.time(), session_id)
+        )
+
+    def release(self, session_id):
+        """Reopen an upload whose finalize failed (e.g. the queue was full) so it can be finalized again"""
+        self._conn().execute(
+            "UPDATE upload_sessions SET state = 'open', updated_at = ? WHERE id = ? AND state = 'finalizing'",
+            (time.time(), session_id)
+        )
+
+    def wait_for_job(self, session_id, timeout):
+        """Job id of a finalized upload, waiting up to timeout while another request queues it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            session = self.get(session_id)
+            if session is None or session['job_id'] is not None or session['state'] != 'finalizing':
+                return session['job_id'] if session is not None else None
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+
+    def discard(self, session_id):
+        """Abort an upload and remove its partial file"""
+        session = self.get(session_id)
+        if session is None:
+            return False
+        self._conn().execute('DELETE FROM upload_sessions WHERE id = ?', (session_id,))
+        with self._lock:
+            self._writers.pop(session_id, None)
+        if session['state'] == 'open':
+            SpooledUpload(session['path'], 0, None).discard()
+        return True
+
+    def prune(self):
+        """Forget uploads idle for longer than the TTL; unfinished ones lose their file"""
+        cutoff = time.time() - self.ttl
+        rows = self._conn().execute(
+            'SELECT id FROM upload_sessions WHERE updated_at < ?', (cutoff,)
+        ).fetchall()
+        for row in rows:
+            self.discard(row['id'])
+
+    def stats(self):
+        counts = self._conn().execute(
+            "SELECT COUNT(*) AS total, SUM(state = 'open') AS open, SUM(CASE WHEN state = 'open' THEN received END)"
+            ' AS bytes FROM upload_sessions'
+        ).fetchone()
+        return {
+            'sessions': counts['total'],
+            'open': counts['open'] or 0,
+            'openBytes': counts['bytes'] or 0,
+            'maxBytes': self.max_bytes,
+            'chunks': self.chunks,
+            'rehashed': self.rehashed
+        }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical work
+Concurrent callers with the same key (the PDF content hash) share one
+computation instead of each starting their own Swift subprocess
+"""
+
+import copy
+import threading
+import time
+
+
+class _Call:
+    """One in-flight computation and the callers attached to it"""
+
+    def __init__(self, lease=None):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+        self.followers = 0
+        self.lease = lease
+        self.expires = time.monotonic() + lease if lease else None
+
+    def wait(self):
+        """Wait for the leader while its lease holds; True once it has finished"""
+        while True:
+            if self.expires is None:
+                return self.done.wait()
+            remaining = self.expires - time.monotonic()
+            if remaining <= 0:
+                return self.done.is_set()
+            if self.done.wait(remaining):
+                return True
+
+
+class SingleFlight:
+    """
+    In-flight registry keyed by content hash
+
+    The first caller for a key becomes the leader and runs fn; callers that
+    arrive while it runs wait for its result. If the leader fails (raises or
+    returns a result that is_failure rejects) or lets its `timeout` lease run
+    out, a waiting follower takes over and runs its own fn. A leader that is
+    legitimately busy for longer (e.g. polling an async batch) calls renew()
+    from inside fn to extend its lease. A result that keeps working after fn
+    returns (an upstream batch handle) can be held: later callers still attach
+    to it until its release() runs.
+
+    Usage:
+        flight = SingleFlight()
+        result, shared = flight.do(content_hash, lambda: run_swift(path), timeout=130)
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.leaders = 0
+        self.shared = 0
+        self.handoffs = 0
+        self.takeovers = 0
+
+    def do(self, key, fn, timeout=None, is_failure=None, hold=None):
+        """
+        Run fn once per key across concurrent callers
+        hold(result, release) returns True to keep a successful call joinable
+        until release() is called
+
+        Returns:
+            tuple: (result, shared) - shared is True when the result came from
+            another caller's computation (followers get their own deep copy)
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = _Call(timeout)
+                    self._calls[key] = call
+                    self.leaders += 1
+                    leader = True
+                else:
+                    call.followers += 1
+                    leader = False
+
+            if leader:
+                return self._lead(key, call, fn, is_failure, hold), False
+
+            finished = call.wait()
+            if finished and call.ok:
+                with self._lock:
+                    self.shared += 1
+                return copy.deepcopy(call.result), True
+
+            with self._lock:
+                if finished:
+                    # Leader failed - the first follower back in becomes the new leader
+                    self.handoffs += 1
+                elif self._calls.get(key) is call:
+                    # Leader looks hung - stop waiting on it and take the work over
+                    del self._calls[key]
+                    self.takeovers += 1
+                    print(f"⏱️  Single-flight leader for {key[:12]} silent for {timeout}s, taking over")
+
+    def renew(self):
+        """Extend the lease of the call this thread is leading (no-op outside a leader's fn)"""
+        call = getattr(self._local, 'call', None)
+        if call is not None and call.lease:
+            call.expires = time.monotonic() + call.lease
+
+    def _lead(self, key, call, fn, is_failure, hold):
+        self._local.call = call
+        held = False
+        try:
+            result = fn()
+            call.result = result
+            call.ok = not (is_failure and is_failure(result))
+            if call.ok and hold is not None:
+                held = hold(result, lambda: self._forget(key, call))
+            return result
+        finally:
+            self._local.call = None
+            if not held:
+                self._forget(key, call)
+            call.done.set()
+
+    def _forget(self, key, call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'inFlight': len(self._calls),
+                'attached': sum(call.followers for call in self._calls.values()),
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'handoffs': self.handoffs,
+                'takeovers': self.takeovers
+            }
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Build-once and warm-up handling for the manifest-processor executable
+The optimized release binary is located or built exactly once (under a
+thread lock and a file lock shared with other server processes), then the
+worker pool is warmed up before the server reports itself ready
+"""
+
+import fcntl
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+BUILD_CONFIGURATION = os.environ.get('SWIFT_BUILD_CONFIGURATION', 'release')
+BUILD_TIMEOUT = int(os.environ.get('SWIFT_BUILD_TIMEOUT', '900'))
+WARMUP_TIMEOUT = float(os.environ.get('SWIFT_WARMUP_TIMEOUT', '60'))
+
+# Smallest document the processor accepts; only used to exercise the workers
+WARMUP_PDF = b'%PDF-1.4\n%warm-up\n%%EOF\n'
+
+_build_lock = threading.Lock()
+
+
+class BuildError(Exception):
+    """Raised when the Swift package cannot be built"""
+
+
+def executable_path(project_root, configuration=BUILD_CONFIGURATION):
+    return Path(project_root) / '.build' / configuration / 'manifest-processor'
+
+
+def needs_build(executable, project_root):
+    """True when the binary is missing or older than any Swift source"""
+    executable = Path(executable)
+    if not executable.exists():
+        return True
+    built_at = executable.stat().st_mtime
+    project_root = Path(project_root)
+    sources = [project_root / 'Package.swift']
+    sources.extend((project_root / 'Sources').rglob('*.swift'))
+    return any(source.exists() and source.stat().st_mtime > built_at for source in sources)
+
+
+def ensure_executable(project_root, configuration=BUILD_CONFIGURATION, timeout=BUILD_TIMEOUT):
+    """
+    Return the path of an up-to-date manifest-processor binary, building it if needed
+    Concurrent callers (threads or processes) wait for a single build
+
+    Raises:
+        BuildError: swift is missing or the build failed
+    """
+    project_root = Path(project_root)
+    executable = executable_path(project_root, configuration)
+
+    with _build_lock:
+        if not needs_build(executable, project_root):
+            return executable
+
+        lock_dir = project_root / '.build'
+        lock_dir.mkdir(exist_ok=True)
+        with open(lock_dir / '.manifest-processor.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have finished the build while we waited
+                if not needs_build(executable, project_root):
+                    return executable
+
+                print(f"🔨 Building manifest-processor ({configuration})...")
+                started = time.monotonic()
+                try:
+                    result = subprocess.run(
+                        ['swift', 'build', '-c', configuration, '--product', 'manifest-processor'],
+                        capture_output=True,
+                        text=True,
+                        timeout=timeout,
+                        cwd=project_root
+                    )
+                except FileNotFoundError:
+                    raise BuildError("Swift toolchain not found - install Swift to build manifest-processor")
+                except subprocess.TimeoutExpired:
+                    raise BuildError(f"Swift build timed out after {timeout}s")
+
+                if result.returncode != 0 or not executable.exists():
+                    raise BuildError(f"Swift build failed: {result.stderr.strip()[-2000:]}")
+
+                print(f"✅ manifest-processor built in {time.monotonic() - started:.1f}s")
+                return executable
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def warm_up_pool(pool, timeout=WARMUP_TIMEOUT):
+    """
+    Push one tiny document through every worker at the same time, so each
+    process has loaded and initialized before real traffic arrives
+
+    Returns:
+        int: number of workers that answered
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(WARMUP_PDF)
+
+    answered = []
+    errors = []
+
+    def warm_one():
+        try:
+            pool.process(path, filename='warm-up.pdf', timeout=timeout)
+            answered.append(True)
+        except Exception as e:
+            errors.append(str(e))
+
+    try:
+        threads = [threading.Thread(target=warm_one, daemon=True) for _ in range(pool.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        os.unlink(path)
+
+    if not answered:
+        raise BuildError(f"No Swift worker answered the warm-up job: {errors[0] if errors else 'unknown error'}")
+    return len(answered)
+
+
+class SwiftWarmup:
+    """
+    Startup sequence: locate/build the binary, hand it to the owner, warm up
+
+    Usage:
+        warmup = SwiftWarmup(root, prepare_pool)   # prepare_pool(executable) -> pool or None
+        warmup.start()                             # background thread
+        warmup.warming                             # True until finished
+    """
+
+    def __init__(self, project_root, prepare_pool, configuration=BUILD_CONFIGURATION):
+        self.project_root = Path(project_root)
+        self.prepare_pool = prepare_pool
+        self.configuration = configuration
+        self.state = 'pending'
+        self.error = None
+        self.executable = None
+        self.workers_warmed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def warming(self):
+        """True between start() and the end of the warm-up"""
+        return self.state in ('building', 'warming')
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def start(self):
+        with self._lock:
+            if self.state != 'pending':
+                return
+            self.state = 'building'
+            self.started_at = datetime.now()
+        threading.Thread(target=self.run, name='swift-warmup', daemon=True).start()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def run(self):
+        try:
+            self.executable = ensure_executable(self.project_root, self.configuration)
+            self.state = 'warming'
+            pool = self.prepare_pool(self.executable)
+            if pool is not None:
+                pool.start()
+                self.workers_warmed = warm_up_pool(pool)
+            self.state = 'ready'
+            print(f"🔥 Swift processor warm ({self.workers_warmed} workers): {self.executable}")
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            print(f"❌ Swift warm-up failed, requests will use the fallback: {e}")
+        finally:
+            self.finished_at = datetime.now()
+            self._done.set()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'executable': str(self.executable) if self.executable else None,
+            'configuration': self.configuration,
+            'workersWarmed': self.workers_warmed,
+            'error': self.error,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Fast parser for `manifest-processor --json` output
+The CLI emits newline-delimited JSON records and nothing else:
+
+    {"record": "manifest", "filename": ..., "manifest": {...}, ...}
+    {"record": "exception", "proNumber": ..., "type": "shortage", ...}   (one per row)
+    {"record": "summary", "summary": {...}, "note": ...}
+    {"record": "error", "error": "..."}
+
+The parser reads the subprocess pipe as data arrives, decodes one line at a
+time and never holds more than one partial line, so large manifests parse in
+linear time and bounded memory
+"""
+
+import json
+import os
+import selectors
+import subprocess
+import time
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+    json_loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+READ_SIZE = 64 * 1024
+
+
+class SwiftOutputError(Exception):
+    """Raised when the CLI fails, times out or reports an error record"""
+
+
+class SwiftRecordParser:
+    """
+    Incremental NDJSON parser
+
+    Usage:
+        parser = SwiftRecordParser()
+        for chunk in chunks:
+            for record in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self):
+        self._partial = b''
+        self.records = 0
+        self.skipped = 0
+
+    def feed(self, chunk):
+        """Yield every complete record in chunk (bytes); keeps the trailing partial line"""
+        if self._partial:
+            chunk = self._partial + chunk
+        start = 0
+        while True:
+            end = chunk.find(b'\n', start)
+            if end == -1:
+                break
+            record = self._decode(chunk[start:end])
+            if record is not None:
+                yield record
+            start = end + 1
+        self._partial = chunk[start:]
+
+    def close(self):
+        """Yield a final record not terminated by a newline"""
+        if self._partial:
+            record = self._decode(self._partial)
+            self._partial = b''
+            if record is not None:
+                yield record
+
+    def _decode(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        if not line.startswith(b'{'):
+            # Not ours (e.g. a stray log line) - skip without trying to decode
+            self.skipped += 1
+            return None
+        try:
+            record = json_loads(line)
+        except JSONDecodeError:
+            self.skipped += 1
+            return None
+        self.records += 1
+        return record
+
+
+class ResultAssembler:
+    """Builds the web response dict from a stream of records"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.result = {
+            'status': 'success',
+            'filename': filename,
+            'manifest': {},
+            'exceptions': [],
+            'summary': {}
+        }
+        self.error = None
+
+    def add(self, record):
+        kind = record.pop('record', None)
+        if kind == 'exception':
+            self.result['exceptions'].append(record)
+        elif kind in ('manifest', 'summary'):
+            self.result.update(record)
+            if self.filename:
+                # The CLI only sees the spooled temp file; keep the uploaded name
+                self.result['filename'] = self.filename
+        elif kind == 'error':
+            self.error = record.get('error', 'Unknown Swift processor error')
+
+    def finish(self):
+        if self.error:
+            raise SwiftOutputError(self.error)
+        if not self.result['manifest']:
+            raise SwiftOutputError('Swift processor produced no manifest record')
+        summary = self.result['summary']
+        summary.setdefault('totalExceptions', len(self.result['exceptions']))
+        return self.result
+
+
+def parse_records(data, filename):
+    """Parse a complete NDJSON output (bytes or str) held in memory"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    parser = SwiftRecordParser()
+    assembler = ResultAssembler(filename)
+    for record in parser.feed(data):
+        assembler.add(record)
+    for record in parser.close():
+        assembler.add(record)
+    return assembler.finish()
+
+
+def run_swift_json(command, filename, timeout=120, cwd=None):
+    """
+    Run the CLI in --json mode and parse its stdout while it is being written
+
+    Returns:
+        dict: web-format result
+
+    Raises:
+        SwiftOutputError: non-zero exit, timeout or error record
+        FileNotFoundError: the executable (or swift) is missing
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, cwd=cwd)
+    parser = SwiftRecordParser()
+    assembler = ResultAssembler(filename)
+    deadline = time.monotonic() + timeout
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ)
+    fd = process.stdout.fileno()
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SwiftOutputError(f"Swift processor timed out after {timeout}s")
+            if not selector.select(remaining):
+                continue
+            chunk = os.read(fd, READ_SIZE)
+            if not chunk:
+                break
+            for record in parser.feed(chunk):
+                assembler.add(record)
+        for record in parser.close():
+            assembler.add(record)
+
+        returncode = process.wait(timeout=max(0.1, deadline - time.monotonic()))
+        if returncode != 0 and assembler.error is None:
+            raise SwiftOutputError(f"Swift processor exited with code {returncode}")
+        return assembler.finish()
+    except subprocess.TimeoutExpired:
+        raise SwiftOutputError(f"Swift processor timed out after {timeout}s")
+    finally:
+        selector.close()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
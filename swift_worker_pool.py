@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Persistent worker pool for the Swift Manifest Exception Processor
+Keeps long-lived `manifest-processor --worker` processes running and feeds them
+JSON-line job descriptors, instead of paying `swift run` for every upload
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from swift_output import json_loads, JSONDecodeError
+
+DEFAULT_POOL_SIZE = int(os.environ.get('SWIFT_POOL_SIZE', '2'))
+DEFAULT_JOB_TIMEOUT = float(os.environ.get('SWIFT_JOB_TIMEOUT', '120'))
+
+
+class WorkerError(Exception):
+    """Raised when a worker crashes, hangs or reports a failed job"""
+
+
+class PoolUnavailable(WorkerError):
+    """Raised when no worker process can be started at all"""
+
+
+def swift_command(project_root, *args):
+    """
+    Command line for manifest-processor with the given arguments
+    Prefers an already built binary (release first), falls back to `swift run`
+    """
+    project_root = Path(project_root)
+    for config in ('release', 'debug'):
+        executable = project_root / '.build' / config / 'manifest-processor'
+        if executable.exists():
+            return [str(executable), *args]
+    return ['swift', 'run', 'manifest-processor', *args]
+
+
+def default_worker_command(project_root):
+    """Command used to start a worker (`swift run` is paid once per worker, not per job)"""
+    return swift_command(project_root, '--worker')
+
+
+class SwiftWorker:
+    """One long-lived manifest-processor process speaking JSON lines"""
+
+    def __init__(self, command, cwd, index, generation=0):
+        self.command = command
+        self.cwd = cwd
+        self.index = index
+        # Pool generation (bumped by shutdown / a command switch) the worker belongs to
+        self.generation = generation
+        self.process = None
+        self.responses = None
+        self.jobs_done = 0
+        self.restarts = 0
+
+    def start(self):
+        try:
+            self.process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                cwd=self.cwd
+            )
+        except (FileNotFoundError, PermissionError) as e:
+            self.process = None
+            raise PoolUnavailable(f"Cannot start Swift worker: {e}")
+
+        # Each process gets its own response queue so a late line from a
+        # killed process can never be mistaken for the answer to a new job
+        self.responses = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_stdout,
+            args=(self.process, self.responses),
+            daemon=True
+        )
+        reader.start()
+
+    @staticmethod
+    def _read_stdout(process, responses):
+        for line in process.stdout:
+            line = line.strip()
+            # Anything that is not a JSON record (build chatter, banners) is ignored
+            if not line.startswith('{'):
+                continue
+            try:
+                responses.put(json_loads(line))
+            except JSONDecodeError:
+                continue
+        responses.put(None)  # EOF - the worker exited
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def run_job(self, job, timeout):
+        """Send one job descriptor and wait for its result record"""
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise WorkerError(f"Worker {self.index} is not accepting jobs: {e}")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError(f"Worker {self.index} timed out after {timeout:.0f}s")
+            try:
+                record = self.responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if record is None:
+                raise WorkerError(f"Worker {self.index} exited while processing a job")
+            if record.get('id') != job['id']:
+                continue
+            self.jobs_done += 1
+            return record
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        except Exception:
+            pass
+        self.process = None
+
+    def restart(self):
+        print(f"🔁 Restarting Swift worker {self.index}")
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+
+class SwiftWorkerPool:
+    """
+    Pool of Swift workers, resizable at runtime
+
+    Usage:
+        pool = SwiftWorkerPool(default_worker_command(root), cwd=root, size=4)
+        result = pool.process('/tmp/upload.pdf', filename='manifest.pdf')
+    """
+
+    def __init__(self, command, cwd=None, size=DEFAULT_POOL_SIZE, job_timeout=DEFAULT_JOB_TIMEOUT):
+        self.command = list(command)
+        self.cwd = str(cwd) if cwd else None
+        self.size = max(1, int(size))
+        self.job_timeout = job_timeout
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._checked_in = threading.Condition(self._lock)
+        self._started = False
+        self._generation = 0
+        # Jobs in flight per generation, so shutdown can wait for the old ones
+        self._busy = {}
+        self._retiring = 0
+        self._next_index = 0
+
+    def start(self):
+        """Spawn the workers; safe to call more than once"""
+        with self._lock:
+            if self._started:
+                return
+            workers = []
+            try:
+                for index in range(self.size):
+                    worker = SwiftWorker(self.command, self.cwd, index, self._generation)
+                    worker.start()
+                    workers.append(worker)
+                self._next_index = self.size
+            except PoolUnavailable:
+                for worker in workers:
+                    worker.stop()
+                raise
+            self._workers = workers
+            for worker in workers:
+                self._idle.put(worker)
+            self._started = True
+            print(f"🧵 Swift worker pool started with {self.size} workers: {' '.join(self.command)}")
+
+    def process(self, pdf_path, filename=None, mode='sync', timeout=None):
+        """
+        Run one document through a worker
+
+        Returns:
+            dict: the worker's result payload
+
+        Raises:
+            WorkerError: the worker failed, crashed or hung (it is restarted)
+        """
+        timeout = timeout or self.job_timeout
+
+        deadline = time.monotonic() + timeout
+        while True:
+            # Again on every wake-up: a command switch may have shut the pool down meanwhile
+            self.start()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError(f"No Swift worker became free within {timeout:.0f}s")
+            try:
+                worker = self._idle.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            with self._lock:
+                if worker.generation == self._generation:
+                    self._busy[worker.generation] = self._busy.get(worker.generation, 0) + 1
+                    break
+            # Left over from before a command switch
+            worker.stop()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'pdfPath': str(pdf_path),
+            'filename': filename or os.path.basename(str(pdf_path)),
+            'mode': mode
+        }
+
+        try:
+            if not worker.is_alive():
+                worker.restart()
+            record = worker.run_job(job, timeout)
+        except WorkerError:
+            if worker.generation == self._generation:
+                self._replace(worker)
+            raise
+        finally:
+            self._checkin(worker)
+
+        if 'error' in record:
+            raise WorkerError(record['error'])
+        return record.get('result', {})
+
+    def _checkin(self, worker, busy=True):
+        """
+        Return a worker to the idle queue, or stop it if the pool is shrinking
+        or it belongs to a generation that has been shut down
+        """
+        with self._lock:
+            if busy:
+                self._busy[worker.generation] -= 1
+                if not self._busy[worker.generation]:
+                    del self._busy[worker.generation]
+                self._checked_in.notify_all()
+            if worker.generation != self._generation:
+                retire = True
+            elif self._retiring > 0 and worker in self._workers:
+                self._retiring -= 1
+                self._workers.remove(worker)
+                retire = True
+            else:
+                retire = False
+        if retire:
+            worker.stop()
+        else:
+            self._idle.put(worker)
+
+    def resize(self, size):
+        """
+        Grow or shrink the pool
+        New workers start at once; surplus workers are stopped as they go idle
+        """
+        size = max(1, int(size))
+        with self._lock:
+            if size == self.size:
+                return
+            print(f"🧵 Resizing Swift worker pool {self.size} -> {size}")
+            self.size = size
+            if not self._started:
+                return
+            self._retiring = max(0, len(self._workers) - size)
+            while len(self._workers) < size:
+                worker = SwiftWorker(self.command, self.cwd, self._next_index, self._generation)
+                try:
+                    worker.start()
+                except PoolUnavailable as e:
+                    print(f"❌ Could not grow Swift worker pool: {e}")
+                    break
+                self._next_index += 1
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+        # Retire idle workers right away rather than waiting for their next job
+        while True:
+            with self._lock:
+                if self._retiring <= 0:
+                    break
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._checkin(worker, busy=False)
+
+    def _replace(self, worker):
+        try:
+            worker.restart()
+        except PoolUnavailable as e:
+            print(f"❌ Could not restart Swift worker {worker.index}: {e}")
+
+    def set_command(self, command):
+        """
+        Switch to a different executable; workers running the old one finish
+        their current job and are stopped, the next job starts fresh workers
+        """
+        command = list(command)
+        with self._lock:
+            if command == self.command:
+                return
+            self.command = command
+        self.shutdown()
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'started': self._started,
+            'command': self.command,
+            'workers': [
+                {
+                    'index': worker.index,
+                    'alive': worker.is_alive(),
+                    'jobsDone': worker.jobs_done,
+                    'restarts': worker.restarts
+                }
+                for worker in self._workers
+            ]
+        }
+
+    def shutdown(self, timeout=None):
+        """
+        Stop every worker: idle ones at once, busy ones when their job is done
+        Waits up to timeout (default: the job timeout) for those jobs
+        """
+        with self._lock:
+            generation = self._generation
+            # Workers from this generation are retired at checkin from now on
+            self._generation += 1
+            self._started = False
+            self._retiring = 0
+            self._workers = []
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        for worker in idle:
+            worker.stop()
+
+        deadline = time.monotonic() + (self.job_timeout if timeout is None else timeout)
+        with self._lock:
+            while self._busy.get(generation):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._checked_in.wait(remaining)
@@ -10,7 +10,8 @@ import os
 def create_exception_pdf():
     """Create a PDF with 'exception' in filename to trigger exception generation"""
     with tempfile.NamedTemporaryFile(delete=False, suffix='_exception_manifest.pdf') as tmp:
-        tmp.write(b"""TEST MANIFEST EXCEPTION DOCUMENT
+        tmp.write(b"""%PDF-1.4
+TEST MANIFEST EXCEPTION DOCUMENT
 PRO123456 - SHORTAGE - 5 PIECES MISSING
 PRO789012 - DAMAGE - WATER DAMAGE  
 Trip: 1234567, Manifest: MF-2024-001""")
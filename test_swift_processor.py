@@ -108,7 +108,7 @@ def test_web_integration():
         # We can't directly import due to Flask context, so just test the concept
         print("🔧 Web integration functions available")
         print("✅ try_swift_processor() function defined in stable_web_app.py")
-        print("✅ parse_swift_output() function defined in stable_web_app.py")
+        print("✅ run_swift_json() parser defined in swift_output.py")
         print("✅ format_swift_response() function defined in stable_web_app.py")
         return True
     except Exception as e:
@@ -25,7 +25,8 @@ def create_sample_pdf():
     except ImportError:
         print("📦 reportlab not available, creating text file as PDF")
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            tmp.write(b"""TEST MANIFEST EXCEPTION DOCUMENT
+            tmp.write(b"""%PDF-1.4
+TEST MANIFEST EXCEPTION DOCUMENT
 PRO123456 - SHORTAGE - 5 PIECES MISSING
 PRO789012 - DAMAGE - WATER DAMAGE  
 Trip: 1234567, Manifest: MF-2024-001""")
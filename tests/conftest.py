@@ -0,0 +1,84 @@
+"""Shared fixtures; the modules under test live at the repository root"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Default store and cache paths are read at import time: keep them out of the real ones
+DATA_DIR = tempfile.mkdtemp(prefix='manifest-tests-')
+os.environ['DATA_DIR'] = DATA_DIR
+os.environ['JOB_STORE_PATH'] = os.path.join(DATA_DIR, 'jobs.db')
+os.environ['RESULT_STORE_PATH'] = os.path.join(DATA_DIR, 'results.db')
+os.environ['TOKEN_CACHE_FILE'] = os.path.join(DATA_DIR, 'token.json')
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def web_app():
+    """stable_web_app with its stores in the test data directory (imported once per session)"""
+    import stable_web_app
+    return stable_web_app
+
+
+@pytest.fixture
+def mock_api():
+    from mock_document_api import MockDocumentAPI
+
+    api = MockDocumentAPI(async_delay=0.3).start()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def api_client(mock_api, tmp_path):
+    from document_api import DocumentAPIClient
+
+    client = DocumentAPIClient(base_url=mock_api.base_url, pool_size=2, timeout=10)
+    client.tokens.cache_path = str(tmp_path / 'token.json')
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def client(web_app):
+    return web_app.app.test_client()
+
+
+@pytest.fixture
+def demo_backend(web_app, monkeypatch):
+    """Every job falls back to demo data instead of running Swift"""
+    monkeypatch.setattr(web_app, 'run_backend', lambda *args, **kwargs: None)
+
+
+@pytest.fixture
+def result_store(tmp_path):
+    from result_store import ResultStore
+
+    return ResultStore(str(tmp_path / 'results.db'))
+
+
+@pytest.fixture
+def manifest_result():
+    """Factory for a normalized result shaped like format_swift_response's output"""
+    def make(trip='T100', trailer='TRL1', manifest='M100', exceptions=(), terminal=None):
+        result = {
+            'success': True,
+            'filename': f'{trip}.pdf',
+            'source': 'swift_processor',
+            'manifest': {'tripNumber': trip, 'manifestNumber': manifest, 'trailerNumber': trailer},
+            'exceptions': [dict(exception) for exception in exceptions]
+        }
+        if terminal:
+            result['terminal'] = terminal
+        return result
+    return make
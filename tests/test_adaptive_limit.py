@@ -0,0 +1,37 @@
+from adaptive_limit import AIMDLimit
+from admission import AdmissionLimiter
+
+
+def test_grows_additively_while_used_and_healthy():
+    limit = AIMDLimit(initial=2, max_limit=4, latency_target=10)
+    for _ in range(20):
+        limit.on_sample(1.0, ok=True, in_flight=limit.limit)
+    assert limit.limit == 4
+
+
+def test_does_not_grow_while_idle():
+    limit = AIMDLimit(initial=4, max_limit=8, latency_target=10)
+    for _ in range(20):
+        limit.on_sample(1.0, ok=True, in_flight=1)
+    assert limit.limit == 4
+
+
+def test_errors_and_slow_runs_cut_the_limit():
+    limit = AIMDLimit(initial=8, min_limit=1, max_limit=8, latency_target=10, backoff=0.5)
+    assert limit.on_sample(1.0, ok=False, in_flight=8) == 4
+    assert limit.on_sample(30.0, ok=True, in_flight=4) == 2
+    assert limit.stats()['errors'] == 1 and limit.stats()['slow'] == 1
+    for _ in range(5):
+        limit.on_sample(1.0, ok=False, in_flight=1)
+    assert limit.limit == 1
+
+
+def test_limiter_follows_the_adaptive_limit():
+    changes = []
+    limiter = AdmissionLimiter('interactive', 4, 4, adaptive=AIMDLimit(4, backoff=0.5),
+                               on_limit_change=lambda: changes.append(limiter.limit))
+    ticket = limiter.slot()
+    ticket.fail()
+    ticket.release()
+    assert limiter.limit == 2
+    assert changes == [2]
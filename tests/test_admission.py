@@ -0,0 +1,88 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from admission import AdmissionController, AdmissionLimiter, AdmissionRejected
+from circuit_breaker import CircuitBreaker
+
+PDF = b'%PDF-1.4\n1 0 obj <<>> endobj\n%%EOF\n'
+
+
+def test_rejects_beyond_limit_plus_queue():
+    limiter = AdmissionLimiter('interactive', limit=1, max_waiting=1)
+    running = limiter.slot()
+    waiting = limiter.admit()
+    with pytest.raises(AdmissionRejected) as error:
+        limiter.admit()
+    assert error.value.retry_after >= 1
+    running.release()
+    waiting.close()
+    assert limiter.stats()['rejected'] == 1
+
+
+def test_waiting_ticket_gets_the_slot_once_released():
+    limiter = AdmissionLimiter('interactive', limit=1, max_waiting=4)
+    running = limiter.slot()
+    acquired = threading.Event()
+    waiting = limiter.admit()
+    threading.Thread(target=lambda: (waiting.acquire(), acquired.set())).start()
+    assert not acquired.wait(0.2)
+    running.release()
+    assert acquired.wait(2)
+    assert limiter.stats()['active'] == 1
+    waiting.close()
+    assert limiter.stats()['active'] == 0
+
+
+def test_closing_an_unused_ticket_frees_its_place():
+    limiter = AdmissionLimiter('bulk', limit=1, max_waiting=0)
+    limiter.admit().close()
+    limiter.admit().close()
+    assert limiter.stats()['queueDepth'] == 0
+
+
+def test_bulk_burst_does_not_use_interactive_slots():
+    controller = AdmissionController(interactive_limit=1, interactive_queue=0, bulk_limit=1,
+                                     bulk_queue=0, adaptive=False)
+    bulk = controller.admit(AdmissionController.classify('async')).acquire()
+    with pytest.raises(AdmissionRejected):
+        controller.admit('bulk')
+    interactive = controller.admit(AdmissionController.classify('sync'))
+    interactive.close()
+    bulk.release()
+
+
+def test_bulk_backlog_does_not_hold_up_interactive_uploads(web_app, client, monkeypatch):
+    for name, limit in (('interactive', 2), ('bulk', 1)):
+        monkeypatch.setattr(web_app.admission.limiters[name], 'limit', limit)
+        monkeypatch.setattr(web_app.admission.limiters[name], 'adaptive', None)
+    monkeypatch.setattr(web_app, 'swift_breaker', CircuitBreaker('test'))
+
+    def slow_swift(pdf_path, filename, *args, **kwargs):
+        time.sleep(0.5)
+        return {'status': 'success', 'manifest': {}, 'exceptions': []}
+
+    monkeypatch.setattr(web_app, 'try_swift_processor', slow_swift)
+    run = uuid.uuid4().hex.encode()
+    bulk = [client.post('/jobs', data=PDF + run + bytes([i]), content_type='application/pdf') for i in range(8)]
+    assert [response.status_code for response in bulk] == [202] * 8
+
+    started = time.monotonic()
+    response = client.post('/process', data=PDF + run, content_type='application/pdf')
+    elapsed = time.monotonic() - started
+    assert response.status_code == 200
+    # Eight bulk documents take 4s through the single bulk slot; an interactive one needs one run
+    assert elapsed < 2
+    assert all(web_app.pipeline.get(r.get_json()['jobId']).wait(15) for r in bulk)
+
+
+def test_swift_pool_has_a_worker_per_admission_slot(web_app, monkeypatch):
+    created = []
+    monkeypatch.setattr(web_app, 'swift_pool', None)
+    monkeypatch.setattr(web_app, 'SwiftWorkerPool', lambda *args, **kwargs: created.append(kwargs) or object())
+    monkeypatch.setattr(web_app.admission.limiters['interactive'], 'limit', 2)
+    monkeypatch.setattr(web_app.admission.limiters['bulk'], 'limit', 1)
+    assert web_app.get_swift_pool() is not None
+    assert created[0]['size'] == 3
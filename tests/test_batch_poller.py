@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from batch_poller import BatchPoller
+from document_api import DocumentAPIError, ProcessingTimeout
+
+
+class FakeStatus:
+    """Batches become final after `ready_after` polls; some ids are slow or broken"""
+
+    def __init__(self, ready_after=2, slow=(), slow_for=0.0, broken=()):
+        self.ready_after = ready_after
+        self.slow = set(slow)
+        self.slow_for = slow_for
+        self.broken = set(broken)
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, batch_id):
+        with self.lock:
+            self.calls[batch_id] = self.calls.get(batch_id, 0) + 1
+            calls = self.calls[batch_id]
+        if batch_id in self.slow:
+            time.sleep(self.slow_for)
+        if batch_id in self.broken:
+            raise DocumentAPIError(f'status of {batch_id} failed', status_code=502)
+        state = 'finalized' if calls >= self.ready_after else 'processing'
+        return {'metadata': {'identifier': batch_id, 'state': state}}
+
+
+def poller(fetch, **kwargs):
+    options = dict(initial_interval=0.02, max_interval=0.05, jitter=0.0, concurrency=4)
+    options.update(kwargs)
+    return BatchPoller(fetch, **options)
+
+
+def test_batches_are_polled_until_final():
+    fetch = FakeStatus(ready_after=3)
+    batches = poller(fetch)
+    batch = batches.track('b1').wait(timeout=5)
+    assert batch['metadata']['state'] == 'finalized'
+    assert fetch.calls['b1'] == 3
+    assert batches.stats()['completed'] == 1
+
+
+def test_a_slow_status_call_does_not_hold_up_other_batches():
+    fetch = FakeStatus(ready_after=3, slow={'slow'}, slow_for=1.5)
+    batches = poller(fetch)
+    slow = batches.track('slow')
+    fast = batches.track('fast')
+
+    started = time.monotonic()
+    fast.wait(timeout=5)
+    # Three quick polls, not three rounds gated on the 1.5s call
+    assert time.monotonic() - started < 1.0
+    assert not slow.done
+
+
+def test_a_batch_whose_status_keeps_failing_is_given_up():
+    fetch = FakeStatus(broken={'bad'})
+    batches = poller(fetch, max_errors=3)
+    waiter = batches.track('bad')
+    with pytest.raises(DocumentAPIError):
+        waiter.wait(timeout=5)
+    assert fetch.calls['bad'] == 3
+    stats = batches.stats()
+    assert stats['givenUp'] == 1
+    assert stats['pollErrors'] == 3
+    assert stats['tracked'] == 0
+
+
+def test_failing_batches_back_off_faster_than_pending_ones():
+    fetch = FakeStatus(ready_after=1000, broken={'bad'})
+    batches = poller(fetch, initial_interval=0.05, max_interval=1.0, backoff=1.5, max_errors=100)
+    batches.track('bad')
+    batches.track('pending')
+    time.sleep(1.0)
+    assert fetch.calls['bad'] < fetch.calls['pending']
+
+
+def test_deadline_stops_polling():
+    fetch = FakeStatus(ready_after=1000)
+    batches = poller(fetch)
+    waiter = batches.track('stuck', deadline=0.2)
+    with pytest.raises(ProcessingTimeout):
+        waiter.wait(timeout=5)
+    assert batches.stats()['timedOut'] == 1
@@ -0,0 +1,150 @@
+import io
+import threading
+import time
+import zipfile
+
+import pytest
+
+from bulk_upload import BulkBatch, count_zip_pdfs, iter_zip_pdfs, spool_archive
+from upload_spool import SpoolError
+
+PDF = b'%PDF-1.4\n1 0 obj <<>> endobj\n%%EOF\n'
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    def write(entries):
+        path = tmp_path / 'upload.zip'
+        path.write_bytes(make_zip(entries))
+        return str(path)
+    return write
+
+
+def test_zip_pdf_entries_are_spooled_one_by_one(archive):
+    path = archive({
+        'a.pdf': PDF,
+        'nested/b.PDF': PDF + b'b',
+        'notes.txt': b'not a manifest',
+        '__MACOSX/._a.pdf': b'resource fork',
+        '.hidden.pdf': PDF
+    })
+    entries = list(iter_zip_pdfs(path, max_entry_bytes=1024))
+    assert [name for name, _, _ in entries] == ['a.pdf', 'b.PDF']
+    for _, upload, error in entries:
+        assert error is None
+        assert upload.size > 0 and upload.sha256
+        upload.discard()
+
+
+def test_oversized_entry_is_rejected_without_failing_the_rest(archive):
+    path = archive({'big.pdf': PDF + b'x' * 2048, 'small.pdf': PDF})
+    entries = {name: (upload, error) for name, upload, error in iter_zip_pdfs(path, max_entry_bytes=1024)}
+    assert entries['big.pdf'][0] is None
+    assert entries['big.pdf'][1].status_code == 413
+    assert entries['small.pdf'][1] is None
+    entries['small.pdf'][0].discard()
+
+
+def test_archive_limits(archive):
+    with pytest.raises(SpoolError, match='no PDF'):
+        list(iter_zip_pdfs(archive({'readme.txt': b'x'}), 1024))
+    with pytest.raises(SpoolError) as error:
+        list(iter_zip_pdfs(archive({f'{i}.pdf': PDF for i in range(3)}), 1024, max_documents=2))
+    assert error.value.status_code == 413
+
+
+def test_non_zip_body_is_not_spooled(tmp_path):
+    with pytest.raises(SpoolError, match='not a ZIP'):
+        spool_archive(io.BytesIO(PDF), dir=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_status_follows_its_documents():
+    batch = BulkBatch()
+    batch.add('bad.txt', error='Only PDF and ZIP files are supported')
+    assert batch.status == 'failed'
+    batch.add('a.pdf')
+    assert batch.status == 'queued'
+    assert batch.counts() == {'rejected': 1, 'pending': 1}
+
+
+def wait_for_bulk(client, url, timeout=15):
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(url).get_json()
+        if body['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            return body
+        time.sleep(0.1)
+
+
+def test_many_pdfs_in_one_request(client, demo_backend):
+    response = client.post('/bulk', data={
+        'files': [(io.BytesIO(PDF), f'{i}.pdf') for i in range(3)] + [(io.BytesIO(b'x'), 'notes.txt')]
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    assert response.headers['Location'] == response.get_json()['statusUrl']
+
+    body = wait_for_bulk(client, response.get_json()['statusUrl'])
+    assert body['total'] == 4
+    assert body['status'] == 'partial'
+    assert body['counts'] == {'completed': 3, 'rejected': 1}
+    assert all(d['result'] for d in body['documents'] if d['status'] == 'completed')
+
+
+def test_raw_zip_body(client, demo_backend):
+    response = client.post('/bulk', data=make_zip({'a.pdf': PDF, 'b.pdf': PDF + b'b'}),
+                           content_type='application/zip')
+    assert response.status_code == 202
+    body = wait_for_bulk(client, response.get_json()['statusUrl'])
+    assert body['status'] == 'completed'
+    assert [d['filename'] for d in body['documents']] == ['a.pdf', 'b.pdf']
+
+
+def test_unknown_bulk_batch(client):
+    assert client.get('/bulk/missing').status_code == 404
+
+
+def test_zip_handle_is_returned_before_extraction(client, web_app, demo_backend, monkeypatch):
+    release = threading.Event()
+    real_iter = web_app.iter_zip_pdfs
+
+    def slow_iter(*args, **kwargs):
+        release.wait(5)
+        yield from real_iter(*args, **kwargs)
+
+    monkeypatch.setattr(web_app, 'iter_zip_pdfs', slow_iter)
+    response = client.post('/bulk', data=make_zip({'a.pdf': PDF, 'b.pdf': PDF + b'b'}),
+                           content_type='application/zip')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['extracting'] is True
+    assert body['total'] == 2
+    assert body['documents'] == []
+    assert client.get(body['statusUrl']).get_json()['status'] == 'queued'
+
+    release.set()
+    body = wait_for_bulk(client, body['statusUrl'])
+    assert body['status'] == 'completed'
+    assert body['extracting'] is False
+    assert body['total'] == 2
+
+
+def test_zip_limits_are_checked_before_the_handle_is_returned(client, web_app, monkeypatch):
+    monkeypatch.setattr(web_app, 'BULK_MAX_DOCUMENTS', 2)
+    response = client.post('/bulk', data=make_zip({f'{i}.pdf': PDF for i in range(3)}),
+                           content_type='application/zip')
+    assert response.status_code == 413
+    response = client.post('/bulk', data=make_zip({'notes.txt': b'x'}), content_type='application/zip')
+    assert response.status_code == 400
+
+
+def test_pdf_count_comes_from_the_central_directory(archive):
+    assert count_zip_pdfs(archive({'a.pdf': PDF, 'b.pdf': PDF, 'c.txt': b''})) == 2
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker('swift', failure_threshold=2, reset_timeout=0.1, **kwargs)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record(False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_failures_and_short_circuits():
+    breaker = open_breaker()
+    assert not breaker.allow_request()
+    assert breaker.rejecting()
+    assert breaker.stats()['shortCircuited'] == 1
+
+
+def test_probe_success_closes_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not threading_allow(breaker)
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.probes_in_flight == 0
+
+
+def test_probe_failure_reopens_and_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    time.sleep(0.15)
+    assert breaker.allow_request()
+
+
+def test_exception_in_probe_releases_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.15)
+
+    def call():
+        ok = False
+        try:
+            assert breaker.allow_request()
+            raise OSError('pool died')
+        finally:
+            breaker.record(ok)
+
+    with pytest.raises(OSError):
+        call()
+    assert breaker.probes_in_flight == 0
+    time.sleep(0.15)
+    assert breaker.allow_request()
+
+
+def test_unrecorded_probe_expires():
+    breaker = open_breaker(probe_timeout=0.1)
+    time.sleep(0.15)
+    assert threading_allow(breaker)  # taken on a thread that never records
+    assert not breaker.allow_request()
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    assert breaker.stats()['abandonedProbes'] == 1
+
+
+def test_app_records_failure_when_backend_raises(web_app, monkeypatch):
+    breaker = open_breaker()
+    monkeypatch.setattr(web_app, 'swift_breaker', breaker)
+
+    def broken_backend(*args, **kwargs):
+        raise ValueError('bad JSON from worker')
+
+    monkeypatch.setattr(web_app, 'call_swift_backend', broken_backend)
+    time.sleep(0.15)
+    with pytest.raises(ValueError):
+        web_app.try_swift_processor('/tmp/x.pdf', 'x.pdf')
+    assert breaker.state == OPEN
+    assert breaker.probes_in_flight == 0
+
+
+def threading_allow(breaker):
+    allowed = []
+    thread = threading.Thread(target=lambda: allowed.append(breaker.allow_request()))
+    thread.start()
+    thread.join()
+    return allowed[0]
+
+
+def test_parked_api_request_is_recorded_once(web_app, monkeypatch):
+    from batch_poller import BatchWaiter
+    from document_api import DocumentAPIError
+    from job_queue import Job
+
+    breaker = open_breaker()
+    monkeypatch.setattr(web_app, 'swift_breaker', breaker)
+    waiter = BatchWaiter('b1', time.monotonic() + 5)
+    monkeypatch.setattr(web_app, 'call_swift_backend', lambda *args, **kwargs: waiter)
+    resumed = []
+    monkeypatch.setattr(web_app.pipeline, 'resume', lambda job, stage: resumed.append(stage))
+    time.sleep(0.15)
+
+    # The accepted batch is the half-open probe's success
+    assert web_app.try_swift_processor('/tmp/x.pdf', 'x.pdf') is waiter
+    assert breaker.state == CLOSED
+
+    job = Job(None, (), {}, filename='x.pdf', process_type='async')
+    job.context = {}
+    waiter._finish(error=DocumentAPIError('Batch polling gave up', status_code=502))
+    web_app.finish_batch(job, waiter)
+    assert resumed == ['normalize']
+    assert job.context['raw'] is None
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from document_api import ConnectionPool, DocumentAPIError
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / 'manifest.pdf'
+    path.write_bytes(b'%PDF-1.4\n%%EOF\n')
+    return str(path)
+
+
+def test_sync_processing_returns_the_batch(api_client, pdf):
+    batch = api_client.process_sync(pdf, 'EXCEPTION_001')
+    assert batch['metadata']['state'] == 'finalized'
+    assert batch['output']['general']['manifestInfo']['tripNumber']
+
+
+def test_requests_reuse_pooled_connections(api_client, mock_api, pdf):
+    threads = [threading.Thread(target=api_client.process_sync, args=(pdf, f'ID_{i}')) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Logging in once and eight uploads over at most pool_size (+1 for the token) connections
+    assert mock_api.counts['token'] == 1
+    assert mock_api.counts['connections'] <= 3
+    assert api_client.pool.stats()['reused'] >= 6
+
+
+def test_rejected_token_is_replaced_once(api_client, mock_api, pdf):
+    api_client.process_sync(pdf, 'A')
+    mock_api.revoke_tokens()
+    assert api_client.process_sync(pdf, 'B')['metadata']['state'] == 'finalized'
+    assert mock_api.counts['token'] == 2
+
+
+def test_async_batch_is_polled_to_completion(api_client, pdf):
+    submitted = api_client.process_async(pdf, 'A')
+    batch = api_client.wait_for_completion(submitted['metadata']['identifier'], timeout=10)
+    assert batch['metadata']['state'] == 'finalized'
+
+
+def test_http_errors_carry_the_detail(api_client):
+    with pytest.raises(DocumentAPIError, match='Batch not found') as error:
+        api_client.get_batch_status('missing')
+    assert error.value.status_code == 404
+
+
+def test_unreachable_host_is_an_api_error():
+    pool = ConnectionPool('http://127.0.0.1:9', timeout=2)
+    with pytest.raises(DocumentAPIError):
+        pool.request('GET', '/api/v1/health')
+
+
+def test_small_documents_are_answered_synchronously(api_client, mock_api, pdf):
+    waiter = api_client.process(pdf, 'A', sync_budget=5)
+    assert waiter.execution == 'sync'
+    assert waiter.wait(1)['metadata']['state'] == 'finalized'
+    assert mock_api.counts['batches'] == 1
+
+
+def test_timed_out_sync_batch_is_polled_not_resubmitted(api_client, mock_api, pdf):
+    mock_api.sync_delay = 1.0
+    waiter = api_client.process(pdf, 'A', sync_budget=0.3, timeout=10)
+    assert waiter.execution == 'escalated'
+    assert waiter.wait(10)['metadata']['state'] == 'finalized'
+    # The server kept the first request; it was looked up instead of sent again
+    assert mock_api.counts['batches'] == 1
+    assert mock_api.counts['status'] >= 1
+
+
+def test_timed_out_sync_batch_unknown_to_the_server_is_resubmitted(api_client, mock_api, pdf, monkeypatch):
+    mock_api.sync_delay = 1.0
+    lookups = []
+
+    def not_found(batch_id):
+        lookups.append(batch_id)
+        raise DocumentAPIError('Batch not found', 404)
+
+    monkeypatch.setattr(api_client, 'get_batch_status', not_found)
+    api_client.process(pdf, 'A', sync_budget=0.3, timeout=10)
+    assert len(lookups) == 1
+    assert mock_api.counts['batches'] == 2
+
+
+def test_batches_are_tracked_under_the_identifier_the_server_returns(api_client, pdf, monkeypatch):
+    monkeypatch.setattr(api_client, '_call', lambda *args, **kwargs: {
+        'metadata': {'identifier': 'server-side-id', 'state': 'processing'}
+    })
+    waiter = api_client.process(pdf, 'A', force_async=True)
+    assert waiter.batch_id == 'server-side-id'
+    assert waiter.execution == 'async'
+    assert api_client.poller.stats()['tracked'] == 1
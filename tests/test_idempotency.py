@@ -0,0 +1,77 @@
+import sqlite3
+import uuid
+
+import pytest
+
+from idempotency import FingerprintMismatch, IdempotencyStore, request_fingerprint
+
+PDF = b'%PDF-1.4\n1 0 obj <<>> endobj\n%%EOF\n'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IdempotencyStore(path=str(tmp_path / 'jobs.db'))
+
+
+def test_first_request_claims_and_repeats_replay(store):
+    fingerprint = request_fingerprint('a.pdf', 'abc')
+    assert store.claim('k', fingerprint) == (True, None)
+    assert store.claim('k', fingerprint) == (False, None)
+    store.attach('k', 'job-1')
+    assert store.claim('k', fingerprint) == (False, 'job-1')
+    assert store.stats()['replays'] == 1
+
+
+def test_key_reused_for_another_request_is_refused(store):
+    store.claim('k', request_fingerprint('a.pdf', 'abc'))
+    store.attach('k', 'job-1')
+    with pytest.raises(FingerprintMismatch):
+        store.claim('k', request_fingerprint('a.pdf', 'def'))
+    with pytest.raises(FingerprintMismatch):
+        store.claim('k', request_fingerprint('b.pdf', 'abc'))
+    assert store.stats()['mismatches'] == 2
+
+
+def test_released_key_can_be_claimed_for_another_request(store):
+    store.claim('k', request_fingerprint('a.pdf', 'abc'))
+    store.release('k')
+    assert store.claim('k', request_fingerprint('b.pdf', 'def')) == (True, None)
+
+
+def test_keys_from_before_fingerprints_still_replay(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE idempotency_keys (key TEXT PRIMARY KEY, job_id TEXT,'
+                 ' created_at REAL NOT NULL, expires_at REAL NOT NULL)')
+    conn.execute("INSERT INTO idempotency_keys VALUES ('k', 'job-1', 0, 1e12)")
+    conn.commit()
+    conn.close()
+
+    store = IdempotencyStore(path=path)
+    assert store.claim('k', request_fingerprint('a.pdf', 'abc')) == (False, 'job-1')
+
+
+def post_job(client, data, key, filename='manifest.pdf'):
+    return client.post('/process?processType=async', data=data, content_type='application/pdf',
+                       headers={'Idempotency-Key': key, 'X-Filename': filename})
+
+
+def test_repeated_upload_gets_the_first_job(client, demo_backend):
+    key = uuid.uuid4().hex
+    first = post_job(client, PDF, key)
+    again = post_job(client, PDF, key)
+    assert first.status_code == again.status_code == 202
+    assert again.get_json()['jobId'] == first.get_json()['jobId']
+
+
+def test_key_reused_for_a_different_file_is_rejected(client, demo_backend):
+    key = uuid.uuid4().hex
+    first = post_job(client, PDF, key)
+    assert first.status_code == 202
+
+    other = post_job(client, PDF + b'other', key)
+    assert other.status_code == 422
+    assert 'different request' in other.get_json()['error']
+
+    renamed = post_job(client, PDF, key, filename='other.pdf')
+    assert renamed.status_code == 422
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from job_queue import JobExecutor, QueueFull
+
+
+def test_job_result_is_picked_up_by_id():
+    executor = JobExecutor(workers=2, max_queue=4)
+    job = executor.submit(lambda a, b: a + b, 2, 3, filename='m.pdf')
+    assert job.wait(5)
+    data = executor.get(job.id).to_dict()
+    assert data['status'] == 'completed'
+    assert data['result'] == 5
+    assert data['filename'] == 'm.pdf'
+
+
+def test_failed_job_reports_error():
+    def boom():
+        raise ValueError('bad pdf')
+
+    job = JobExecutor(workers=1).submit(boom)
+    assert job.wait(5)
+    assert job.status == 'failed'
+    assert 'bad pdf' in job.to_dict()['error']
+
+
+def test_full_queue_rejects_instead_of_blocking():
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait()
+
+    executor = JobExecutor(workers=1, max_queue=1)
+    running = executor.submit(hold)
+    assert started.wait(5)
+    waiting = executor.submit(release.wait)
+    with pytest.raises(QueueFull):
+        executor.submit(release.wait)
+    release.set()
+    assert running.wait(5) and waiting.wait(5)
+    assert executor.stats()['rejected'] == 1
+
+
+def test_finished_jobs_are_pruned_after_retention():
+    executor = JobExecutor(workers=1, retention=-1)
+    job = executor.submit(lambda: 1)
+    job.wait(5)
+    executor.submit(lambda: 2).wait(5)
+    assert executor.get(job.id) is None
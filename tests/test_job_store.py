@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT
+from job_queue import Job
+from job_store import SCHEMA, JobStore
+
+
+def make_job(store, **context):
+    job = Job(None, (), {}, filename='manifest.pdf', process_type='async')
+    job.context = context
+    store.add(job)
+    return job
+
+
+def test_stores_default_to_a_data_directory_next_to_the_app():
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('DATA_DIR', 'JOB_STORE_PATH', 'RESULT_STORE_PATH', 'SPOOL_DIR')}
+    output = subprocess.run(
+        [sys.executable, '-c', 'import job_store, result_store, upload_spool;'
+                               'print(job_store.JOB_STORE_PATH); print(result_store.RESULT_STORE_PATH);'
+                               'print(upload_spool.SPOOL_DIR)'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert output == [os.path.join(ROOT, 'data', 'jobs.db'), os.path.join(ROOT, 'data', 'results.db'),
+                      os.path.join(ROOT, 'data', 'spool')]
+
+
+def test_data_dir_is_created_and_survives_a_new_store(tmp_path):
+    path = str(tmp_path / 'state' / 'jobs.db')
+    job = make_job(JobStore(path), path='/spool/a.pdf', size=10, content_hash='abc')
+
+    row = JobStore(path).get(job.id)
+    assert row['state'] == 'queued'
+    assert row['spool_path'] == '/spool/a.pdf'
+
+
+def test_jobs_of_a_dead_process_are_claimed_sent_ones_first(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    before = JobStore(path)
+    queued = make_job(before, path='/spool/a.pdf')
+    sent = make_job(before, path='/spool/b.pdf')
+    before.record_batch(sent.id, 'batch-1', 'WEB_1', 'async')
+    finished = make_job(before)
+    before.finish(finished.id, result={'ok': True})
+    # Same pid as this process but a different nonce: a previous incarnation
+    before._conn().execute('UPDATE jobs SET owner = ?', (before.owner.rsplit(':', 1)[0] + ':gone',))
+
+    after = JobStore(path)
+    claimed = after.claim_orphans()
+    assert [row['id'] for row in claimed] == [sent.id, queued.id]
+    assert claimed[0]['batch_id'] == 'batch-1'
+    # Now owned by the live process: not handed out again
+    assert after.claim_orphans() == []
+
+
+def test_finished_jobs_report_their_result(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    job = make_job(store)
+    store.finish(job.id, result={'trip': '42'})
+    data = store.to_dict(store.get(job.id))
+    assert data['status'] == 'completed'
+    assert data['result'] == {'trip': '42'}
+
+
+def test_terminal_is_kept_with_the_job(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    job = make_job(store, path='/spool/a.pdf', terminal='ATL')
+    assert store.get(job.id)['terminal'] == 'ATL'
+
+
+def test_stores_without_a_terminal_column_are_migrated(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA.replace('    terminal TEXT,\n', ''))
+    conn.close()
+    store = JobStore(path)
+    job = make_job(store, terminal='ATL')
+    assert store.get(job.id)['terminal'] == 'ATL'
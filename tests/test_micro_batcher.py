@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from micro_batcher import MicroBatcher
+from pipeline import Pipeline, Stage, PARKED
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    paths = []
+    for index in range(6):
+        path = tmp_path / f'manifest-{index}.pdf'
+        path.write_bytes(b'%PDF-1.4\n' + str(index).encode() + b'\n%%EOF\n')
+        paths.append(str(path))
+    return paths
+
+
+def submit_all(batcher, paths):
+    return [batcher.submit(path, f'WEB_{index}') for index, path in enumerate(paths)]
+
+
+def test_documents_in_one_window_go_up_in_one_request(api_client, mock_api, pdfs):
+    batcher = MicroBatcher(api_client, window=0.2, deadline=10)
+    handles = submit_all(batcher, pdfs[:3])
+    results = [handle.wait(10) for handle in handles]
+
+    assert mock_api.counts['batches'] == 1
+    assert {handle.batch_id for handle in handles} == {handles[0].batch_id}
+    assert all(result['metadata']['state'] == 'finalized' and result['output'] for result in results)
+    assert batcher.stats()['averageBatchSize'] == 3
+
+
+def test_falls_back_to_one_batch_per_document_without_per_document_results(api_client, mock_api, pdfs):
+    mock_api.list_documents = False
+    batcher = MicroBatcher(api_client, window=0.2, deadline=10)
+    handles = submit_all(batcher, pdfs[:3])
+    results = [handle.wait(10) for handle in handles]
+
+    assert all(result['output'] for result in results)
+    assert len({handle.batch_id for handle in handles}) == 3
+    assert mock_api.counts['batches'] == 4
+    stats = batcher.stats()
+    assert stats['grouping'] is False
+    assert stats['fallbacks'] == 3
+
+    # Later windows skip the grouped request
+    submit_all(batcher, pdfs[3:5])[-1].wait(10)
+    assert mock_api.counts['batches'] == 6
+
+
+def test_parked_jobs_do_not_hold_pipeline_workers():
+    pipeline_ref = []
+    release = threading.Event()
+
+    def wait_upstream(job):
+        def finish():
+            release.wait(5)
+            job.result = job.context['n']
+            pipeline_ref[0].resume(job)
+        pipeline_ref[0].park(job)
+        threading.Thread(target=finish, daemon=True).start()
+        return PARKED
+
+    pipeline = Pipeline([Stage('backend', wait_upstream, workers=1)])
+    pipeline_ref.append(pipeline)
+    jobs = [pipeline.submit({'n': n}) for n in range(5)]
+    deadline = time.monotonic() + 5
+    while any(job.stage != PARKED for job in jobs) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # One worker, yet every job is waiting upstream at the same time
+    assert pipeline.stats()['jobs'] == {PARKED: 5}
+
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    assert [job.result for job in jobs] == list(range(5))
+
+
+def test_async_api_uploads_beyond_the_backend_workers_share_a_batch(web_app, api_client, mock_api, pdfs, monkeypatch):
+    monkeypatch.setattr(web_app, 'PROCESSING_BACKEND', 'api')
+    monkeypatch.setattr(web_app, 'document_api', api_client)
+    monkeypatch.setattr(web_app, 'MICRO_BATCHING', True)
+    monkeypatch.setattr(web_app, 'micro_batcher', MicroBatcher(api_client, window=0.5, deadline=10))
+
+    jobs = [
+        web_app.pipeline.submit({'path': path, 'size': 16, 'content_hash': None, 'ticket': None},
+                                filename=f'manifest-{index}.pdf', process_type='async')
+        for index, path in enumerate(pdfs)
+    ]
+    assert all(job.wait(15) for job in jobs)
+    results = [job.result for job in jobs]
+
+    assert len(pdfs) > web_app.pipeline.stages['backend'].workers
+    assert mock_api.counts['batches'] == 1
+    assert all(result['source'] == 'document_api' for result in results)
+    assert {result['batchId'] for result in results} == {jobs[0].result['batchId']}
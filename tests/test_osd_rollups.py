@@ -0,0 +1,76 @@
+import uuid
+
+import osd_rollups
+
+SHORT = {'proNumber': '1', 'type': 'shortage', 'expectedPieces': 10, 'actualPieces': 7}
+OVER = {'proNumber': '2', 'type': 'overage', 'expectedPieces': 4, 'actualPieces': 5}
+DAMAGE = {'proNumber': '3', 'type': 'damage'}
+
+
+def by_bucket(rows):
+    return {row['bucket']: row for row in rows}
+
+
+def test_rollups_are_updated_as_results_are_saved(result_store, manifest_result):
+    result_store.save(manifest_result(trailer='TRL1', terminal='ATL', exceptions=[SHORT, DAMAGE]), 'h1')
+    result_store.save(manifest_result(trailer='TRL2', terminal='ATL', exceptions=[OVER]), 'h2')
+    result_store.save(manifest_result(trailer='TRL2', exceptions=[]), 'h3')
+
+    terminals = by_bucket(result_store.rollups('terminal'))
+    assert terminals['ATL']['manifests'] == 2
+    assert (terminals['ATL']['shortages'], terminals['ATL']['overages'], terminals['ATL']['damages']) == (1, 1, 1)
+    assert (terminals['ATL']['shortPieces'], terminals['ATL']['overPieces']) == (3, 1)
+    assert terminals[osd_rollups.UNKNOWN]['manifests'] == 1
+
+    trailers = result_store.rollups('trailer')
+    assert [row['bucket'] for row in trailers] == ['TRL1', 'TRL2']
+    days = result_store.rollups('day')
+    assert len(days) == 1 and days[0]['exceptions'] == 3
+
+
+def test_replaced_result_moves_its_counts(result_store, manifest_result):
+    result_store.save(manifest_result(trailer='TRL1', terminal='ATL', exceptions=[SHORT]), 'h1')
+    result_store.save(manifest_result(trailer='TRL9', terminal='DAL', exceptions=[OVER, OVER]), 'h1')
+    assert list(by_bucket(result_store.rollups('trailer'))) == ['TRL9']
+    assert by_bucket(result_store.rollups('terminal'))['DAL']['overages'] == 2
+
+
+def test_rebuild_matches_the_incremental_counters(result_store, manifest_result):
+    result_store.save(manifest_result(trailer='TRL1', terminal='ATL', exceptions=[SHORT, DAMAGE]), 'h1')
+    result_store.save(manifest_result(trailer='TRL2', exceptions=[OVER]), 'h2')
+    result_store.save(manifest_result(trailer='TRL2', terminal='ATL', exceptions=[SHORT]), 'h2')
+    incremental = {dimension: result_store.rollups(dimension) for dimension in osd_rollups.DIMENSIONS}
+    result_store.rebuild_rollups()
+    assert {dimension: result_store.rollups(dimension) for dimension in osd_rollups.DIMENSIONS} == incremental
+
+
+def test_osd_analytics_endpoint(client, web_app, manifest_result):
+    terminal = uuid.uuid4().hex[:8].upper()
+    web_app.result_store.save(manifest_result(terminal=terminal, exceptions=[SHORT, OVER]), uuid.uuid4().hex)
+    body = client.get('/analytics/osd?by=terminal').get_json()
+    assert by_bucket(body['buckets'])[terminal]['exceptions'] == 2
+    assert body['totals']['exceptions'] >= 2
+    assert client.get('/analytics/osd?by=color').status_code == 400
+
+
+def test_recovered_jobs_keep_their_terminal(web_app, monkeypatch, tmp_path):
+    store = web_app.job_store
+    spool = tmp_path / 'orphan.pdf'
+    spool.write_bytes(b'%PDF-1.4\n%%EOF\n')
+    job_id = uuid.uuid4().hex
+    dead_owner = store.owner.rsplit(':', 1)[0] + ':gone'
+    store._conn().execute(
+        "INSERT INTO jobs (id, filename, process_type, state, spool_path, file_size, content_hash, terminal,"
+        " owner, created_at, updated_at) VALUES (?, 'a.pdf', 'async', 'queued', ?, 15, 'abc', 'ATL', ?, 0, 0)",
+        (job_id, str(spool), dead_owner)
+    )
+    submitted = {}
+
+    def submit(context, filename=None, process_type='sync', job_id=None):
+        submitted[job_id] = context
+        if context.get('ticket') is not None:
+            context['ticket'].close()
+
+    monkeypatch.setattr(web_app.pipeline, 'submit', submit)
+    web_app.recover_jobs()
+    assert submitted[job_id]['terminal'] == 'ATL'
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import QueueFull
+from pipeline import Pipeline, Stage
+
+
+def test_jobs_flow_through_the_stages_in_order():
+    seen = []
+
+    def first(job):
+        seen.append(('first', job.context['n']))
+        return 'second'
+
+    def second(job):
+        seen.append(('second', job.context['n']))
+        job.result = job.context['n'] * 2
+        return None
+
+    finished = []
+    pipeline = Pipeline([Stage('first', first), Stage('second', second)], on_finish=finished.append)
+    job = pipeline.submit({'n': 21}, filename='a.pdf')
+    assert job.wait(5)
+    assert job.result == 42
+    assert seen == [('first', 21), ('second', 21)]
+    assert finished == [job]
+    assert pipeline.stats()['stages']['second']['processed'] == 1
+
+
+def test_a_failing_stage_finishes_the_job_with_its_error():
+    def broken(job):
+        raise ValueError('cannot parse')
+
+    pipeline = Pipeline([Stage('parse', broken)])
+    job = pipeline.submit({})
+    assert job.wait(5)
+    assert job.status == 'failed'
+    assert 'cannot parse' in job.error
+    assert pipeline.stats()['stages']['parse']['errors'] == 1
+
+
+def test_a_full_first_stage_rejects_instead_of_queueing():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(5)
+        return None
+
+    pipeline = Pipeline([Stage('backend', slow, workers=1, queue_size=1)])
+    pipeline.submit({})
+    started.wait(5)
+    pipeline.submit({})  # waits in the queue
+    with pytest.raises(QueueFull):
+        pipeline.submit({})
+    assert pipeline.stats()['rejected'] == 1
+    release.set()
+
+
+def test_a_slow_stage_pushes_back_on_the_one_in_front():
+    release = threading.Event()
+
+    def fast(job):
+        return 'slow'
+
+    def slow(job):
+        release.wait(5)
+        return None
+
+    pipeline = Pipeline([Stage('fast', fast, workers=1, queue_size=8),
+                         Stage('slow', slow, workers=1, queue_size=1)])
+    jobs = [pipeline.submit({}) for _ in range(5)]
+    time.sleep(0.3)
+    stats = pipeline.stats()['stages']
+    # One job in the slow stage, one in its queue, one blocked handing over: the rest wait up front
+    assert stats['slow']['queueDepth'] == 1
+    assert stats['fast']['queueDepth'] == 2
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    assert pipeline.stats()['stages']['slow']['upstreamBlockedSeconds'] > 0
+
+
+def test_resuming_into_a_full_stage_does_not_block_the_caller():
+    release = threading.Event()
+    parked = []
+
+    def wait_upstream(job):
+        parked.append(job)
+        return pipeline.park(job)
+
+    def slow(job):
+        release.wait(5)
+        return None
+
+    pipeline = Pipeline([Stage('upstream', wait_upstream, workers=1, queue_size=8),
+                         Stage('slow', slow, workers=1, queue_size=1)])
+    jobs = [pipeline.submit({}) for _ in range(5)]
+    deadline = time.monotonic() + 5
+    while len(parked) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # As from the batch poller's callback thread: none of these may wait for room
+    started = time.monotonic()
+    for job in parked:
+        pipeline.resume(job, 'slow')
+    assert time.monotonic() - started < 0.5
+    time.sleep(0.1)
+    assert pipeline.stats()['resumeBacklog'] >= 1
+
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    assert pipeline.stats()['resumeBacklog'] == 0
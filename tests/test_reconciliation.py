@@ -0,0 +1,75 @@
+import uuid
+
+import reconciliation
+
+SHORT = {'proNumber': '555', 'type': 'shortage', 'description': 'Tires', 'expectedPieces': 10, 'actualPieces': 8}
+OVER = {'proNumber': '555', 'type': 'overage', 'description': 'Tires', 'expectedPieces': 0, 'actualPieces': 2}
+
+
+def pairs(store, **filters):
+    return [(m['shortage']['tripNumber'], m['overage']['tripNumber']) for m in store.reconciliation_matches(**filters)]
+
+
+def test_shortage_matches_an_overage_on_another_manifest(result_store, manifest_result):
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[dict(OVER, proNumber=' 555 ')]), 'b')
+    assert pairs(result_store) == [('A', 'B')]
+    match = result_store.reconciliation_matches(pro_number='555')[0]
+    assert (match['shortage']['expectedPieces'], match['overage']['actualPieces']) == (10, 2)
+    stats = result_store.stats()['reconciliation']
+    assert (stats['openShortages'], stats['openOverages'], stats['matches']) == (0, 0, 1)
+
+
+def test_no_match_within_one_manifest_or_without_a_pro(result_store, manifest_result):
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT, OVER]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[dict(SHORT, proNumber='Unknown')]), 'b')
+    result_store.save(manifest_result(trip='C', exceptions=[dict(OVER, type='damage')]), 'c')
+    assert pairs(result_store) == []
+    stats = result_store.stats()['reconciliation']
+    assert (stats['openShortages'], stats['openOverages']) == (1, 1)
+
+
+def test_oldest_open_counterpart_is_taken_first(result_store, manifest_result):
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[SHORT]), 'b')
+    result_store.save(manifest_result(trip='C', exceptions=[OVER]), 'c')
+    assert pairs(result_store) == [('A', 'C')]
+
+
+def test_replacing_a_result_reopens_its_counterpart(result_store, manifest_result):
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[OVER]), 'b')
+    result_store.save(manifest_result(trip='B', exceptions=[]), 'b')
+    assert pairs(result_store) == []
+    result_store.save(manifest_result(trip='C', exceptions=[OVER]), 'c')
+    assert pairs(result_store) == [('A', 'C')]
+
+
+def test_description_can_be_part_of_the_key(result_store, manifest_result):
+    conn = result_store._conn()
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[dict(OVER, description='Rims')]), 'b')
+    assert reconciliation.backfill(conn, match_on='pro+description') == 0
+    assert reconciliation.backfill(conn, match_on='pro') == 1
+
+
+def test_backfill_matches_what_was_reconciled_incrementally(result_store, manifest_result):
+    result_store.save(manifest_result(trip='A', exceptions=[SHORT, dict(SHORT, proNumber='9')]), 'a')
+    result_store.save(manifest_result(trip='B', exceptions=[OVER]), 'b')
+    result_store.save(manifest_result(trip='C', exceptions=[dict(OVER, proNumber='9')]), 'c')
+    incremental = pairs(result_store)
+    assert result_store.backfill_reconciliation() == 2
+    assert sorted(pairs(result_store)) == sorted(incremental)
+
+
+def test_matches_endpoint(client, web_app, manifest_result):
+    pro = uuid.uuid4().hex[:10].upper()
+    short_id = web_app.result_store.save(manifest_result(trip='A', exceptions=[dict(SHORT, proNumber=pro)]),
+                                         uuid.uuid4().hex)
+    web_app.result_store.save(manifest_result(trip='B', exceptions=[dict(OVER, proNumber=pro)]), uuid.uuid4().hex)
+
+    body = client.get(f'/reconciliation/matches?proNumber={pro.lower()}').get_json()
+    assert body['count'] == 1
+    assert body['matches'][0]['shortage']['resultId'] == short_id
+    assert client.get(f'/reconciliation/matches?resultId={short_id}').get_json()['count'] == 1
+    assert client.get('/reconciliation/matches?limit=x').status_code == 400
@@ -0,0 +1,26 @@
+from result_cache import ResultCache
+
+
+def test_memory_hit_returns_an_independent_copy():
+    cache = ResultCache(max_bytes=1024 * 1024)
+    cache.put('h1', {'exceptions': [1, 2]})
+    first = cache.get('h1')
+    first['exceptions'].append(3)
+    assert cache.get('h1') == {'exceptions': [1, 2]}
+    assert cache.stats()['memoryHits'] == 2
+
+
+def test_lru_evicts_within_byte_budget():
+    cache = ResultCache(max_bytes=200)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'padding': 'x' * 60})
+    assert cache.get('a') is None
+    assert cache.get('c') is not None
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put('h1', {'status': 'success'})
+    other = ResultCache(disk_dir=str(tmp_path))
+    assert other.get('h1') == {'status': 'success'}
+    assert other.stats()['diskHits'] == 1
+    assert other.get('missing') is None
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from conftest import ROOT
+from result_export import export, iter_batches, time_range
+
+SHORT = {'proNumber': '1', 'type': 'shortage', 'expectedPieces': 3, 'actualPieces': 1, 'weight': 40.5,
+         'markups': ['circled']}
+OVER = {'proNumber': '2', 'type': 'overage', 'notes': 'comma, "quoted"'}
+
+
+@pytest.fixture
+def stored(result_store, manifest_result):
+    """Three results processed on 2026-03-01, 2026-03-02 and 2026-03-03"""
+    conn = result_store._conn()
+    for day, trip, exceptions in ((1, 'A', [SHORT, OVER]), (2, 'B', [SHORT]), (3, 'C', [])):
+        result_id = result_store.save(manifest_result(trip=trip, exceptions=exceptions), trip)
+        conn.execute('UPDATE results SET processed_at = ? WHERE id = ?',
+                     (datetime(2026, 3, day, 12).timestamp(), result_id))
+    return result_store
+
+
+def read(rows, fmt, store, start=None, end=None):
+    return b''.join(export(rows, fmt, start, end, path=store.path))
+
+
+def test_csv_exceptions(stored):
+    records = list(csv.DictReader(io.StringIO(read('exceptions', 'csv', stored).decode())))
+    assert [(r['tripNumber'], r['proNumber']) for r in records] == [('A', '1'), ('A', '2'), ('B', '1')]
+    assert records[1]['notes'] == 'comma, "quoted"'
+    assert records[0]['processedAt'] == '2026-03-01T12:00:00'
+    assert (records[0]['expectedPieces'], records[0]['weight']) == ('3', '40.5')
+
+
+def test_ndjson_manifests_and_markups(stored):
+    manifests = [json.loads(line) for line in read('manifests', 'ndjson', stored).splitlines()]
+    assert [(m['tripNumber'], m['totalExceptions']) for m in manifests] == [('A', 2), ('B', 1), ('C', 0)]
+    exceptions = [json.loads(line) for line in read('exceptions', 'ndjson', stored).splitlines()]
+    assert exceptions[0]['markups'] == ['circled']
+
+
+def test_parquet(stored):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    table = parquet.read_table(io.BytesIO(read('exceptions', 'parquet', stored)))
+    assert table.column('tripNumber').to_pylist() == ['A', 'A', 'B']
+    assert table.column('actualPieces').to_pylist() == [1, None, 1]
+    assert str(table.schema.field('weight').type) == 'double'
+
+
+def test_date_range_filters_by_processed_day(stored):
+    def trips(start=None, end=None):
+        return [m['tripNumber'] for m in map(json.loads, read('manifests', 'ndjson', stored, start, end).splitlines())]
+
+    assert trips('2026-03-02') == ['B', 'C']
+    assert trips(end='2026-03-02') == ['A', 'B']
+    assert trips('2026-03-02', '2026-03-02') == ['B']
+    assert trips('2026-03-02T13:00') == ['C']
+    assert trips('2026-04-01') == []
+
+
+def test_rows_are_read_in_batches(stored):
+    batches = list(iter_batches('exceptions', path=stored.path, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+def test_bad_arguments_fail_before_streaming(stored):
+    for args in (('results', 'csv'), ('exceptions', 'xml'), ('exceptions', 'csv', 'March')):
+        with pytest.raises(ValueError):
+            export(*args, path=stored.path)
+    with pytest.raises(ValueError):
+        time_range(end='2026-13-01')
+
+
+def test_command_line_export(stored):
+    env = dict(os.environ, RESULT_STORE_PATH=stored.path)
+    output = subprocess.run(
+        [sys.executable, 'result_export.py', 'manifests', 'csv', '2026-03-02', '-'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert [row['tripNumber'] for row in csv.DictReader(io.StringIO(output))] == ['B', 'C']
+
+
+def test_export_endpoint(client):
+    response = client.get('/export?rows=manifests&format=ndjson&start=2026-03-01&end=2026-03-02')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'manifest-manifests-2026-03-01-2026-03-02.ndjson' in response.headers['Content-Disposition']
+    assert client.get('/export?format=xml').status_code == 400
+
+
+def test_results_stored_in_the_same_instant_export_in_a_fixed_order(result_store, manifest_result):
+    conn = result_store._conn()
+    ids = [result_store.save(manifest_result(trip=trip, exceptions=[SHORT, OVER]), trip) for trip in 'QXAMD']
+    conn.execute('UPDATE results SET processed_at = ?', (datetime(2026, 3, 1, 12).timestamp(),))
+
+    manifests = [json.loads(line)['resultId'] for line in read('manifests', 'ndjson', result_store).splitlines()]
+    assert manifests == sorted(ids)
+    exceptions = [(e['resultId'], e['position'])
+                  for e in map(json.loads, read('exceptions', 'ndjson', result_store).splitlines())]
+    assert exceptions == [(result_id, position) for result_id in sorted(ids) for position in (0, 1)]
+    plan = ' '.join(row['detail'] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT id FROM results r ORDER BY r.processed_at, r.id'))
+    assert 'results_processed_at_id' in plan and 'TEMP B-TREE' not in plan
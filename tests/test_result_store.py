@@ -0,0 +1,63 @@
+import sqlite3
+import uuid
+
+from result_store import ResultStore
+
+SHORTAGE = {'proNumber': '123456', 'type': 'shortage', 'description': 'Pallet of tires',
+            'expectedPieces': '12', 'actualPieces': 10, 'weight': '1,250 lbs', 'notes': 'Short 2 at dock',
+            'markups': ['circled qty']}
+
+
+def test_saved_result_is_served_back(result_store, manifest_result):
+    result = manifest_result(exceptions=[SHORTAGE])
+    result_id = result_store.save(result, 'hash-1')
+    assert result['resultId'] == result_id
+    assert result_store.get(result_id) == result
+    assert result_store.get('missing') is None
+
+
+def test_header_and_exception_rows_are_indexed(result_store, manifest_result):
+    result_id = result_store.save(manifest_result(manifest='Unknown', exceptions=[SHORTAGE]), 'hash-1')
+    conn = result_store._conn()
+    header = conn.execute('SELECT * FROM results WHERE id = ?', (result_id,)).fetchone()
+    assert (header['trip_number'], header['trailer_number'], header['manifest_number']) == ('T100', 'TRL1', None)
+    assert header['total_exceptions'] == 1
+
+    row = conn.execute('SELECT * FROM exceptions WHERE result_id = ?', (result_id,)).fetchone()
+    assert (row['pro_number'], row['type']) == ('123456', 'shortage')
+    assert (row['expected_pieces'], row['actual_pieces'], row['weight']) == (12, 10, 1250.0)
+
+    plan = ' '.join(r['detail'] for r in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM exceptions WHERE pro_number = ?', ('123456',)))
+    assert 'exceptions_pro_number' in plan
+
+
+def test_same_content_hash_replaces_the_report(result_store, manifest_result):
+    first = result_store.save(manifest_result(exceptions=[SHORTAGE, SHORTAGE]), 'hash-1')
+    again = result_store.save(manifest_result(trip='T200', exceptions=[SHORTAGE]), 'hash-1')
+    other = result_store.save(manifest_result(), 'hash-2')
+    assert again == first != other
+    assert result_store.get(first)['manifest']['tripNumber'] == 'T200'
+    stats = result_store.stats()
+    assert (stats['results'], stats['exceptions']) == (2, 1)
+
+
+def test_stores_without_a_terminal_column_are_migrated(tmp_path):
+    path = str(tmp_path / 'results.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE results (id TEXT PRIMARY KEY, content_hash TEXT, filename TEXT,'
+                 ' trip_number TEXT, manifest_number TEXT, trailer_number TEXT, source TEXT,'
+                 ' total_exceptions INTEGER NOT NULL DEFAULT 0, processed_at REAL NOT NULL, result TEXT NOT NULL)')
+    conn.close()
+    store = ResultStore(path)
+    store.save({'manifest': {}, 'exceptions': [], 'terminal': 'ATL'}, 'hash-1')
+    assert store.rollups('terminal')[0]['bucket'] == 'ATL'
+
+
+def test_results_endpoint_serves_stored_reports(client, web_app, manifest_result):
+    result = manifest_result(trip=uuid.uuid4().hex, exceptions=[SHORTAGE])
+    result_id = web_app.result_store.save(result, uuid.uuid4().hex)
+    response = client.get(f'/results/{result_id}')
+    assert response.status_code == 200
+    assert response.get_json()['manifest']['tripNumber'] == result['manifest']['tripNumber']
+    assert client.get('/results/missing').status_code == 404
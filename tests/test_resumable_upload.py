@@ -0,0 +1,138 @@
+import io
+import threading
+
+import pytest
+
+from resumable_upload import RESUMABLE_FINALIZE_TIMEOUT, AlreadyFinalized, OffsetMismatch, UploadSessions
+from upload_spool import SpoolError
+
+PDF = b'%PDF-1.4\n1 0 obj <<>> endobj\n%%EOF\n'
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    return UploadSessions(path=str(tmp_path / 'jobs.db'), spool_dir=str(tmp_path))
+
+
+def test_chunks_are_appended_at_offsets(sessions):
+    session = sessions.create('manifest.pdf', total_size=len(PDF))
+    assert sessions.append(session['id'], 0, io.BytesIO(PDF[:10])) == 10
+    with pytest.raises(OffsetMismatch) as error:
+        sessions.append(session['id'], 0, io.BytesIO(PDF[10:]))
+    assert error.value.expected == 10
+    assert sessions.append(session['id'], 10, io.BytesIO(PDF[10:])) == len(PDF)
+
+    upload = sessions.finalize(session['id'])
+    assert upload.size == len(PDF)
+    with open(upload.path, 'rb') as f:
+        assert f.read() == PDF
+
+
+def test_incomplete_upload_stays_open(sessions):
+    session = sessions.create('manifest.pdf', total_size=len(PDF))
+    sessions.append(session['id'], 0, io.BytesIO(PDF[:10]))
+    with pytest.raises(SpoolError, match='incomplete'):
+        sessions.finalize(session['id'])
+    sessions.append(session['id'], 10, io.BytesIO(PDF[10:]))
+    assert sessions.finalize(session['id']).size == len(PDF)
+
+
+def test_only_one_concurrent_finalize_gets_the_upload(sessions):
+    session = sessions.create('manifest.pdf')
+    sessions.append(session['id'], 0, io.BytesIO(PDF))
+    barrier = threading.Barrier(4)
+    uploads, losers = [], []
+
+    def finalize():
+        barrier.wait()
+        try:
+            uploads.append(sessions.finalize(session['id']))
+        except AlreadyFinalized as e:
+            losers.append(e.job_id)
+
+    threads = [threading.Thread(target=finalize) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(uploads) == 1
+    assert len(losers) == 3
+
+    sessions.attach_job(session['id'], 'job-1')
+    with pytest.raises(AlreadyFinalized) as error:
+        sessions.finalize(session['id'])
+    assert error.value.job_id == 'job-1'
+    assert sessions.wait_for_job(session['id'], 0) == 'job-1'
+
+
+def test_finalizing_upload_takes_no_more_chunks(sessions):
+    session = sessions.create('manifest.pdf')
+    sessions.append(session['id'], 0, io.BytesIO(PDF))
+    sessions.finalize(session['id'])
+    with pytest.raises(KeyError):
+        sessions.append(session['id'], len(PDF), io.BytesIO(b'more'))
+
+
+def test_released_upload_can_be_finalized_again(sessions):
+    session = sessions.create('manifest.pdf')
+    sessions.append(session['id'], 0, io.BytesIO(PDF))
+    sessions.finalize(session['id'])
+    assert sessions.wait_for_job(session['id'], 0) is None
+    sessions.release(session['id'])
+    assert sessions.finalize(session['id']).size == len(PDF)
+
+
+def test_concurrent_finalize_requests_share_one_job(client, demo_backend):
+    created = client.post('/uploads', json={'filename': 'manifest.pdf', 'size': len(PDF)}).get_json()
+    response = client.put(created['uploadUrl'], data=PDF, headers={'Upload-Offset': '0'})
+    assert response.status_code == 200
+
+    barrier = threading.Barrier(3)
+    responses = []
+
+    def finalize():
+        barrier.wait()
+        responses.append(client.post(created['finalizeUrl'] + '?processType=async'))
+
+    threads = [threading.Thread(target=finalize) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [r.status_code for r in responses] == [202, 202, 202]
+    assert len({r.get_json()['jobId'] for r in responses}) == 1
+
+
+def test_abandoned_finalize_is_taken_over_after_the_timeout(sessions):
+    session = sessions.create('manifest.pdf')
+    sessions.append(session['id'], 0, io.BytesIO(PDF))
+    # The process that won the finalize died before attaching its job
+    sessions.finalize(session['id'])
+    with pytest.raises(AlreadyFinalized) as error:
+        sessions.finalize(session['id'])
+    assert error.value.job_id is None
+
+    sessions._conn().execute('UPDATE upload_sessions SET updated_at = updated_at - ? WHERE id = ?',
+                             (RESUMABLE_FINALIZE_TIMEOUT + 1, session['id']))
+    assert sessions.finalize(session['id']).size == len(PDF)
+    sessions.attach_job(session['id'], 'job-1')
+
+    sessions._conn().execute('UPDATE upload_sessions SET updated_at = updated_at - ? WHERE id = ?',
+                             (RESUMABLE_FINALIZE_TIMEOUT + 1, session['id']))
+    with pytest.raises(AlreadyFinalized) as error:
+        sessions.finalize(session['id'])
+    assert error.value.job_id == 'job-1'
+
+
+def test_finalize_after_a_crash_mid_finalize(client, web_app, demo_backend):
+    created = client.post('/uploads', json={'filename': 'manifest.pdf'}).get_json()
+    client.put(created['uploadUrl'], data=PDF, headers={'Upload-Offset': '0'})
+    web_app.upload_sessions.finalize(created['uploadId'])
+    web_app.upload_sessions._conn().execute(
+        'UPDATE upload_sessions SET updated_at = updated_at - ? WHERE id = ?',
+        (RESUMABLE_FINALIZE_TIMEOUT + 1, created['uploadId'])
+    )
+
+    response = client.post(created['finalizeUrl'] + '?processType=async')
+    assert response.status_code == 202
+    assert web_app.upload_sessions.get(created['uploadId'])['job_id'] == response.get_json()['jobId']
@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+
+from result_store import match_query
+
+SHORT_TIRES = {'proNumber': '123456', 'type': 'shortage', 'description': 'Pallet of tires',
+               'notes': 'Short 2 at dock', 'markups': ['recount']}
+DAMAGED_GLASS = {'proNumber': '123999', 'type': 'damage', 'description': 'Glass panels',
+                 'notes': 'Crushed corner', 'markups': ['photo taken']}
+OVER_TIRES = {'proNumber': '777001', 'type': 'overage', 'description': 'Spare tires', 'notes': None}
+
+
+@pytest.fixture
+def stored(result_store, manifest_result):
+    result_store.save(manifest_result(trip='T100', manifest='M100', exceptions=[SHORT_TIRES, DAMAGED_GLASS]), 'h1')
+    result_store.save(manifest_result(trip='T200', manifest='M200', exceptions=[OVER_TIRES]), 'h2')
+    return result_store
+
+
+def pro_numbers(matches):
+    return [match['exception']['proNumber'] for match in matches]
+
+
+def test_pro_number_exact_and_prefix(stored):
+    assert pro_numbers(stored.search(pro_number='123456')) == ['123456']
+    assert pro_numbers(stored.search(pro_number='123*')) == ['123999', '123456']
+    assert stored.search(pro_number='12345') == []
+
+
+def test_manifest_header_filters(stored):
+    assert pro_numbers(stored.search(pro_number='*', trip_number='T200')) == ['777001']
+    manifests = stored.search_manifests(manifest_number='M*')
+    assert [m['tripNumber'] for m in manifests] == ['T200', 'T100']
+    assert manifests[1]['totalExceptions'] == 2
+    assert stored.search_manifests(trip_number='T1*')[0]['manifestNumber'] == 'M100'
+
+
+def test_full_text_over_notes_descriptions_and_markups(stored):
+    assert stored.full_text
+    assert pro_numbers(stored.search(text='tires')) == ['777001', '123456']
+    assert pro_numbers(stored.search(text='crush*')) == ['123999']
+    assert pro_numbers(stored.search(text='photo')) == ['123999']
+    assert pro_numbers(stored.search(text='tires', pro_number='123*')) == ['123456']
+    assert pro_numbers(stored.search(text='tires', exception_type='overage')) == ['777001']
+
+
+def test_fts_operators_in_the_query_are_inert(stored):
+    assert match_query('tires OR "glass') == '"tires" "OR" """glass"'
+    assert stored.search(text='tires OR glass') == []
+    assert stored.search(text='***') == []
+
+
+def test_replaced_report_leaves_the_text_index(stored, manifest_result):
+    stored.save(manifest_result(trip='T100', exceptions=[]), 'h1')
+    assert pro_numbers(stored.search(text='tires')) == ['777001']
+
+
+def test_search_endpoint(client, web_app, manifest_result):
+    pro = uuid.uuid4().hex[:10]
+    web_app.result_store.save(manifest_result(exceptions=[dict(SHORT_TIRES, proNumber=pro)]), uuid.uuid4().hex)
+
+    body = client.get(f'/search?proNumber={pro}').get_json()
+    assert body['kind'] == 'exceptions'
+    assert body['count'] == 1
+    assert body['matches'][0]['tripNumber'] == 'T100'
+    assert client.get('/search').status_code == 400
+    assert client.get('/search?q=tires&limit=x').status_code == 400
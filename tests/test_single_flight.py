@@ -0,0 +1,121 @@
+import threading
+import time
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers, timeout=None):
+    results = []
+    lock = threading.Lock()
+
+    def call():
+        outcome = flight.do(key, fn, timeout=timeout)
+        with lock:
+            results.append(outcome)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    runs = []
+
+    def work():
+        runs.append(1)
+        time.sleep(0.3)
+        return {'exceptions': []}
+
+    results = run_concurrently(flight, 'h1', work, callers=4)
+    assert len(runs) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    # Followers get their own copy
+    assert len({id(result) for result, _ in results}) == 4
+
+
+def test_failed_leader_hands_off_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise RuntimeError('swift crashed')
+        return 'ok'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(_swallow(flight.do, 'h1', work)))
+    leader.start()
+    time.sleep(0.05)
+    assert flight.do('h1', work) == ('ok', False)
+    leader.join()
+    assert flight.stats()['handoffs'] == 1
+
+
+def _swallow(fn, *args):
+    try:
+        return fn(*args)
+    except RuntimeError as e:
+        return e
+
+
+def test_silent_leader_is_taken_over_after_its_lease():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('h1', release.wait), kwargs={'timeout': 0.2})
+    leader.start()
+    time.sleep(0.05)
+    assert flight.do('h1', lambda: 'mine', timeout=0.2) == ('mine', False)
+    assert flight.stats()['takeovers'] == 1
+    release.set()
+    leader.join()
+
+
+def test_renewing_leader_keeps_followers_waiting():
+    flight = SingleFlight()
+    runs = []
+
+    def polling():
+        runs.append(1)
+        # Busy well past the lease, but renewing it like a batch poll does
+        for _ in range(8):
+            time.sleep(0.05)
+            flight.renew()
+        return 'batch'
+
+    results = run_concurrently(flight, 'h1', polling, callers=3, timeout=0.15)
+    assert len(runs) == 1
+    assert [result for result, _ in results] == ['batch'] * 3
+    assert flight.stats()['takeovers'] == 0
+
+
+def test_renew_outside_a_leader_is_a_no_op():
+    SingleFlight().renew()
+
+
+def test_held_batch_stays_joinable_until_it_is_final(web_app):
+    from batch_poller import BatchWaiter
+
+    flight = SingleFlight()
+    waiter = BatchWaiter('b1', time.monotonic() + 5)
+    runs = []
+
+    def submit():
+        runs.append(1)
+        return waiter
+
+    first, _ = flight.do('h1', submit, hold=web_app.hold_batch)
+    # The leader is back at once, but identical uploads still attach to its batch
+    second, shared = flight.do('h1', submit, hold=web_app.hold_batch)
+    assert first is waiter and second is waiter and shared
+    assert len(runs) == 1
+
+    waiter._finish({'metadata': {'state': 'finalized'}})
+    flight.do('h1', submit, hold=web_app.hold_batch)
+    assert len(runs) == 2
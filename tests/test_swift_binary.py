@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+
+import pytest
+
+from swift_binary import BuildError, ensure_executable, executable_path, needs_build, warm_up_pool
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'Package.swift').write_text('// swift-tools-version:5.9\n')
+    (tmp_path / 'Sources').mkdir()
+    (tmp_path / 'Sources' / 'main.swift').write_text('print("hi")\n')
+    return tmp_path
+
+
+def make_binary(project, age=0):
+    executable = executable_path(project)
+    executable.parent.mkdir(parents=True, exist_ok=True)
+    executable.write_text('#!/bin/sh\n')
+    stamp = time.time() + age
+    os.utime(executable, (stamp, stamp))
+    return executable
+
+
+def test_missing_or_stale_binary_needs_a_build(project):
+    executable = executable_path(project)
+    assert needs_build(executable, project)
+    make_binary(project, age=-3600)
+    assert needs_build(executable, project)
+    make_binary(project, age=60)
+    assert not needs_build(executable, project)
+
+
+def test_up_to_date_binary_is_reused_without_building(project, monkeypatch):
+    executable = make_binary(project, age=60)
+    monkeypatch.setenv('PATH', '')  # any attempt to run `swift build` would fail
+    assert ensure_executable(project) == executable
+
+
+def test_missing_toolchain_is_a_build_error(project, monkeypatch):
+    monkeypatch.setenv('PATH', '')
+    with pytest.raises(BuildError):
+        ensure_executable(project)
+
+
+class FakePool:
+    def __init__(self, size, fail=False):
+        self.size = size
+        self.fail = fail
+        self.seen = []
+        self.lock = threading.Lock()
+
+    def process(self, path, filename=None, timeout=None):
+        with open(path, 'rb') as f:
+            assert f.read().startswith(b'%PDF')
+        with self.lock:
+            self.seen.append(filename)
+        if self.fail:
+            raise RuntimeError('worker crashed')
+        return {}
+
+
+def test_warm_up_exercises_every_worker():
+    pool = FakePool(3)
+    assert warm_up_pool(pool) == 3
+    assert pool.seen == ['warm-up.pdf'] * 3
+
+
+def test_warm_up_fails_when_no_worker_answers():
+    with pytest.raises(BuildError):
+        warm_up_pool(FakePool(2, fail=True))
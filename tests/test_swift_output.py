@@ -0,0 +1,64 @@
+import json
+import sys
+import textwrap
+
+import pytest
+
+from swift_output import SwiftOutputError, SwiftRecordParser, parse_records, run_swift_json
+
+RECORDS = [
+    {'record': 'manifest', 'filename': 'tmp123.pdf', 'manifest': {'tripNumber': 'T1'}},
+    {'record': 'exception', 'proNumber': '123', 'type': 'shortage'},
+    {'record': 'exception', 'proNumber': '456', 'type': 'damage'},
+    {'record': 'summary', 'summary': {'totalShortages': 1}},
+]
+OUTPUT = ''.join(json.dumps(record) + '\n' for record in RECORDS).encode()
+
+
+def test_records_split_across_chunks_are_reassembled():
+    parser = SwiftRecordParser()
+    records = []
+    for i in range(0, len(OUTPUT), 7):
+        records.extend(parser.feed(OUTPUT[i:i + 7]))
+    records.extend(parser.close())
+    assert records == RECORDS
+
+
+def test_noise_lines_are_skipped():
+    parser = SwiftRecordParser()
+    records = list(parser.feed(b'Building...\n{not json}\n' + OUTPUT))
+    assert len(records) == 4
+    assert parser.skipped == 2
+
+
+def test_assembled_result_keeps_the_uploaded_filename():
+    result = parse_records(OUTPUT.decode(), 'manifest.pdf')
+    assert result['filename'] == 'manifest.pdf'
+    assert [e['proNumber'] for e in result['exceptions']] == ['123', '456']
+    assert result['summary']['totalExceptions'] == 2
+
+
+def test_error_record_raises():
+    with pytest.raises(SwiftOutputError, match='unreadable'):
+        parse_records(b'{"record": "error", "error": "unreadable PDF"}\n', 'm.pdf')
+
+
+def emitter(body):
+    return [sys.executable, '-c', textwrap.dedent(body)]
+
+
+def test_run_parses_the_pipe_while_it_is_written():
+    script = f'''
+        import sys, time
+        for line in {OUTPUT.decode().splitlines()!r}:
+            print(line, flush=True)
+            time.sleep(0.01)
+    '''
+    assert run_swift_json(emitter(script), 'm.pdf', timeout=10)['manifest'] == {'tripNumber': 'T1'}
+
+
+def test_run_reports_exit_code_and_timeout():
+    with pytest.raises(SwiftOutputError, match='exited with code 3'):
+        run_swift_json(emitter('import sys; sys.exit(3)'), 'm.pdf', timeout=10)
+    with pytest.raises(SwiftOutputError, match='timed out'):
+        run_swift_json(emitter('import time; time.sleep(5)'), 'm.pdf', timeout=0.3)
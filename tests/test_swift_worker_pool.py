@@ -0,0 +1,68 @@
+import sys
+import textwrap
+import threading
+import time
+
+from swift_worker_pool import SwiftWorkerPool
+
+# Speaks the --worker JSON-line protocol; a filename starting with "slow" takes a second
+FAKE_WORKER = textwrap.dedent('''
+    import json, os, sys, time
+    for line in sys.stdin:
+        job = json.loads(line)
+        if job['filename'].startswith('slow'):
+            time.sleep(1)
+        print(json.dumps({'id': job['id'], 'result': {'tag': sys.argv[1], 'pid': os.getpid()}}), flush=True)
+''')
+
+
+def worker_command(tag):
+    return [sys.executable, '-c', FAKE_WORKER, tag]
+
+
+def test_jobs_run_on_persistent_workers():
+    pool = SwiftWorkerPool(worker_command('a'), size=2, job_timeout=10)
+    try:
+        pids = {pool.process('/tmp/x.pdf', 'x.pdf')['pid'] for _ in range(6)}
+        assert len(pids) <= 2
+    finally:
+        pool.shutdown()
+
+
+def test_command_switch_retires_old_workers_after_their_job():
+    pool = SwiftWorkerPool(worker_command('old'), size=2, job_timeout=10)
+    try:
+        pool.start()
+        in_flight = {}
+        slow = threading.Thread(target=lambda: in_flight.update(pool.process('/tmp/s.pdf', 'slow.pdf')))
+        slow.start()
+        time.sleep(0.2)
+
+        pool.set_command(worker_command('new'))
+        slow.join()
+        # The job already running finished on the old binary...
+        assert in_flight['tag'] == 'old'
+        # ...and everything after runs on the new one, without growing the pool
+        results = [pool.process('/tmp/x.pdf', 'x.pdf') for _ in range(5)]
+        assert {r['tag'] for r in results} == {'new'}
+        stats = pool.stats()
+        assert len(stats['workers']) == 2
+        assert stats['idle'] == 2
+        assert all(w.generation == pool._generation for w in pool._workers)
+    finally:
+        pool.shutdown()
+
+
+def test_shutdown_waits_for_jobs_in_flight():
+    pool = SwiftWorkerPool(worker_command('a'), size=1, job_timeout=10)
+    pool.start()
+    worker = pool._workers[0]
+    slow = threading.Thread(target=pool.process, args=('/tmp/s.pdf', 'slow.pdf'))
+    slow.start()
+    time.sleep(0.2)
+    started = time.monotonic()
+    pool.shutdown()
+    assert time.monotonic() - started > 0.5
+    slow.join()
+    assert not worker.is_alive()
+    assert pool._idle.qsize() == 0
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from token_cache import TokenManager
+
+
+class FakeAuth:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            return f'token-{self.calls}', self.ttl
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'token.json')
+
+
+def manager(fetch, cache_path, **kwargs):
+    tokens = TokenManager(fetch, key='user@mock', cache_path=cache_path, **kwargs)
+    return tokens
+
+
+def test_token_is_fetched_once_and_reused(cache_path):
+    auth = FakeAuth(ttl=3600)
+    tokens = manager(auth, cache_path)
+    try:
+        assert {tokens.get() for _ in range(50)} == {'token-1'}
+        assert auth.calls == 1
+    finally:
+        tokens.stop()
+
+
+def test_concurrent_refreshes_collapse_into_one_fetch(cache_path):
+    auth = FakeAuth(ttl=3600)
+    tokens = manager(auth, cache_path)
+    threads = [threading.Thread(target=tokens.get) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tokens.stop()
+    assert auth.calls == 1
+
+
+def test_other_processes_share_the_cache_file(cache_path):
+    auth = FakeAuth(ttl=3600)
+    first = manager(auth, cache_path)
+    second = manager(auth, cache_path)
+    assert first.get() == second.get() == 'token-1'
+    assert second.stats()['fileHits'] == 1
+    first.stop()
+    second.stop()
+
+
+def test_short_lived_token_does_not_hammer_auth(cache_path):
+    # TTL far below the 120s refresh margin
+    auth = FakeAuth(ttl=4)
+    tokens = manager(auth, cache_path, refresh_margin=120, min_refresh_interval=1)
+    try:
+        for _ in range(200):
+            assert tokens.get()
+        assert auth.calls == 1
+        # Half the lifetime later it is refreshed, once
+        time.sleep(2.2)
+        for _ in range(200):
+            tokens.get()
+        assert auth.calls == 2
+    finally:
+        tokens.stop()
+
+
+def test_minimum_interval_between_fetches(cache_path):
+    auth = FakeAuth(ttl=0.5)
+    tokens = manager(auth, cache_path, min_refresh_interval=5)
+    try:
+        deadline = time.monotonic() + 0.4
+        while time.monotonic() < deadline:
+            tokens.get()
+        assert auth.calls == 1
+    finally:
+        tokens.stop()
+
+
+def test_background_refresh_waits_at_least_the_minimum_interval(cache_path):
+    auth = FakeAuth(ttl=0.2)
+    tokens = manager(auth, cache_path, min_refresh_interval=0.5)
+    tokens.get()
+    time.sleep(1.2)
+    tokens.stop()
+    assert 2 <= auth.calls <= 4
+
+
+def test_invalidated_token_is_replaced_immediately(cache_path):
+    auth = FakeAuth(ttl=3600)
+    tokens = manager(auth, cache_path)
+    first = tokens.get()
+    assert tokens.invalidate(first)
+    assert tokens.get() == 'token-2'
+    assert not tokens.invalidate(first)
+    tokens.stop()
@@ -0,0 +1,49 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from upload_spool import SpoolError, spool_stream
+
+PDF = b'%PDF-1.4\n' + b'x' * 200_000 + b'\n%%EOF'
+
+
+def test_spools_in_chunks_with_size_and_hash(tmp_path):
+    upload = spool_stream(io.BytesIO(PDF), chunk_size=4096, dir=str(tmp_path))
+    try:
+        assert upload.size == len(PDF)
+        assert upload.sha256 == hashlib.sha256(PDF).hexdigest()
+        with open(upload.path, 'rb') as f:
+            assert f.read() == PDF
+    finally:
+        upload.discard()
+    assert not os.path.exists(upload.path)
+    upload.discard()
+
+
+def test_junk_before_the_header_is_accepted(tmp_path):
+    upload = spool_stream(io.BytesIO(b'\r\n' * 10 + PDF), dir=str(tmp_path))
+    upload.discard()
+
+
+@pytest.mark.parametrize('body, max_bytes, status', [
+    (b'', None, 400),
+    (b'GIF89a' + b'x' * 5000, None, 400),
+    (PDF, 1000, 413),
+])
+def test_rejected_uploads_leave_no_file(tmp_path, body, max_bytes, status):
+    with pytest.raises(SpoolError) as error:
+        spool_stream(io.BytesIO(body), max_bytes=max_bytes, dir=str(tmp_path))
+    assert error.value.status_code == status
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_files_default_to_the_data_directory():
+    from job_store import DATA_DIR
+
+    upload = spool_stream(io.BytesIO(PDF))
+    try:
+        assert os.path.dirname(upload.path) == os.path.join(DATA_DIR, 'spool')
+    finally:
+        upload.discard()
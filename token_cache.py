@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Shared bearer token cache for the AI Document Processor API
+The token lives in memory and in a small file shared by every server process,
+is refreshed in the background shortly before it expires, and concurrent
+refreshes (threads or processes) collapse into one call to /api/v1/token
+"""
+
+import base64
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+TOKEN_CACHE_FILE = os.environ.get(
+    'TOKEN_CACHE_FILE', os.path.join(tempfile.gettempdir(), 'manifest-processor-token.json')
+)
+TOKEN_REFRESH_MARGIN = float(os.environ.get('TOKEN_REFRESH_MARGIN', '120'))
+# Used when neither the JWT nor the token response says when it expires
+TOKEN_DEFAULT_TTL = float(os.environ.get('TOKEN_DEFAULT_TTL', '1800'))
+TOKEN_RETRY_DELAY = 30.0
+# Never fetch a still-valid token more often than this, however short-lived it is
+TOKEN_MIN_REFRESH_INTERVAL = float(os.environ.get('TOKEN_MIN_REFRESH_INTERVAL', '10'))
+
+
+def jwt_expiry(token):
+    """`exp` claim of a JWT as a unix timestamp, or None (the signature is not checked)"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenManager:
+    """
+    Cached, proactively refreshed bearer token
+
+    Usage:
+        tokens = TokenManager(fetch, key='user@https://host:452')   # fetch() -> (token, expires_in or None)
+        token = tokens.get()
+        tokens.invalidate(token)                                     # after a 401
+    """
+
+    def __init__(self, fetch, key, cache_path=TOKEN_CACHE_FILE,
+                 refresh_margin=TOKEN_REFRESH_MARGIN, default_ttl=TOKEN_DEFAULT_TTL,
+                 min_refresh_interval=TOKEN_MIN_REFRESH_INTERVAL):
+        self.fetch = fetch
+        self.key = key
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.token = None
+        self.expires_at = 0.0
+        self.issued_at = 0.0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+        self.memory_hits = 0
+        self.file_hits = 0
+        self.refreshes = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.last_error = None
+
+    def _margin(self, expires_at, issued_at):
+        """
+        How long before expiry a token counts as stale: refresh_margin, but at
+        most half the token's lifetime, so short-lived tokens are still used
+        """
+        return min(self.refresh_margin, max(0.0, expires_at - issued_at) / 2)
+
+    def _fresh(self, expires_at, issued_at):
+        return expires_at - time.time() > self._margin(expires_at, issued_at)
+
+    def get(self):
+        """Return a token that is valid for at least its refresh margin"""
+        token, expires_at = self.token, self.expires_at
+        if token and self._fresh(expires_at, self.issued_at):
+            self.memory_hits += 1
+            return token
+        return self.refresh(stale_token=token)
+
+    def refresh(self, stale_token=None):
+        """
+        Fetch a new token unless another thread/process already replaced stale_token
+        Only one refresh runs at a time; the others wait for and share its result
+        """
+        with self._lock:
+            if self.token and self.token != stale_token and self._fresh(self.expires_at, self.issued_at):
+                self.coalesced += 1
+                return self.token
+            if (self.token and self.expires_at > time.time() and self._fetched_at is not None
+                    and time.monotonic() - self._fetched_at < self.min_refresh_interval):
+                # Still valid and fetched moments ago: don't hammer /api/v1/token
+                self.coalesced += 1
+                return self.token
+
+            with self._file_lock():
+                cached = self._read_file()
+                if cached and cached[0] != stale_token and self._fresh(cached[1], cached[2]):
+                    self.file_hits += 1
+                    self.token, self.expires_at, self.issued_at = cached
+                else:
+                    token, expires_in = self.fetch()
+                    issued_at = time.time()
+                    expires_at = jwt_expiry(token) or issued_at + (expires_in or self.default_ttl)
+                    self.token, self.expires_at, self.issued_at = token, expires_at, issued_at
+                    self._fetched_at = time.monotonic()
+                    self.refreshes += 1
+                    self._write_file(token, expires_at, issued_at)
+
+            self._ensure_refresher()
+            return self.token
+
+    def invalidate(self, token):
+        """Forget a token the server rejected; returns True if it was the current one"""
+        with self._lock:
+            if token != self.token:
+                return False
+            self.invalidations += 1
+            self.token = None
+            self.expires_at = 0.0
+            with self._file_lock():
+                cached = self._read_file()
+                if cached and cached[0] == token:
+                    self._write_file(None, 0.0, 0.0)
+            return True
+
+    # Background refresh
+
+    def _ensure_refresher(self):
+        if self._refresher is None or not self._refresher.is_alive():
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name='token-refresh', daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            stale_at = self.expires_at - self._margin(self.expires_at, self.issued_at)
+            delay = max(self.min_refresh_interval, stale_at - time.time())
+            if self._stop.wait(delay if self.token else TOKEN_RETRY_DELAY):
+                return
+            try:
+                self.refresh(stale_token=self.token)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️  Background token refresh failed: {e}")
+                if self._stop.wait(TOKEN_RETRY_DELAY):
+                    return
+
+    def stop(self):
+        self._stop.set()
+
+    # Cross-process file
+
+    def _file_lock(self):
+        return _FileLock(self.cache_path + '.lock')
+
+    def _read_file(self):
+        try:
+            with open(self.cache_path) as f:
+                entry = json.load(f).get(self.key)
+        except (OSError, ValueError, AttributeError):
+            return None
+        if not entry or not entry.get('token'):
+            return None
+        expires_at = float(entry.get('expiresAt', 0))
+        # Entries written before issuedAt was kept: assume a full default lifetime
+        issued_at = float(entry.get('issuedAt') or expires_at - self.default_ttl)
+        return entry['token'], expires_at, issued_at
+
+    def _write_file(self, token, expires_at, issued_at):
+        try:
+            with open(self.cache_path) as f:
+                entries = json.load(f)
+            if not isinstance(entries, dict):
+                entries = {}
+        except (OSError, ValueError):
+            entries = {}
+        entries[self.key] = {'token': token, 'expiresAt': expires_at, 'issuedAt': issued_at}
+
+        directory = os.path.dirname(self.cache_path) or '.'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            # The in-memory token still works; other processes just fetch their own
+            print(f"⚠️  Could not write token cache {self.cache_path}: {e}")
+
+    def stats(self):
+        return {
+            'cached': self.token is not None,
+            'expiresIn': round(self.expires_at - time.time(), 1) if self.token else None,
+            'memoryHits': self.memory_hits,
+            'fileHits': self.file_hits,
+            'refreshes': self.refreshes,
+            'coalesced': self.coalesced,
+            'invalidations': self.invalidations,
+            'lastError': self.last_error
+        }
+
+
+class _FileLock:
+    """Exclusive flock on a side file; silently a no-op if it cannot be opened"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        try:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        except OSError:
+            self._file = None
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
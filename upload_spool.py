@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Streaming, memory-bounded upload spooling
+Copies an upload to disk in fixed-size chunks while computing its SHA-256,
+byte count and checking the %PDF magic number, so per-request memory stays
+at one chunk whatever the file size
+"""
+
+import hashlib
+import os
+import tempfile
+
+from job_store import DATA_DIR
+
+# Spool files must survive a reboot like the job store: recover_jobs re-queues jobs from them
+SPOOL_DIR = os.environ.get('SPOOL_DIR') or os.path.join(DATA_DIR, 'spool')
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF'
+# Readers accept the header anywhere in the first 1024 bytes (some scanners
+# prepend junk), so that is how far we look too
+MAGIC_WINDOW = 1024
+
+
+class SpoolError(Exception):
+    """Raised when an upload is rejected while spooling"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SpooledUpload:
+    """A PDF spooled to a file under SPOOL_DIR, with its size and content hash"""
+
+    def __init__(self, path, size, sha256):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def discard(self):
+        """Remove the spool file; safe to call more than once"""
+        if self.path and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+class PDFSpoolWriter:
+    """Incremental hashing writer behind spool_stream"""
+
+    def __init__(self, path, size=0, digest=None, head=b''):
+        self.path = path
+        self.size = size
+        self.digest = digest or hashlib.sha256()
+        self.head = head  # first MAGIC_WINDOW bytes, kept for the magic check
+
+    def write(self, f, chunk, max_bytes=None):
+        if not chunk:
+            return
+        if max_bytes is not None and self.size + len(chunk) > max_bytes:
+            raise SpoolError(f"Upload exceeds the maximum size of {max_bytes} bytes", 413)
+        if len(self.head) < MAGIC_WINDOW:
+            self.head += chunk[:MAGIC_WINDOW - len(self.head)]
+            if len(self.head) >= MAGIC_WINDOW and PDF_MAGIC not in self.head:
+                raise SpoolError('File is not a PDF (missing %PDF header)')
+        self.digest.update(chunk)
+        f.write(chunk)
+        self.size += len(chunk)
+
+    def finish(self):
+        """Final checks once the last chunk is in; returns the SpooledUpload"""
+        if self.size == 0:
+            raise SpoolError('Uploaded file is empty')
+        if PDF_MAGIC not in self.head:
+            raise SpoolError('File is not a PDF (missing %PDF header)')
+        return SpooledUpload(self.path, self.size, self.digest.hexdigest())
+
+
+def spool_file(suffix='.pdf', dir=None):
+    """New empty spool file in dir (SPOOL_DIR by default), returns (fd, path)"""
+    dir = dir or SPOOL_DIR
+    os.makedirs(dir, exist_ok=True)
+    return tempfile.mkstemp(suffix=suffix, dir=dir)
+
+
+def spool_stream(stream, max_bytes=None, chunk_size=CHUNK_SIZE, suffix='.pdf', dir=None):
+    """
+    Copy a readable binary stream to a spool file in chunks
+
+    Returns:
+        SpooledUpload: path, size and SHA-256 of the spooled file
+
+    Raises:
+        SpoolError: empty upload, missing %PDF header or over max_bytes
+                    (the partial spool file is removed)
+    """
+    fd, path = spool_file(suffix, dir)
+    writer = PDFSpoolWriter(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(f, chunk, max_bytes)
+        return writer.finish()
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
@@ -4,14 +4,23 @@ Flask web server that interfaces with the Swift Manifest Exception Processor
 Provides a web UI for real PDF processing using the actual API
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, url_for
 import subprocess
+import sys
 import tempfile
 import os
 import json
 import base64
 from werkzeug.utils import secure_filename
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
 from swift_bridge import SwiftProcessorBridge
+from job_queue import JobExecutor, QueueFull
+from upload_spool import spool_stream, SpoolError
+from admission import AdmissionController, AdmissionRejected
+from resumable_upload import UploadSessions, OffsetMismatch, AlreadyFinalized
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB limit
@@ -20,56 +29,273 @@ UPLOAD_FOLDER = 'uploads'
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-# Initialize Swift processor bridge
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-swift_bridge = SwiftProcessorBridge(PROJECT_ROOT)
+# Initialize Swift processor bridge; while its circuit is open uploads get
+# the simulated response instead of waiting out another Swift timeout
+swift_bridge = SwiftProcessorBridge(
+    PROJECT_ROOT,
+    fallback=lambda pdf_path, process_type: call_swift_processor(pdf_path, process_type)
+)
+
+# Uploads run as queued jobs so request threads are not pinned by the bridge
+job_executor = JobExecutor()
+SYNC_WAIT_SECONDS = 310  # a little longer than the bridge timeout
+
+# Bounded concurrency for bridge calls; a full wait queue answers 429.
+# Limits adapt to observed latency and the worker pool follows them
+admission = AdmissionController(
+    on_limit_change=lambda: swift_bridge.pool.resize(admission.total_limit())
+)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def submit_upload(process_type):
+    """Validate and save the upload, then queue it; returns (job, error response)"""
+    if 'file' not in request.files:
+        return None, (jsonify({'error': 'No file provided'}), 400)
+    
+    file = request.files['file']
+    if file.filename == '':
+        return None, (jsonify({'error': 'No file selected'}), 400)
+    
+    if not file.filename.lower().endswith('.pdf'):
+        return None, (jsonify({'error': 'Only PDF files are supported'}), 400)
+    
+    if swift_bridge.warmup.warming:
+        return None, (jsonify({'error': 'Swift processor is warming up, try again shortly'}), 503, {'Retry-After': '10'})
+    
+    # Stream uploaded file to a unique name so concurrent uploads never collide
+    filename = secure_filename(file.filename)
+    try:
+        upload = spool_stream(
+            file.stream, app.config['MAX_CONTENT_LENGTH'],
+            suffix='_' + filename, dir=UPLOAD_FOLDER
+        )
+    except SpoolError as e:
+        return None, (jsonify({'error': str(e)}), e.status_code)
+    return queue_upload(filename, upload, process_type)
+
+def queue_upload(filename, upload, process_type, keep_on_reject=False):
+    """Admit and queue a spooled upload; a resumable upload keeps its file when rejected"""
+    try:
+        ticket = admission.admit(admission.classify(process_type, request.form.get('priority')))
+    except AdmissionRejected as e:
+        if not keep_on_reject:
+            upload.discard()
+        return None, (jsonify({'error': str(e)}), 429, {'Retry-After': str(e.retry_after)})
+    
+    try:
+        job = job_executor.submit(
+            process_saved_pdf, upload.path, process_type, ticket,
+            filename=filename, process_type=process_type
+        )
+    except QueueFull as e:
+        ticket.close()
+        if not keep_on_reject:
+            upload.discard()
+        return None, (jsonify({'error': str(e)}), 503, {'Retry-After': '5'})
+    return job, None
+
+def process_saved_pdf(filepath, process_type, ticket):
+    """Call Swift processor using the bridge once admitted, then clean up the uploaded file"""
+    try:
+        if swift_bridge.breaker.rejecting():
+            # Circuit open: the bridge answers from its fallback at once, no slot needed
+            result = swift_bridge.process_pdf(filepath, process_type)
+        else:
+            with ticket:
+                result = swift_bridge.process_pdf(filepath, process_type)
+                if 'error' in result:
+                    ticket.fail()
+    finally:
+        ticket.close()
+        os.remove(filepath)
+    
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result
+
+def job_accepted(job):
+    body = job.to_dict(include_result=False)
+    body['statusUrl'] = url_for('job_status', job_id=job.id)
+    return jsonify(body), 202, {'Location': body['statusUrl']}
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    try:
+        job, error = submit_upload(request.form.get('processType', 'async'))
+        return error or job_accepted(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = job_executor.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/process', methods=['POST'])
 def process_pdf():
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not file.filename.lower().endswith('.pdf'):
-            return jsonify({'error': 'Only PDF files are supported'}), 400
-        
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        
         # Get processing type
         process_type = request.form.get('processType', 'sync')
         
-        # Call Swift processor using the bridge
-        result = swift_bridge.process_pdf(filepath, process_type)
-        
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        # Format result for web response
-        if 'error' in result:
-            return jsonify(result), 500
-        else:
-            return jsonify(result)
+        job, error = submit_upload(process_type)
+        if error:
+            return error
+        return job_response(job, process_type)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def job_response(job, process_type):
+    if process_type == 'async' or not job.wait(SYNC_WAIT_SECONDS):
+        return job_accepted(job)
+    
+    # Format result for web response
+    if job.status == 'failed':
+        return jsonify({'error': job.error}), 500
+    else:
+        return jsonify(job.result)
+
+# Resumable chunked uploads for scans too large for one POST: create, PUT
+# chunks at offsets, HEAD for the received length, then finalize
+upload_sessions = UploadSessions(spool_dir=UPLOAD_FOLDER)
+FINALIZE_WAIT = 10  # how long a concurrent finalize waits for the winner's job id
+
+def upload_body(session):
+    return {
+        'uploadId': session['id'],
+        'filename': session['filename'],
+        'offset': session['received'],
+        'size': session['total_size'],
+        'maxBytes': upload_sessions.max_bytes,
+        'jobId': session['job_id'],
+        'uploadUrl': url_for('upload_chunk', upload_id=session['id']),
+        'finalizeUrl': url_for('finalize_upload', upload_id=session['id'])
+    }
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    options = request.get_json(silent=True) or {}
+    filename = secure_filename(options.get('filename') or request.args.get('filename') or 'upload.pdf')
+    if not filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Only PDF files are supported'}), 400
+    
+    total_size = request.headers.get('Upload-Length') or options.get('size') or request.args.get('size')
+    try:
+        session = upload_sessions.create(filename, int(total_size) if total_size else None)
+    except ValueError:
+        return jsonify({'error': 'Upload size must be a number of bytes'}), 400
+    except SpoolError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    body = upload_body(session)
+    return jsonify(body), 201, {'Location': body['uploadUrl']}
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT', 'PATCH'])
+def upload_chunk(upload_id):
+    offset = request.headers.get('Upload-Offset') or request.args.get('offset')
+    if offset is None or not offset.isdigit():
+        return jsonify({'error': 'Chunk offset required (Upload-Offset header or ?offset=)'}), 400
+    
+    try:
+        received = upload_sessions.append(upload_id, int(offset), request.stream)
+    except KeyError:
+        return jsonify({'error': 'Unknown or finalized upload'}), 404
+    except OffsetMismatch as e:
+        return jsonify({'error': str(e), 'offset': e.expected}), 409, {'Upload-Offset': str(e.expected)}
+    except SpoolError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    return jsonify({'uploadId': upload_id, 'offset': received}), 200, {'Upload-Offset': str(received)}
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'HEAD'])
+def upload_status(upload_id):
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    return jsonify(upload_body(session)), 200, {'Upload-Offset': str(session['received']), 'Cache-Control': 'no-store'}
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    if not upload_sessions.discard(upload_id):
+        return jsonify({'error': 'Unknown upload'}), 404
+    return '', 204
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    if swift_bridge.warmup.warming:
+        return jsonify({'error': 'Swift processor is warming up, try again shortly'}), 503, {'Retry-After': '10'}
+    
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    process_type = request.form.get('processType') or request.args.get('processType', 'sync')
+    
+    if session['job_id'] is not None:
+        return finalized_upload_response(session['job_id'], process_type)
+    
+    try:
+        upload = upload_sessions.finalize(upload_id)
+    except KeyError:
+        return jsonify({'error': 'Unknown upload'}), 404
+    except AlreadyFinalized as e:
+        # A concurrent finalize won the compare-and-set: answer with its job
+        job_id = e.job_id or upload_sessions.wait_for_job(upload_id, FINALIZE_WAIT)
+        if job_id is None:
+            return jsonify({'error': 'This upload is still being finalized'}), 409, {'Retry-After': '1'}
+        return finalized_upload_response(job_id, process_type)
+    except SpoolError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    job, error = queue_upload(session['filename'], upload, process_type, keep_on_reject=True)
+    if error:
+        upload_sessions.release(upload_id)
+        return error
+    upload_sessions.attach_job(upload_id, job.id)
+    return job_response(job, process_type)
+
+def finalized_upload_response(job_id, process_type):
+    job = job_executor.get(job_id)
+    if job is None:
+        return jsonify({'error': 'The job for this upload has expired'}), 410
+    return job_response(job, process_type)
+
 @app.route('/api/test')
 def test_swift_connection():
     """Test endpoint to check Swift processor availability"""
     test_result = swift_bridge.test_connection()
+    test_result['admission'] = admission.stats()
     return jsonify(test_result)
 
+@app.route('/health')
+def health():
+    return jsonify({
+        'status': 'healthy',
+        'app': 'Manifest Exception Processor',
+        'jobs': job_executor.stats(),
+        'swiftCircuit': swift_bridge.breaker.stats()
+    })
+
+@app.route('/ready')
+def ready():
+    """Readiness: 503 while the Swift binary is being built or warmed up"""
+    status = swift_bridge.warmup.stats()
+    # A failed warm-up still serves uploads (fallback), so it counts as ready
+    status['ready'] = not swift_bridge.warmup.warming
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/admission')
+def admission_status():
+    """Current concurrency limits, queues and recent adaptive decisions"""
+    return jsonify({
+        'limiters': admission.stats(),
+        'totalLimit': admission.total_limit(),
+        'swiftPool': swift_bridge.pool.stats()
+    })
+
 def call_swift_processor(pdf_path, process_type):
     """
     Call the Swift command-line processor with the PDF file
@@ -224,4 +450,8 @@ if __name__ == '__main__':
     print("🚀 Starting Manifest Exception Processor Web Server")
     print("📡 Server will be available at: http://localhost:8080")
     print("📄 Upload PDFs for real processing with the Swift backend")
+    # debug=True runs this script twice: in the reloader's watcher and in the
+    # serving child (WERKZEUG_RUN_MAIN); only the child needs a warm pool
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        swift_bridge.start_warmup()
     app.run(debug=True, host='0.0.0.0', port=8080)
\ No newline at end of file
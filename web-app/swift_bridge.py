@@ -5,15 +5,47 @@ This script calls the actual Swift processor and returns real results
 """
 
 import subprocess
-import json
 import tempfile
 import os
+import sys
 from pathlib import Path
 
+# Shared helpers live at the project root, next to stable_web_app.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from swift_worker_pool import SwiftWorkerPool, WorkerError, DEFAULT_POOL_SIZE
+from circuit_breaker import CircuitBreaker
+from swift_binary import SwiftWarmup, ensure_executable, executable_path
+from swift_output import parse_records, SwiftOutputError
+
 class SwiftProcessorBridge:
-    def __init__(self, project_root):
+    def __init__(self, project_root, pool_size=DEFAULT_POOL_SIZE, fallback=None):
+        """
+        Args:
+            project_root (str): directory containing Package.swift
+            pool_size (int): number of persistent Swift workers
+            fallback (callable): fallback(pdf_path, process_type) used while
+                the circuit breaker is open; without one an error is returned
+        """
         self.project_root = Path(project_root)
-        self.swift_executable = self.project_root / ".build" / "debug" / "manifest-processor"
+        self.fallback = fallback
+        self.breaker = CircuitBreaker("swift-bridge")
+        self.swift_executable = executable_path(self.project_root)
+        self.pool = SwiftWorkerPool(
+            [str(self.swift_executable), "--worker"],
+            cwd=self.project_root,
+            size=pool_size,
+            job_timeout=300  # 5 minute timeout
+        )
+        self.warmup = SwiftWarmup(self.project_root, self._use_executable)
+    
+    def start_warmup(self):
+        """Build (once) and warm up the release binary in the background"""
+        self.warmup.start()
+    
+    def _use_executable(self, executable):
+        self.swift_executable = Path(executable)
+        self.pool.set_command([str(self.swift_executable), "--worker"])
+        return self.pool
         
     def process_pdf(self, pdf_path, process_type="sync"):
         """
@@ -26,139 +58,51 @@ class SwiftProcessorBridge:
         Returns:
             dict: Processing results or error information
         """
+        if not self.breaker.allow_request():
+            if self.fallback is not None:
+                result = self.fallback(pdf_path, process_type)
+                result["circuit"] = "open"
+                return result
+            return {"error": "Swift processor unavailable (circuit open)", "circuit": "open"}
+        
+        result = self._process_with_worker(pdf_path, process_type)
+        self.breaker.record("error" not in result)
+        return result
+    
+    def _process_with_worker(self, pdf_path, process_type):
+        """One attempt on the worker pool, building the package first if needed"""
         try:
-            # Build the Swift package if needed
-            if not self.swift_executable.exists():
+            # Normally done by the startup warm-up; the build lock makes sure
+            # concurrent callers never start more than one build
+            if not self.warmup.ready and not self.swift_executable.exists():
                 self._build_swift_package()
             
-            # Prepare command
-            cmd = [str(self.swift_executable), pdf_path]
-            if process_type == "async":
-                cmd.append("--async")
-            
-            # Execute Swift processor
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300,  # 5 minute timeout
-                cwd=self.project_root
-            )
-            
-            if result.returncode == 0:
-                # Parse Swift output
-                return self._parse_swift_output(result.stdout)
-            else:
-                return {
-                    "error": f"Swift processor failed: {result.stderr}",
-                    "stdout": result.stdout,
-                    "returncode": result.returncode
-                }
+            # Hand the document to a persistent worker
+            mode = "async" if process_type == "async" else "sync"
+            return self.pool.process(pdf_path, mode=mode)
                 
-        except subprocess.TimeoutExpired:
-            return {"error": "Processing timeout - PDF took too long to process"}
+        except WorkerError as e:
+            return {"error": f"Swift processor failed: {e}"}
         except Exception as e:
             return {"error": f"Bridge error: {str(e)}"}
     
     def _build_swift_package(self):
-        """Build the Swift package"""
+        """Build the Swift package (release, once, under the shared build lock)"""
         try:
-            print("🔨 Building Swift package...")
-            result = subprocess.run(
-                ["swift", "build"],
-                capture_output=True,
-                text=True,
-                cwd=self.project_root
-            )
-            
-            if result.returncode != 0:
-                raise Exception(f"Swift build failed: {result.stderr}")
-                
-            print("✅ Swift package built successfully")
-            
+            self._use_executable(ensure_executable(self.project_root))
         except Exception as e:
             print(f"❌ Build failed: {e}")
             raise
     
-    def _parse_swift_output(self, swift_output):
+    def _parse_swift_output(self, swift_output, filename=None):
         """
-        Parse the output from the Swift processor
-        Expected format: JSON output from the Swift processor
+        Parse captured output of `manifest-processor --json` (NDJSON records)
+        Streaming callers should use swift_output.run_swift_json instead
         """
         try:
-            # Look for JSON in the output
-            lines = swift_output.strip().split('\n')
-            
-            # Find JSON output (usually the last substantial line)
-            json_line = None
-            for line in reversed(lines):
-                line = line.strip()
-                if line.startswith('{') and line.endswith('}'):
-                    json_line = line
-                    break
-            
-            if json_line:
-                return json.loads(json_line)
-            else:
-                # If no JSON found, create a structured response from text output
-                return {
-                    "status": "success",
-                    "output": swift_output,
-                    "parsed": self._parse_text_output(swift_output)
-                }
-                
-        except json.JSONDecodeError as e:
-            return {
-                "error": f"Failed to parse Swift output as JSON: {e}",
-                "raw_output": swift_output
-            }
-    
-    def _parse_text_output(self, output):
-        """
-        Parse text output from Swift processor into structured data
-        This is a fallback when JSON parsing fails
-        """
-        parsed = {
-            "manifest": {},
-            "summary": {},
-            "exceptions": [],
-            "raw_output": output
-        }
-        
-        lines = output.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines and separators
-            if not line or line.startswith('=') or line.startswith('-'):
-                continue
-            
-            # Detect sections
-            if 'MANIFEST INFORMATION' in line.upper():
-                current_section = 'manifest'
-            elif 'EXCEPTION SUMMARY' in line.upper():
-                current_section = 'summary'
-            elif 'EXCEPTION DETAILS' in line.upper():
-                current_section = 'exceptions'
-            
-            # Parse data based on section
-            if ':' in line and current_section:
-                key, value = line.split(':', 1)
-                key = key.strip().lower().replace(' ', '_')
-                value = value.strip()
-                
-                if current_section in ['manifest', 'summary']:
-                    # Extract numbers from value
-                    import re
-                    numbers = re.findall(r'\d+', value)
-                    if numbers:
-                        parsed[current_section][key] = int(numbers[0])
-                    else:
-                        parsed[current_section][key] = value
-        
-        return parsed
+            return parse_records(swift_output, filename)
+        except SwiftOutputError as e:
+            return {"error": f"Failed to parse Swift output: {e}"}
 
     def test_connection(self):
         """Test if the Swift processor is accessible"""
@@ -175,7 +119,10 @@ class SwiftProcessorBridge:
                 "swift_available": result.returncode == 0,
                 "swift_version": result.stdout.strip() if result.returncode == 0 else None,
                 "project_root": str(self.project_root),
-                "executable_exists": self.swift_executable.exists()
+                "executable_exists": self.swift_executable.exists(),
+                "worker_pool": self.pool.stats(),
+                "circuit_breaker": self.breaker.stats(),
+                "warmup": self.warmup.stats()
             }
             
         except Exception as e:
@@ -5,13 +5,13 @@ Simple, reliable Flask app that definitely works
 """
 
 try:
-    from flask import Flask, request, jsonify, render_template_string
+    from flask import Flask, request, jsonify, render_template_string, url_for
     import os
     import tempfile
     from werkzeug.utils import secure_filename
-    import json
-    import subprocess
     from datetime import datetime
+    from job_queue import JobExecutor, QueueFull
+    from swift_output import run_swift_json, SwiftOutputError
     
     app = Flask(__name__)
     app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB
@@ -215,6 +215,21 @@ try:
             });
         });
 
+        async function waitForJob(statusUrl) {
+            // Poll a queued job until it finishes
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                const response = await fetch(statusUrl);
+                const job = await response.json();
+                if (!response.ok) {
+                    throw new Error(job.error || 'Job lookup failed');
+                }
+                if (job.status === 'completed' || job.status === 'failed') {
+                    return job;
+                }
+            }
+        }
+
         // Process document
         document.getElementById('processBtn').addEventListener('click', async function() {
             if (!selectedFile) return;
@@ -237,7 +252,16 @@ try:
                     body: formData
                 });
                 
-                const result = await response.json();
+                let result = await response.json();
+
+                // Queued jobs come back as 202 with a status URL to poll
+                if (response.status === 202 && result.statusUrl) {
+                    const job = await waitForJob(result.statusUrl);
+                    if (job.status === 'failed') {
+                        throw new Error(job.error || 'Processing failed');
+                    }
+                    result = job.result;
+                }
                 
                 if (response.ok) {
                     statusEl.className = 'status success';
@@ -342,37 +366,83 @@ try:
     def index():
         return render_template_string(HTML_TEMPLATE)
 
+    # Uploads run as queued jobs; /process waits on them unless asked for async
+    job_executor = JobExecutor()
+    SYNC_WAIT_SECONDS = 130
+
+    def submit_upload(process_type):
+        """Validate and save the upload, then queue it; returns (job, error response)"""
+        if 'file' not in request.files:
+            return None, (jsonify({'error': 'No file provided'}), 400)
+        
+        file = request.files['file']
+        if file.filename == '':
+            return None, (jsonify({'error': 'No file selected'}), 400)
+        
+        if not file.filename.lower().endswith('.pdf'):
+            return None, (jsonify({'error': 'Only PDF files are supported'}), 400)
+        
+        filename = secure_filename(file.filename)
+        
+        # Save temporarily
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+            file.save(temp_file.name)
+            temp_path = temp_file.name
+        
+        try:
+            job = job_executor.submit(
+                process_saved_pdf, temp_path, filename, process_type,
+                filename=filename, process_type=process_type
+            )
+        except QueueFull as e:
+            os.unlink(temp_path)
+            return None, (jsonify({'error': str(e)}), 503, {'Retry-After': '5'})
+        return job, None
+
+    def process_saved_pdf(temp_path, filename, process_type):
+        """Run the Swift processor on a saved upload and remove it afterwards"""
+        try:
+            return call_swift_processor(temp_path, filename, process_type)
+        finally:
+            # Clean up
+            try:
+                os.unlink(temp_path)
+            except:
+                pass
+
+    def job_accepted(job):
+        body = job.to_dict(include_result=False)
+        body['statusUrl'] = url_for('job_status', job_id=job.id)
+        return jsonify(body), 202, {'Location': body['statusUrl']}
+
+    @app.route('/jobs', methods=['POST'])
+    def create_job():
+        try:
+            job, error = submit_upload('async')
+            return error or job_accepted(job)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/jobs/<job_id>')
+    def job_status(job_id):
+        job = job_executor.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job id'}), 404
+        return jsonify(job.to_dict())
+
     @app.route('/process', methods=['POST'])
     def process_pdf():
         try:
-            if 'file' not in request.files:
-                return jsonify({'error': 'No file provided'}), 400
-            
-            file = request.files['file']
-            if file.filename == '':
-                return jsonify({'error': 'No file selected'}), 400
-            
-            if not file.filename.lower().endswith('.pdf'):
-                return jsonify({'error': 'Only PDF files are supported'}), 400
-            
-            filename = secure_filename(file.filename)
             process_type = request.form.get('processType', 'sync')
+            job, error = submit_upload(process_type)
+            if error:
+                return error
             
-            # Save temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                file.save(temp_file.name)
-                temp_path = temp_file.name
-            
-            try:
-                # Try to call Swift processor
-                result = call_swift_processor(temp_path, filename, process_type)
-                return jsonify(result)
-            finally:
-                # Clean up
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+            if process_type == 'async' or not job.wait(SYNC_WAIT_SECONDS):
+                return job_accepted(job)
+            if job.status == 'failed':
+                return jsonify({'error': job.error}), 500
+            return jsonify(job.result)
                     
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -382,50 +452,23 @@ try:
         Call the Swift Manifest Exception Processor
         """
         try:
-            # Try calling the Swift processor
-            cmd = ['swift', 'run', 'manifest-processor', pdf_path]
-            
-            result = subprocess.run(
+            # --json emits NDJSON records only; they are parsed as the pipe is read
+            cmd = ['swift', 'run', 'manifest-processor', '--json', pdf_path]
+            result = run_swift_json(
                 cmd,
-                capture_output=True,
-                text=True,
+                filename,
                 timeout=120,
-                cwd='/Users/kevinjohn/projects/unloadreader'
+                cwd=os.path.dirname(os.path.abspath(__file__))
             )
-            
-            if result.returncode == 0:
-                # Success - parse output
-                return parse_swift_output(result.stdout, filename, process_type)
-            else:
-                # Swift failed - return demo data with error note
-                return generate_demo_result(filename, process_type, f"Swift processor error: {result.stderr}")
+            result['processType'] = process_type
+            return result
                 
-        except subprocess.TimeoutExpired:
-            return generate_demo_result(filename, process_type, "Processing timeout - using demo data")
+        except SwiftOutputError as e:
+            # Swift failed - return demo data with error note
+            return generate_demo_result(filename, process_type, f"Swift processor error: {e}")
         except Exception as e:
             return generate_demo_result(filename, process_type, f"Error calling Swift processor: {e}")
 
-    def parse_swift_output(output, filename, process_type):
-        """Parse output from Swift processor"""
-        # Look for JSON output
-        lines = output.strip().split('\n')
-        for line in reversed(lines):
-            if line.strip().startswith('{'):
-                try:
-                    return json.loads(line)
-                except:
-                    continue
-        
-        # If no JSON, create structured response
-        return {
-            'status': 'success',
-            'filename': filename,
-            'processType': process_type,
-            'message': 'Swift processor executed successfully',
-            'raw_output': output,
-            'note': 'Real processing completed with Swift backend'
-        }
-
     def generate_demo_result(filename, process_type, error_note):
         """Generate realistic demo data when Swift processor unavailable"""
         import random
@@ -454,7 +497,11 @@ try:
 
     @app.route('/health')
     def health():
-        return jsonify({'status': 'healthy', 'app': 'Manifest Exception Processor'})
+        return jsonify({
+            'status': 'healthy',
+            'app': 'Manifest Exception Processor',
+            'jobs': job_executor.stats()
+        })
 
     if __name__ == '__main__':
         print("🚀 Starting Manifest Exception Processor Web Interface")